@@ -8,15 +8,53 @@ let dimCustomers = [];
 let dimProducts = [];
 let dimEmployees = [];
 let filteredData = [];
+let isUnified = false;
+let customerRfm = [];
+let monthlySeries = [];
+let seriesLastDay = null;
 
 // ============================================================================
 // DATA LOADING
 // ============================================================================
 
+// Published dataset version (data/current.json, written by scripts/dataset.py)
+let currentDataset = null;
+
+async function loadCurrentDataset() {
+    if (currentDataset === null) {
+        currentDataset = fetch('data/current.json')
+            .then(response => (response.ok ? response.json() : {}))
+            .catch(() => ({}));
+    }
+    return currentDataset;
+}
+
+async function resolveFile(filename) {
+    // Tables of the published version live in data/_versions/<version>/
+    const current = await loadCurrentDataset();
+    const table = filename.replace(/\.csv$/, '');
+    if (current.tables && current.tables[table]) {
+        return `${current.path}/${current.tables[table].file}`;
+    }
+    return filename;
+}
+
+async function resolveDirectory(name) {
+    // Partitioned outputs are staged inside the published version too
+    const current = await loadCurrentDataset();
+    if (current.directories && current.directories[name]) {
+        return `${current.path}/${name}`;
+    }
+    return name;
+}
+
 async function loadCSV(filename) {
     try {
-        const response = await fetch(`data/${filename}`);
-        const csvText = await response.text();
+        const path = await resolveFile(filename);
+        const response = await fetch(`data/${path}`);
+        const csvText = path.endsWith('.gz')
+            ? await new Response(response.body.pipeThrough(new DecompressionStream('gzip'))).text()
+            : await response.text();
 
         return new Promise((resolve, reject) => {
             Papa.parse(csvText, {
@@ -33,7 +71,68 @@ async function loadCSV(filename) {
     }
 }
 
+async function loadCustomerRfm() {
+    // Customer_RFM is precomputed by scripts/etl_northwind.py (see scripts/marts.py)
+    const current = await loadCurrentDataset();
+    if (!current.tables || !current.tables.Customer_RFM) return [];
+    return loadCSV('Customer_RFM.csv');
+}
+
+async function loadSalesTimeseries() {
+    // Sales_Timeseries is precomputed by scripts/etl_northwind.py (see scripts/marts.py)
+    const current = await loadCurrentDataset();
+    if (!current.tables || !current.tables.Sales_Timeseries) return [];
+    return loadCSV('Sales_Timeseries.csv');
+}
+
+async function loadUnifiedData() {
+    // Pre-merged dataset written by scripts/etl_unified.py (partitioned by Source/Year)
+    const directory = await resolveDirectory('Fact_Sales_Unified');
+    let manifest;
+    try {
+        const response = await fetch(`data/${directory}/_manifest.json`);
+        if (!response.ok) return false;
+        manifest = await response.json();
+    } catch (error) {
+        return false;
+    }
+
+    const [partitions, customers, products, employees] = await Promise.all([
+        Promise.all(manifest.partitions.map(p => loadCSV(`${directory}/${p.path}`))),
+        loadCSV('Dim_Customers_Unified.csv'),
+        loadCSV('Dim_Products_Unified.csv'),
+        loadCSV('Dim_Employees_Unified.csv')
+    ]);
+
+    // Surrogate keys (SQL_..., ACC_...) are unique across sources
+    factSales = partitions.flat().map(row => ({
+        ...row,
+        OrderID: row.OrderKey,
+        CustomerID: row.CustomerKey,
+        ProductID: row.ProductKey,
+        EmployeeID: row.EmployeeKey,
+        OrderDate: new Date(row.OrderDate),
+        _source: row.Source
+    }));
+    dimCustomers = customers.map(c => ({ ...c, CustomerID: c.CustomerKey }));
+    dimProducts = products.map(p => ({ ...p, ProductID: p.ProductKey }));
+    dimEmployees = employees.map(e => ({ ...e, EmployeeID: e.EmployeeKey }));
+    isUnified = true;
+
+    console.log('✅ UNIFIED DATA LOADED:', {
+        partitions: manifest.partitions.length,
+        factSales: factSales.length,
+        customers: dimCustomers.length,
+        products: dimProducts.length
+    });
+    return true;
+}
+
 async function loadAllData() {
+    if (await loadUnifiedData()) {
+        return true;
+    }
+
     console.log('Loading data from BOTH SQL Server and Access databases...');
 
     try {
@@ -200,6 +299,11 @@ async function loadAllData() {
 // ============================================================================
 
 function mergeData() {
+    // Unified rows already carry customer, product and employee attributes
+    if (isUnified) {
+        return factSales;
+    }
+
     const merged = factSales.map(sale => {
         const customer = dimCustomers.find(c => c.CustomerID === sale.CustomerID) || {};
         const product = dimProducts.find(p => p.ProductID === sale.ProductID) || {};
@@ -315,17 +419,43 @@ function calculateKPIs() {
     };
 }
 
+function latestMonthDeltas() {
+    // Precomputed deltas cover all countries and categories: unused when those are filtered
+    if (!monthlySeries.length || !document.getElementById('allCountries').checked
+        || !document.getElementById('allCategories').checked) return null;
+
+    // Latest month complete both in the data and in the selected date range
+    const endDate = new Date(document.getElementById('endDate').value);
+    const complete = monthlySeries.filter(row => {
+        const periodEnd = new Date(row.PeriodEnd);
+        return periodEnd <= endDate && periodEnd <= seriesLastDay;
+    });
+    return complete.length ? complete[complete.length - 1] : null;
+}
+
+function formatDelta(change) {
+    if (typeof change !== 'number' || Number.isNaN(change)) return 'n/a';
+    return `${change >= 0 ? '▲' : '▼'} ${(Math.abs(change) * 100).toFixed(1)}%`;
+}
+
 function updateKPIs() {
     const kpis = calculateKPIs();
+    const deltas = latestMonthDeltas();
 
     document.getElementById('totalRevenue').textContent = `$${kpis.totalRevenue.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
-    document.getElementById('revenueDelta').textContent = `${(kpis.totalRevenue / 100000 * 100).toFixed(1)}% of budget`;
+    document.getElementById('revenueDelta').textContent = deltas
+        ? `${deltas.Period}: ${formatDelta(deltas.TotalSales_PoP)} MoM, ${formatDelta(deltas.TotalSales_YoY)} YoY`
+        : `${(kpis.totalRevenue / 100000 * 100).toFixed(1)}% of budget`;
 
     document.getElementById('totalOrders').textContent = kpis.totalOrders.toLocaleString();
-    document.getElementById('ordersDelta').textContent = `Avg: ${(kpis.totalQuantity / Math.max(kpis.totalOrders, 1)).toFixed(0)} units/order`;
+    document.getElementById('ordersDelta').textContent = deltas
+        ? `${deltas.Period}: ${formatDelta(deltas.OrderCount_PoP)} MoM, ${formatDelta(deltas.OrderCount_YoY)} YoY`
+        : `Avg: ${(kpis.totalQuantity / Math.max(kpis.totalOrders, 1)).toFixed(0)} units/order`;
 
     document.getElementById('avgOrderValue').textContent = `$${kpis.avgOrderValue.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })}`;
-    document.getElementById('avgDelta').textContent = `$${kpis.stdDev.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })} std dev`;
+    document.getElementById('avgDelta').textContent = deltas
+        ? `${deltas.Period}: ${formatDelta(deltas.AvgOrderValue_PoP)} MoM, ${formatDelta(deltas.AvgOrderValue_YoY)} YoY`
+        : `$${kpis.stdDev.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })} std dev`;
 
     document.getElementById('totalCustomers').textContent = kpis.totalCustomers.toLocaleString();
     document.getElementById('customersDelta').textContent = `$${(kpis.totalRevenue / Math.max(kpis.totalCustomers, 1)).toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 })} per customer`;
@@ -559,6 +689,113 @@ function createCustomersChart() {
     Plotly.newPlot('customersChart', [trace], layout, { responsive: true });
 }
 
+// Same segments as scripts/marts.py: (segment, allowed R scores, allowed F scores)
+const RFM_SEGMENTS = [
+    ['Champions', [4, 5], [4, 5]],
+    ['Fidèles', [3, 5], [3, 5]],
+    ['Nouveaux', [4, 5], [1, 2]],
+    ['Potentiels fidèles', [3, 5], [1, 2]],
+    ['À ne pas perdre', [1, 2], [4, 5]],
+    ['À risque', [1, 2], [3, 3]],
+    ['En hibernation', [2, 2], [1, 2]],
+    ['Perdus', [1, 1], [1, 2]]
+];
+
+function quantileScores(values, ascending = true, quantiles = 5) {
+    // Score 1..quantiles from the percentile rank (ties share their average rank)
+    const order = values.map((_, i) => i)
+        .sort((a, b) => (ascending ? values[a] - values[b] : values[b] - values[a]));
+    const ranks = new Array(values.length);
+    for (let start = 0; start < order.length;) {
+        let end = start;
+        while (end + 1 < order.length && values[order[end + 1]] === values[order[start]]) end++;
+        for (let k = start; k <= end; k++) ranks[order[k]] = (start + end) / 2 + 1;
+        start = end + 1;
+    }
+    return ranks.map(rank => Math.min(quantiles, Math.max(1, Math.ceil(rank / values.length * quantiles))));
+}
+
+function computeCustomerRfm(rows) {
+    // Fallback when Customer_RFM is not published: recompute it from the loaded facts
+    const customers = {};
+    rows.forEach(row => {
+        if (!customers[row.CustomerID]) {
+            customers[row.CustomerID] = { orders: new Set(), last: row.OrderDate, monetary: 0 };
+        }
+        const customer = customers[row.CustomerID];
+        customer.orders.add(row.OrderID);
+        if (row.OrderDate > customer.last) customer.last = row.OrderDate;
+        customer.monetary += row.TotalAmount || 0;
+    });
+
+    const ids = Object.keys(customers);
+    if (!ids.length) return [];
+    const asOf = Math.max(...ids.map(id => customers[id].last));
+    const recency = ids.map(id => Math.round((asOf - customers[id].last) / 86400000));
+    const frequency = ids.map(id => customers[id].orders.size);
+    const monetary = ids.map(id => customers[id].monetary);
+    const rScores = quantileScores(recency, false);
+    const fScores = quantileScores(frequency);
+    const mScores = quantileScores(monetary);
+
+    return ids.map((id, i) => {
+        const segment = RFM_SEGMENTS.find(([, r, f]) =>
+            rScores[i] >= r[0] && rScores[i] <= r[1] && fScores[i] >= f[0] && fScores[i] <= f[1]);
+        return {
+            CustomerID: id,
+            Recency: recency[i],
+            Frequency: frequency[i],
+            Monetary: monetary[i],
+            R_Score: rScores[i],
+            F_Score: fScores[i],
+            M_Score: mScores[i],
+            Segment: segment ? segment[0] : 'Autres',
+            AsOf: new Date(asOf).toISOString()
+        };
+    });
+}
+
+function createRfmChart() {
+    // Segments are precomputed per customer: aggregate the few rows of Customer_RFM
+    const segments = {};
+    customerRfm.forEach(row => {
+        if (!segments[row.Segment]) {
+            segments[row.Segment] = { customers: 0, revenue: 0 };
+        }
+        segments[row.Segment].customers += 1;
+        segments[row.Segment].revenue += row.Monetary || 0;
+    });
+
+    const sorted = Object.entries(segments).sort((a, b) => a[1].revenue - b[1].revenue);
+
+    const trace = {
+        y: sorted.map(item => item[0]),
+        x: sorted.map(item => item[1].revenue),
+        text: sorted.map(item => `${item[1].customers} customers`),
+        textposition: 'auto',
+        type: 'bar',
+        orientation: 'h',
+        marker: {
+            color: sorted.map(item => item[1].customers),
+            colorscale: 'Blues',
+            showscale: false
+        }
+    };
+
+    const asOf = customerRfm.length ? ` (as of ${String(customerRfm[0].AsOf).slice(0, 10)})` : '';
+    const layout = {
+        title: '',
+        xaxis: { title: `Revenue ($)${asOf}`, color: '#9aa0a6', gridcolor: '#3a4152' },
+        yaxis: { title: '', color: '#9aa0a6' },
+        plot_bgcolor: '#1a1f2e',
+        paper_bgcolor: '#242b3d',
+        font: { color: '#e8eaed' },
+        margin: { l: 160, r: 20, t: 20, b: 60 }
+    };
+
+    Plotly.newPlot('rfmChart', [trace], layout, { responsive: true });
+}
+
 function createMonthlyChart() {
     // Group by month
     const monthlySales = {};
@@ -987,6 +1224,7 @@ function updateDashboard() {
     createCategoryChart();
     createCustomersChart();
     createMonthlyChart();
+    createRfmChart();
     create3DScatterChart();
     create3DSurfaceChart();
     create3DBarChart();
@@ -1088,7 +1326,11 @@ function setupFilters() {
 async function init() {
     console.log('Initializing dashboard...');
 
-    const loaded = await loadAllData();
+    const [loaded, rfm, series] = await Promise.all([loadAllData(), loadCustomerRfm(), loadSalesTimeseries()]);
+    customerRfm = rfm.length ? rfm : computeCustomerRfm(factSales);
+    monthlySeries = series.filter(row => row.Grain === 'Month');
+    const days = series.filter(row => row.Grain === 'Day');
+    seriesLastDay = days.length ? new Date(days[days.length - 1].PeriodEnd) : null;
 
     if (loaded) {
         setupFilters();
@@ -0,0 +1,129 @@
+import json
+import logging
+
+import pandas as pd
+
+from config import STATE_PATH
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CAPTURE DES CHANGEMENTS (CHANGE TRACKING SQL SERVER)
+# =============================================================================
+#
+# Prérequis côté SQL Server (une seule fois) :
+#   ALTER DATABASE Northwind SET CHANGE_TRACKING = ON
+#       (CHANGE_RETENTION = 2 DAYS, AUTO_CLEANUP = ON);
+#   ALTER TABLE [Orders] ENABLE CHANGE_TRACKING;
+#   ALTER TABLE [Order Details] ENABLE CHANGE_TRACKING;
+
+# Tables suivies et leurs clés primaires
+TRACKED_TABLES = {
+    'Orders': ['OrderID'],
+    'Order Details': ['OrderID', 'ProductID']
+}
+
+CDC_STATE_FILE = STATE_PATH / 'cdc_state.json'
+
+# Limite de paramètres par requête (SQL Server accepte 2100 paramètres)
+IN_BATCH_SIZE = 500
+
+
+class ChangeTrackingSource:
+    """Source de changements basée sur CHANGETABLE(CHANGES ...)"""
+
+    def __init__(self, connection, tables=None):
+        self.connection = connection
+        self.tables = tables or TRACKED_TABLES
+
+    def _query(self, sql, params=()):
+        cursor = self.connection.cursor()
+        cursor.execute(sql, list(params))
+        columns = [c[0] for c in cursor.description]
+        rows = cursor.fetchall()
+        cursor.close()
+        return pd.DataFrame.from_records([tuple(r) for r in rows], columns=columns)
+
+    def current_version(self):
+        """Version courante du suivi des modifications"""
+        df = self._query("SELECT CHANGE_TRACKING_CURRENT_VERSION() AS Version")
+        return int(df['Version'].iloc[0])
+
+    def min_valid_version(self, table):
+        """Plus petite version encore disponible (purge automatique)"""
+        df = self._query(
+            "SELECT CHANGE_TRACKING_MIN_VALID_VERSION(OBJECT_ID(?)) AS Version",
+            [table]
+        )
+        return int(df['Version'].iloc[0])
+
+    def changed_keys(self, table, since):
+        """Clés modifiées depuis une version, avec l'opération (I, U ou D)"""
+        keys = self.tables[table]
+        key_list = ', '.join(f'ct.[{k}]' for k in keys)
+        df = self._query(
+            f"SELECT ct.SYS_CHANGE_OPERATION AS Operation, {key_list} "
+            f"FROM CHANGETABLE(CHANGES [{table}], ?) AS ct",
+            [since]
+        )
+        return df
+
+    def fetch_rows(self, table, key, values, columns=None, where=None):
+        """Lire les lignes courantes pour une liste de valeurs de clé
+
+        columns et where reprennent les options d'extraction de la table
+        (colonnes projetées, filtre) pour relire les mêmes données.
+        """
+        values = list(values)
+        selected = ', '.join(f'[{c}]' for c in columns) if columns else '*'
+        condition = f" AND ({where})" if where else ''
+        frames = []
+        for start in range(0, len(values), IN_BATCH_SIZE):
+            batch = values[start:start + IN_BATCH_SIZE]
+            placeholders = ', '.join('?' * len(batch))
+            frames.append(self._query(
+                f"SELECT {selected} FROM [{table}] WHERE [{key}] IN ({placeholders}){condition}",
+                batch
+            ))
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def poll(self, since):
+        """Récupérer les OrderID touchés depuis une version donnée
+
+        Retourne (nouvelle_version, order_ids) ou (nouvelle_version, None)
+        si la version demandée a été purgée et qu'un rechargement complet
+        est nécessaire.
+        """
+        version = self.current_version()
+        for table in self.tables:
+            if since < self.min_valid_version(table):
+                logger.warning(f"⚠️ Version {since} purgée pour '{table}': rechargement complet requis")
+                return version, None
+
+        order_ids = set()
+        for table in self.tables:
+            changes = self.changed_keys(table, since)
+            if not changes.empty:
+                counts = changes['Operation'].value_counts().to_dict()
+                logger.info(f"🔄 {table}: {counts}")
+                order_ids.update(int(v) for v in changes['OrderID'].unique())
+        return version, order_ids
+
+
+def load_cdc_state(path=None):
+    """Lire la dernière version synchronisée (None si jamais synchronisé)"""
+    path = path or CDC_STATE_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f).get('last_version')
+    except FileNotFoundError:
+        return None
+
+
+def save_cdc_state(version, path=None):
+    """Mémoriser la dernière version synchronisée"""
+    path = path or CDC_STATE_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'last_version': int(version)}, f)
@@ -16,8 +16,11 @@ REPORTS_PATH = PROJECT_ROOT / 'reports'
 FIGURES_PATH = PROJECT_ROOT / 'figures'
 NOTEBOOKS_PATH = PROJECT_ROOT / 'notebooks'
 
+# État persistant entre deux exécutions de l'ETL (CDC, agrégats incrémentaux...)
+STATE_PATH = DATA_PATH / '_state'
+
 # Créer les dossiers s'ils n'existent pas
-for path in [DATA_PATH, SCRIPTS_PATH, REPORTS_PATH, FIGURES_PATH, NOTEBOOKS_PATH]:
+for path in [DATA_PATH, SCRIPTS_PATH, REPORTS_PATH, FIGURES_PATH, NOTEBOOKS_PATH, STATE_PATH]:
     path.mkdir(exist_ok=True)
 
 # =============================================================================
@@ -50,6 +53,98 @@ ACCESS_DB_CONFIG = {
     # '{Microsoft Access Driver (*.mdb)}' pour les anciens fichiers
 }
 
+# =============================================================================
+# DÉFINITION DES PIPELINES (SOURCES, TABLES, TRANSFORMATIONS, SORTIES)
+# =============================================================================
+
+# Options d'une table (toutes facultatives, voir extraction.TABLE_DEFAULTS):
+#   'enabled': False pour ne pas extraire la table
+#   'columns': colonnes lues (None: colonnes utiles en aval, '*': toutes)
+#   'where': filtre SQL sans le mot-clé WHERE, ex. "OrderDate >= '1997-01-01'"
+#   'batch_size': lignes lues par lot (None: en une fois)
+#   'incremental_key': clé des lignes relues par la capture des changements
+NORTHWIND_TABLES = {
+    'Categories': {},
+    'Customers': {},
+    'Employees': {},
+    'Orders': {'incremental_key': 'OrderID'},
+    'Order Details': {'incremental_key': 'OrderID', 'batch_size': 50_000},
+    'Products': {},
+    'Shippers': {},
+    'Suppliers': {},
+    'Region': {},
+    'Territories': {}
+}
+
+NORTHWIND_PIPELINE = {
+    'source': SQL_SERVER_CONFIG,
+    'tables': NORTHWIND_TABLES,
+    # Étapes de NorthwindETL.TRANSFORM_STEPS à ne pas exécuter
+    'disabled_transforms': [],
+    # Tables calculées mais non publiées, retirées de la version publiée
+    # (Fact_Sales et les *_History servent aux exécutions incrémentales et
+    # doivent rester publiées)
+    'disabled_outputs': []
+}
+
+ACCESS_PIPELINE = {
+    'source': ACCESS_DB_CONFIG,
+    'tables': {table: {} for table in NORTHWIND_TABLES},
+    'disabled_outputs': []
+}
+
+# =============================================================================
+# DATE D'ARRÊTÉ DES TRANSFORMATIONS
+# =============================================================================
+
+# Date de référence commune à toutes les transformations (ancienneté, dates
+# d'effet des dimensions historisées). 'AAAA-MM-JJ', ou None pour la date du
+# jour: deux exécutions avec la même date et les mêmes sources produisent des
+# fichiers identiques.
+SNAPSHOT_DATE = None
+
+# =============================================================================
+# COMPTAGES DISTINCTS APPROXIMATIFS (HYPERLOGLOG)
+# =============================================================================
+
+HLL_CONFIG = {
+    'enabled': True,
+    # Précision p: 2^p registres, erreur relative ~ 1.04 / sqrt(2^p)
+    # (p=11 -> ~2.3%, p=14 -> ~0.8%)
+    'precision': 11,
+    # Grain le plus fin des sketches: toute combinaison de ces axes se fusionne
+    'grain': ['Year', 'Month', 'Country'],
+    'columns': ['OrderID', 'CustomerID', 'ProductID']
+}
+
+# =============================================================================
+# PUBLICATION DES DONNÉES (VERSIONS + POINTEUR current.json)
+# =============================================================================
+
+DATASET_CONFIG = {
+    # None, 'gzip' (lisible par le dashboard web) ou 'zstd' (module zstandard requis)
+    'compression': None,
+    # Lignes écrites par bloc dans le fichier temporaire
+    'chunksize': 50_000,
+    # Tables écrites en parallèle
+    'max_workers': 4,
+    # Versions conservées dans data/_versions/ (lecteurs encore en cours)
+    'keep_versions': 3
+}
+
+# =============================================================================
+# INTÉGRITÉ RÉFÉRENTIELLE DES SORTIES
+# =============================================================================
+
+INTEGRITY_CONFIG = {
+    # Arrêter l'ETL (aucune version publiée) si une clé étrangère est orpheline
+    'fail_on_orphans': False,
+    # Clés orphelines citées dans le journal pour chaque relation
+    'sample_size': 5,
+    # Lignes comparées par bloc (mémoire bornée sur les très gros faits)
+    'chunksize': 5_000_000
+}
+
 # =============================================================================
 # CONFIGURATION VISUALISATION
 # =============================================================================
@@ -71,7 +166,11 @@ CHART_CONFIG = {
     'dpi': 100,
     'style': 'seaborn-v0_8-whitegrid',
     'font_size': 10,
-    'title_size': 14
+    'title_size': 14,
+    # Classes des histogrammes (valeurs pré-agrégées avec NumPy)
+    'bins': 50,
+    # Processus de rendu des graphiques statiques (visualization.py)
+    'max_workers': 4
 }
 
 # =============================================================================
@@ -4,6 +4,16 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+import sys
+from fact_store import has_store, open_store, store_columns
+from hll import merge_all
+from query import query
+from dataset import resolve_directory, resolve_table, table_hashes
+from data_access import TABLE_SCHEMAS
+from money import amount_cents, from_cents, sum_cents
+from marts import customer_rfm, sales_timeseries
+from config import SNAPSHOT_DATE
+from geography import iso3, region_group
 
 # =============================================================================
 # CONFIGURATION
@@ -19,45 +29,136 @@ os.makedirs(FIGURES_PATH, exist_ok=True)
 # CHARGEMENT DES DONNÉES
 # =============================================================================
 
+
+class DataCatalog:
+    """Catalogue paresseux des tables: chargement au premier accès puis mémorisation"""
+
+    def __init__(self, data_path=DATA_PATH, schemas=None, store_path=None):
+        self.data_path = data_path
+        self.store_path = store_path
+        self.schemas = schemas or TABLE_SCHEMAS
+        self._cache = {}
+        self._headers = {}
+        self._hashes = {}
+
+    def __getitem__(self, name):
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self.schemas
+
+    def get(self, name, columns=None):
+        """Retourner une table (colonnes demandées uniquement), chargée à la demande"""
+        self._invalidate_if_changed(name)
+        schema = self.schemas.get(name, {})
+        header = self._header(name)
+        if header is None:
+            return pd.DataFrame()
+
+        if columns is None:
+            columns = schema.get('columns', header)
+        requested = [c for c in columns if c in header]
+
+        cached = self._cache.get(name)
+        if cached is not None and set(requested) <= set(cached.columns):
+            return cached[requested]
+
+        # Recharger avec l'union des colonnes déjà demandées et des nouvelles
+        columns = requested
+        if cached is not None:
+            columns = list(dict.fromkeys(list(cached.columns) + requested))
+
+        df = self._read(name, columns, schema)
+        self._cache[name] = df
+        return df[requested]
+
+    def _invalidate_if_changed(self, name):
+        """Oublier une table dont l'empreinte a changé depuis son chargement (nouvelle version publiée)"""
+        content_hash = table_hashes(self.data_path).get(name)
+        if name in self._hashes and self._hashes[name] != content_hash:
+            self._cache.pop(name, None)
+            self._headers.pop(name, None)
+        self._hashes[name] = content_hash
+
+    def _path(self, name):
+        return resolve_table(self.data_path, name)
+
+    def _store_path(self):
+        """Stockage colonnaire de la version publiée (sauf chemin imposé)"""
+        return self.store_path or resolve_directory(self.data_path, 'fact_store')
+
+    def _header(self, name):
+        """Lire (une seule fois) l'en-tête d'un CSV, None si le fichier est absent"""
+        if name not in self._headers:
+            filepath = self._path(name)
+            if has_store(name, self._store_path()):
+                self._headers[name] = store_columns(name, self._store_path())
+            elif os.path.exists(filepath):
+                self._headers[name] = list(
+                    pd.read_csv(filepath, nrows=0, encoding='utf-8-sig').columns
+                )
+            else:
+                print(f"⚠️ {name} non trouvé")
+                self._headers[name] = None
+        return self._headers[name]
+
+    def _read(self, name, columns, schema):
+        """Lire un CSV avec projection de colonnes et types déclarés"""
+        # Stockage colonnaire disponible: simple mmap, partagé entre processus
+        store_path = self._store_path()
+        if has_store(name, store_path):
+            df = open_store(name, columns, store_path)
+            print(f"✅ {name} mappé en mémoire: {len(df)} lignes, {len(df.columns)} colonnes")
+            return df
+
+        df = query(
+            name,
+            columns=columns,
+            dtype=schema.get('dtype'),
+            parse_dates=schema.get('parse_dates'),
+            data_path=self.data_path
+        )
+        print(f"✅ {name} chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+        return df[columns]
+
+    def loaded_tables(self):
+        """Lister les tables déjà chargées en mémoire"""
+        return list(self._cache)
+
+
 def load_data():
-    """Charger les données depuis les fichiers CSV"""
-    data = {}
-    
-    files = [
-        'Fact_Sales', 'Dim_Customers', 'Dim_Products', 'Dim_Employees',
-        'Sales_By_Month', 'Sales_By_Category', 'Sales_By_Country', 'Top_Products'
-    ]
-    
-    for file in files:
-        filepath = f'{DATA_PATH}{file}.csv'
-        if os.path.exists(filepath):
-            data[file] = pd.read_csv(filepath)
-            print(f"✅ {file} chargé: {len(data[file])} lignes")
-        else:
-            print(f"⚠️ {file} non trouvé")
-            data[file] = pd.DataFrame()
-    
-    # Convertir les dates
-    if not data['Fact_Sales'].empty:
-        data['Fact_Sales']['OrderDate'] = pd.to_datetime(data['Fact_Sales']['OrderDate'])
-    
-    return data
+    """Créer le catalogue des données (les CSV sont lus à la demande)"""
+    return DataCatalog(DATA_PATH)
 
 # =============================================================================
 # CALCUL DES KPIs
 # =============================================================================
 
-def calculate_kpis(data):
-    """Calculer les indicateurs clés"""
-    fact_sales = data['Fact_Sales']
+def calculate_kpis(data, approximate=False):
+    """Calculer les indicateurs clés
+
+    approximate=True lit les résumés et les sketches HyperLogLog au lieu de
+    parcourir Fact_Sales (comptages distincts estimés).
+    """
+    if approximate:
+        kpis = calculate_approx_kpis(data)
+        if kpis:
+            return kpis
+
+    fact_sales = data.get(
+        'Fact_Sales',
+        ['OrderID', 'CustomerID', 'ProductID', 'Quantity', 'TotalAmount', 'TotalAmountCents']
+    )
     
     if fact_sales.empty:
         return {}
     
+    # Chiffre d'affaires sommé en centimes entiers (exact, indépendant de l'ordre)
+    revenue_cents = sum_cents(amount_cents(fact_sales))
     kpis = {
-        'total_revenue': fact_sales['TotalAmount'].sum(),
+        'total_revenue': from_cents(revenue_cents),
         'total_orders': fact_sales['OrderID'].nunique(),
-        'avg_order_value': fact_sales['TotalAmount'].sum() / fact_sales['OrderID'].nunique(),
+        'avg_order_value': from_cents(revenue_cents) / fact_sales['OrderID'].nunique(),
         'total_quantity': fact_sales['Quantity'].sum(),
         'total_customers': fact_sales['CustomerID'].nunique(),
         'total_products': fact_sales['ProductID'].nunique()
@@ -65,29 +166,136 @@ def calculate_kpis(data):
     
     return kpis
 
+def calculate_approx_kpis(data):
+    """KPIs à partir de Sales_By_Month et Sketches_Sales (sans lecture des faits)"""
+    sales_by_month = data['Sales_By_Month']
+    sketches = data['Sketches_Sales']
+    
+    if sales_by_month.empty or sketches.empty:
+        return {}
+    
+    total_revenue = from_cents(sum_cents(amount_cents(sales_by_month, 'TotalSales')))
+    total_orders = distinct_count(data, 'OrderID')
+    
+    return {
+        'total_revenue': total_revenue,
+        'total_orders': total_orders,
+        'avg_order_value': total_revenue / max(total_orders, 1),
+        'total_quantity': sales_by_month['TotalQuantity'].sum(),
+        'total_customers': distinct_count(data, 'CustomerID'),
+        'total_products': distinct_count(data, 'ProductID')
+    }
+
+def fact_orders(data):
+    """Une ligne par (client, commande) calculée depuis Fact_Sales (repli si un mart n'est pas publié)"""
+    fact_sales = data.get('Fact_Sales', ['CustomerID', 'OrderID', 'OrderDate', 'Quantity',
+                                         'TotalAmount', 'TotalAmountCents'])
+    if fact_sales.empty:
+        return pd.DataFrame()
+    
+    orders = fact_sales.assign(TotalAmountCents=amount_cents(fact_sales))
+    return orders.groupby(['CustomerID', 'OrderDate', 'OrderID'], observed=True, as_index=False)[
+        ['TotalAmountCents', 'Quantity']
+    ].sum()
+
+def load_customer_rfm(data):
+    """Customer_RFM publiée, sinon recalculée depuis Fact_Sales (mêmes règles, marts.py)"""
+    rfm = data['Customer_RFM']
+    if not rfm.empty:
+        return rfm
+    orders = fact_orders(data)
+    if orders.empty:
+        return rfm
+    as_of = SNAPSHOT_DATE or orders['OrderDate'].max()
+    return customer_rfm(orders, as_of, data.get('Dim_Customers', ['CustomerID', 'CompanyName', 'Country']))
+
+def load_sales_timeseries(data):
+    """Sales_Timeseries publiée, sinon recalculée depuis Fact_Sales (mêmes règles, marts.py)"""
+    series = data['Sales_Timeseries']
+    if not series.empty:
+        return series
+    orders = fact_orders(data)
+    return sales_timeseries(orders) if not orders.empty else series
+
+def load_timeseries(data, grain='Month'):
+    """Série d'un grain (Day, Week, Month, Quarter) de Sales_Timeseries"""
+    series = load_sales_timeseries(data)
+    if series.empty:
+        return series
+    return series[series['Grain'] == grain].reset_index(drop=True)
+
+def period_deltas(data, grain='Month'):
+    """Variations de la dernière période complète (simple lecture de Sales_Timeseries)"""
+    series = load_sales_timeseries(data)
+    if series.empty:
+        return {}
+    last_day = series['PeriodEnd'][series['Grain'] == 'Day'].max()
+    complete = series[(series['Grain'] == grain) & (series['PeriodEnd'] <= last_day)]
+    if complete.empty:
+        return {}
+    latest = complete.iloc[-1]
+    return {
+        'period': latest['Period'],
+        'total_revenue': (latest['TotalSales_PoP'], latest['TotalSales_YoY']),
+        'total_orders': (latest['OrderCount_PoP'], latest['OrderCount_YoY']),
+        'avg_order_value': (latest['AvgOrderValue_PoP'], latest['AvgOrderValue_YoY'])
+    }
+
+def distinct_count(data, column, years=None, months=None, countries=None):
+    """Estimer le nombre de valeurs distinctes pour une tranche quelconque
+
+    Les sketches (un par Année x Mois x Pays) de la tranche sont fusionnés:
+    aucune relecture de Fact_Sales n'est nécessaire.
+    """
+    sketches = data['Sketches_Sales']
+    if sketches.empty:
+        return 0
+    
+    mask = pd.Series(True, index=sketches.index)
+    if years is not None:
+        mask &= sketches['Year'].isin(years)
+    if months is not None:
+        mask &= sketches['Month'].isin(months)
+    if countries is not None:
+        mask &= sketches['Country'].isin(countries)
+    
+    return merge_all(sketches.loc[mask, f'{column}_HLL'].dropna()).count()
+
 # =============================================================================
 # CRÉATION DES GRAPHIQUES
 # =============================================================================
 
-def create_kpi_cards(kpis):
-    """Créer les cartes KPI"""
+def format_delta(change):
+    """Variation relative affichée avec sa flèche (n/d si la période de référence manque)"""
+    if pd.isna(change):
+        return 'n/d'
+    return f"{'▲' if change >= 0 else '▼'} {abs(change):.1%}"
+
+def create_kpi_cards(kpis, deltas=None):
+    """Créer les cartes KPI (variations de la dernière période si deltas est fourni)"""
+    deltas = deltas or {}
     fig = make_subplots(
         rows=2, cols=3,
         specs=[[{'type': 'indicator'}]*3, [{'type': 'indicator'}]*3]
     )
     
     indicators = [
-        ('💰 Chiffre d\'affaires', kpis.get('total_revenue', 0), '$', ',.0f'),
-        ('📋 Commandes', kpis.get('total_orders', 0), '', ','),
-        ('💵 Panier moyen', kpis.get('avg_order_value', 0), '$', ',.2f'),
-        ('📦 Quantité vendue', kpis.get('total_quantity', 0), '', ','),
-        ('👥 Clients actifs', kpis.get('total_customers', 0), '', ','),
-        ('🛒 Produits vendus', kpis.get('total_products', 0), '', ',')
+        ('💰 Chiffre d\'affaires', 'total_revenue', '$', ',.0f'),
+        ('📋 Commandes', 'total_orders', '', ','),
+        ('💵 Panier moyen', 'avg_order_value', '$', ',.2f'),
+        ('📦 Quantité vendue', 'total_quantity', '', ','),
+        ('👥 Clients actifs', 'total_customers', '', ','),
+        ('🛒 Produits vendus', 'total_products', '', ',')
     ]
     
     positions = [(1,1), (1,2), (1,3), (2,1), (2,2), (2,3)]
     
-    for (title, value, prefix, fmt), (row, col) in zip(indicators, positions):
+    for (title, key, prefix, fmt), (row, col) in zip(indicators, positions):
+        value = kpis.get(key, 0)
+        if key in deltas:
+            pop, yoy = deltas[key]
+            title += (f"<br><span style='font-size:11px'>{deltas['period']}: "
+                      f"{format_delta(pop)} vs période préc., {format_delta(yoy)} sur un an</span>")
         fig.add_trace(
             go.Indicator(
                 mode='number',
@@ -108,22 +316,21 @@ def create_kpi_cards(kpis):
 
 def create_sales_trend(data):
     """Créer le graphique d'évolution des ventes"""
-    fact_sales = data['Fact_Sales']
+    # Série mensuelle précalculée par l'ETL (marts.py), recalculée depuis les faits à défaut
+    monthly_sales = load_timeseries(data, 'Month')
     
-    if fact_sales.empty:
+    if monthly_sales.empty:
         return go.Figure()
     
-    monthly_sales = fact_sales.groupby(
-        fact_sales['OrderDate'].dt.to_period('M')
-    )['TotalAmount'].sum().reset_index()
-    monthly_sales['OrderDate'] = monthly_sales['OrderDate'].astype(str)
-    
     fig = px.area(
         monthly_sales,
-        x='OrderDate',
-        y='TotalAmount',
+        x='Period',
+        y='TotalSales',
+        hover_data={'TotalSales_PoP': ':.1%', 'TotalSales_YoY': ':.1%', 'CumulativeSales': ':,.0f'},
         title='📈 Évolution mensuelle du chiffre d\'affaires',
-        labels={'OrderDate': 'Période', 'TotalAmount': 'Ventes ($)'}
+        labels={'Period': 'Période', 'TotalSales': 'Ventes ($)',
+                'TotalSales_PoP': 'vs mois préc.', 'TotalSales_YoY': 'sur un an',
+                'CumulativeSales': 'Cumul ($)'}
     )
     
     fig.update_layout(template='plotly_white')
@@ -205,20 +412,35 @@ def create_country_chart(data):
     return fig
 
 def create_world_map(data):
-    """Créer la carte mondiale des ventes"""
-    sales_by_country = data['Sales_By_Country']
-    
-    if sales_by_country.empty:
-        return go.Figure()
+    """Créer la carte mondiale des ventes (pays déjà codés en ISO-3 par l'ETL)"""
+    sales_by_geo = data['Sales_By_Geo']
+    
+    if not sales_by_geo.empty:
+        sales_by_country = sales_by_geo[sales_by_geo['Level'] == 'Country']
+        hover_data = {'ISO3': False, 'Region_Group': True, 'OrderCount': True,
+                      'CustomerCount': True}
+    else:
+        # Sales_By_Geo non publiée: Sales_By_Country codée ici (geography.py)
+        sales_by_country = data['Sales_By_Country']
+        if sales_by_country.empty:
+            return go.Figure()
+        sales_by_country = sales_by_country.assign(ISO3=iso3(sales_by_country['Country']))
+        sales_by_country['Region_Group'] = region_group(sales_by_country['ISO3'])
+        hover_data = {'ISO3': False, 'Region_Group': True, 'OrderCount': True}
+    
+    sales_by_country = sales_by_country.dropna(subset=['ISO3'])
     
     fig = px.choropleth(
         sales_by_country,
-        locations='Country',
-        locationmode='country names',
+        locations='ISO3',
+        locationmode='ISO-3',
         color='TotalSales',
+        hover_name='Country',
+        hover_data=hover_data,
         color_continuous_scale='Blues',
         title='🗺️ Carte mondiale des ventes',
-        labels={'TotalSales': 'Ventes ($)'}
+        labels={'TotalSales': 'Ventes ($)', 'Region_Group': 'Région',
+                'OrderCount': 'Commandes', 'CustomerCount': 'Clients'}
     )
     
     fig.update_layout(template='plotly_white')
@@ -247,6 +469,33 @@ def create_top_products_chart(data):
     fig.update_layout(template='plotly_white', height=500)
     return fig
 
+def create_rfm_chart(data):
+    """Créer le graphique des segments clients (Customer_RFM précalculée par l'ETL)"""
+    rfm = load_customer_rfm(data)
+    
+    if rfm.empty:
+        return go.Figure()
+    
+    segments = rfm.groupby('Segment', observed=True).agg(
+        Customers=('CustomerID', 'size'),
+        Monetary=('Monetary', 'sum')
+    ).reset_index().sort_values('Monetary', ascending=True)
+    
+    fig = px.bar(
+        segments,
+        x='Monetary',
+        y='Segment',
+        orientation='h',
+        color='Customers',
+        color_continuous_scale='Blues',
+        text='Customers',
+        title='🎯 Segments clients RFM (chiffre d\'affaires et nombre de clients)',
+        labels={'Monetary': 'Ventes ($)', 'Segment': 'Segment', 'Customers': 'Clients'}
+    )
+    
+    fig.update_layout(template='plotly_white', height=450)
+    return fig
+
 def create_complete_dashboard(data, kpis):
     """Créer le tableau de bord complet"""
     fig = make_subplots(
@@ -287,15 +536,10 @@ def create_complete_dashboard(data, kpis):
         )
     
     # Evolution mensuelle
-    fact_sales = data['Fact_Sales']
-    if not fact_sales.empty:
-        monthly = fact_sales.groupby(
-            fact_sales['OrderDate'].dt.to_period('M')
-        )['TotalAmount'].sum().reset_index()
-        monthly['OrderDate'] = monthly['OrderDate'].astype(str)
-        
+    monthly = load_timeseries(data, 'Month')
+    if not monthly.empty:
         fig.add_trace(
-            go.Bar(x=monthly['OrderDate'], y=monthly['TotalAmount'], 
+            go.Bar(x=monthly['Period'], y=monthly['TotalSales'], 
                    marker_color='steelblue'),
             row=3, col=1
         )
@@ -335,7 +579,7 @@ def save_figures(data, kpis):
     print("\n📊 Génération des graphiques...")
     
     # KPIs
-    fig_kpis = create_kpi_cards(kpis)
+    fig_kpis = create_kpi_cards(kpis, period_deltas(data))
     fig_kpis.write_html(f'{FIGURES_PATH}kpis.html')
     print("✅ kpis.html sauvegardé")
     
@@ -364,6 +608,11 @@ def save_figures(data, kpis):
     fig_products.write_html(f'{FIGURES_PATH}top_products.html')
     print("✅ top_products.html sauvegardé")
     
+    # Segments RFM
+    fig_rfm = create_rfm_chart(data)
+    fig_rfm.write_html(f'{FIGURES_PATH}customer_rfm.html')
+    print("✅ customer_rfm.html sauvegardé")
+    
     # Dashboard complet
     fig_dashboard = create_complete_dashboard(data, kpis)
     fig_dashboard.write_html(f'{FIGURES_PATH}dashboard_complet.html')
@@ -387,9 +636,9 @@ if __name__ == "__main__":
     print("📂 Chargement des données...")
     data = load_data()
     
-    # Calculer les KPIs
+    # Calculer les KPIs (--approx: sketches HyperLogLog, sans lecture des faits)
     print("\n📈 Calcul des KPIs...")
-    kpis = calculate_kpis(data)
+    kpis = calculate_kpis(data, approximate='--approx' in sys.argv)
     
     if kpis:
         print(f"\n💰 CA Total: ${kpis['total_revenue']:,.2f}")
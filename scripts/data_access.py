@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from config import DATA_PATH
+from dataset import resolve_table, table_hashes
+from money import amount_cents, from_cents, sum_cents
+from partitions import MANIFEST_FILE
+from query import query
+
+# =============================================================================
+# ACCÈS AUX SORTIES DE L'ETL (TABLES TYPÉES + CACHE DISQUE PAR VERSION)
+# =============================================================================
+#
+#   from data_access import Warehouse
+#   wh = Warehouse()
+#   fact_sales = wh['Fact_Sales']          # typée (TABLE_SCHEMAS)
+#   rfm = wh['Customer_RFM']               # tables analytiques précalculées
+#   quarters = wh.timeseries('Quarter')
+#
+# Une table est lue une fois (CSV ou partitions), typée, puis conservée en
+# pickle dans data/_cache sous une clé dérivée de son empreinte dans la
+# version publiée (current.json) : tant que l'ETL ne publie pas de nouvelle
+# version de la table, les sessions suivantes la relisent depuis le cache.
+
+CACHE_PATH = DATA_PATH / '_cache'
+
+# Schéma déclaré des tables: colonnes utiles, types et dates à parser
+TABLE_SCHEMAS = {
+    'Fact_Sales': {
+        'columns': ['OrderID', 'ProductID', 'CustomerID', 'EmployeeID',
+                    'OrderDate', 'Quantity', 'UnitPrice', 'Discount', 'TotalAmount',
+                    'TotalAmountCents'],
+        'dtype': {'OrderID': 'int64', 'ProductID': 'int64', 'CustomerID': 'category',
+                  'EmployeeID': 'Int64', 'Quantity': 'int64', 'UnitPrice': 'float64',
+                  'Discount': 'float64', 'TotalAmount': 'float64', 'TotalAmountCents': 'int64'},
+        'parse_dates': ['OrderDate']
+    },
+    'Dim_Customers': {
+        'columns': ['CustomerID', 'CompanyName', 'City', 'Country', 'Region_Group'],
+        'dtype': {'CustomerID': 'string', 'CompanyName': 'string', 'City': 'category',
+                  'Country': 'category', 'Region_Group': 'category'},
+        'parse_dates': []
+    },
+    'Dim_Products': {
+        'columns': ['ProductID', 'ProductName', 'CategoryName', 'UnitPrice', 'SupplierCountry'],
+        'dtype': {'ProductID': 'int64', 'ProductName': 'string', 'CategoryName': 'category',
+                  'UnitPrice': 'float64', 'SupplierCountry': 'category'},
+        'parse_dates': []
+    },
+    'Dim_Employees': {
+        'columns': ['EmployeeID', 'FullName', 'Title', 'Country', 'HireDate'],
+        'dtype': {'EmployeeID': 'Int64', 'FullName': 'string', 'Title': 'category',
+                  'Country': 'category'},
+        'parse_dates': ['HireDate']
+    },
+    'Sales_By_Month': {
+        'columns': ['Year', 'Month', 'TotalSales', 'OrderCount', 'TotalQuantity',
+                    'TotalSalesCents'],
+        'dtype': {'Year': 'int64', 'Month': 'int64', 'TotalSales': 'float64',
+                  'OrderCount': 'int64', 'TotalQuantity': 'int64', 'TotalSalesCents': 'int64'},
+        'parse_dates': []
+    },
+    'Sales_By_Category': {
+        'columns': ['CategoryName', 'TotalSales', 'TotalQuantity'],
+        'dtype': {'CategoryName': 'string', 'TotalSales': 'float64', 'TotalQuantity': 'int64'},
+        'parse_dates': []
+    },
+    'Sales_By_Country': {
+        'columns': ['Country', 'TotalSales', 'OrderCount'],
+        'dtype': {'Country': 'string', 'TotalSales': 'float64', 'OrderCount': 'int64'},
+        'parse_dates': []
+    },
+    'Sketches_Sales': {
+        'columns': ['Year', 'Month', 'Country', 'OrderID_HLL', 'CustomerID_HLL',
+                    'ProductID_HLL'],
+        'dtype': {'Year': 'int64', 'Month': 'int64', 'Country': 'string',
+                  'OrderID_HLL': 'string', 'CustomerID_HLL': 'string',
+                  'ProductID_HLL': 'string'},
+        'parse_dates': []
+    },
+    'Top_Products': {
+        'columns': ['ProductID', 'ProductName', 'TotalAmount', 'Quantity'],
+        'dtype': {'ProductID': 'int64', 'ProductName': 'string', 'TotalAmount': 'float64',
+                  'Quantity': 'int64'},
+        'parse_dates': []
+    },
+    'Customer_RFM': {
+        'columns': ['CustomerID', 'CompanyName', 'Country', 'Recency', 'Frequency',
+                    'Monetary', 'R_Score', 'F_Score', 'M_Score', 'Segment'],
+        'dtype': {'CustomerID': 'string', 'CompanyName': 'string', 'Country': 'category',
+                  'Recency': 'int64', 'Frequency': 'int64', 'Monetary': 'float64',
+                  'R_Score': 'int64', 'F_Score': 'int64', 'M_Score': 'int64',
+                  'Segment': 'category'},
+        'parse_dates': []
+    },
+    'Sales_By_Geo': {
+        'columns': ['Level', 'Region_Group', 'ISO3', 'Country', 'City', 'TotalSales',
+                    'OrderCount', 'CustomerCount'],
+        'dtype': {'Level': 'category', 'Region_Group': 'category', 'ISO3': 'string',
+                  'Country': 'string', 'City': 'string', 'TotalSales': 'float64',
+                  'OrderCount': 'int64', 'CustomerCount': 'int64'},
+        'parse_dates': []
+    },
+    'Sales_Timeseries': {
+        'columns': ['Grain', 'Period', 'PeriodStart', 'PeriodEnd', 'TotalSales', 'OrderCount',
+                    'AvgOrderValue', 'TotalSales_30D', 'CumulativeSales',
+                    'TotalSales_PoP', 'OrderCount_PoP', 'AvgOrderValue_PoP',
+                    'TotalSales_YoY', 'OrderCount_YoY', 'AvgOrderValue_YoY'],
+        'dtype': {'Grain': 'category', 'Period': 'string', 'TotalSales': 'float64',
+                  'OrderCount': 'int64', 'AvgOrderValue': 'float64',
+                  'TotalSales_30D': 'float64', 'CumulativeSales': 'float64',
+                  'TotalSales_PoP': 'float64', 'OrderCount_PoP': 'float64',
+                  'AvgOrderValue_PoP': 'float64', 'TotalSales_YoY': 'float64',
+                  'OrderCount_YoY': 'float64', 'AvgOrderValue_YoY': 'float64'},
+        'parse_dates': ['PeriodStart', 'PeriodEnd']
+    }
+}
+
+
+class Warehouse:
+    """Tables de sortie de l'ETL, typées et mises en cache (mémoire puis disque)"""
+
+    def __init__(self, data_path=DATA_PATH, cache_path=CACHE_PATH, schemas=None):
+        self.data_path = Path(data_path)
+        self.cache_path = Path(cache_path)
+        self.schemas = schemas or TABLE_SCHEMAS
+        self._frames = {}
+
+    def __getitem__(self, name):
+        return self.table(name)
+
+    def version(self):
+        """Version publiée du jeu de données (None pour des CSV non versionnés)"""
+        try:
+            with open(self.data_path / 'current.json', encoding='utf-8') as f:
+                return json.load(f)['version']
+        except FileNotFoundError:
+            return None
+
+    def cache_key(self, name):
+        """Clé de cache: empreinte publiée de la table (sinon date et taille du fichier) et schéma"""
+        content = table_hashes(self.data_path).get(name)
+        if content is None:
+            source = self.data_path / name / MANIFEST_FILE
+            if not source.exists():
+                source = resolve_table(self.data_path, name)
+            if not source.exists():
+                return None
+            stat = source.stat()
+            content = f'{stat.st_mtime_ns}-{stat.st_size}'
+        schema = json.dumps(self.schemas.get(name, {}), sort_keys=True, default=str)
+        return hashlib.sha1(f'{name}|{content}|{schema}'.encode()).hexdigest()[:16]
+
+    def table(self, name, columns=None):
+        """Retourner une table typée (toutes ses colonnes, ou celles demandées)"""
+        key = self.cache_key(name)
+        if key is None:
+            print(f"⚠️ {name} non trouvé")
+            return pd.DataFrame()
+
+        cached = self._frames.get(name)
+        if cached is None or cached[0] != key:
+            self._frames[name] = (key, self._load(name, key))
+        df = self._frames[name][1]
+        return df if columns is None else df[list(columns)]
+
+    def _load(self, name, key):
+        """Relire le cache disque de la table, ou la lire et l'y déposer"""
+        path = self.cache_path / f'{name}-{key}.pkl'
+        if path.exists():
+            df = pd.read_pickle(path)
+            print(f"♻️ {name} lu depuis le cache: {len(df)} lignes")
+            return df
+
+        schema = self.schemas.get(name, {})
+        df = query(name, dtype=schema.get('dtype'), parse_dates=schema.get('parse_dates'),
+                   data_path=self.data_path)
+        print(f"✅ {name} chargé: {len(df)} lignes, {len(df.columns)} colonnes")
+
+        # Écriture atomique, puis suppression des entrées périmées de la table
+        self.cache_path.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        df.to_pickle(tmp)
+        os.replace(tmp, path)
+        for stale in self.cache_path.glob(f'{name}-*.pkl'):
+            if stale != path:
+                stale.unlink(missing_ok=True)
+        return df
+
+    def clear_cache(self):
+        """Vider les caches mémoire et disque"""
+        self._frames = {}
+        for path in self.cache_path.glob('*.pkl'):
+            path.unlink(missing_ok=True)
+
+    # -------------------------------------------------------------------------
+    # Tables analytiques précalculées par l'ETL (marts.py)
+    # -------------------------------------------------------------------------
+
+    def timeseries(self, grain='Month'):
+        """Série Sales_Timeseries d'un grain (Day, Week, Month, Quarter)"""
+        series = self.table('Sales_Timeseries')
+        if series.empty:
+            return series
+        return series[series['Grain'] == grain].reset_index(drop=True)
+
+    def geo(self, level='Country'):
+        """Ventes Sales_By_Geo d'un niveau (Region, Country, City)"""
+        geo = self.table('Sales_By_Geo')
+        if geo.empty:
+            return geo
+        return geo[geo['Level'] == level].reset_index(drop=True)
+
+    def kpis(self):
+        """Indicateurs clés (chiffre d'affaires sommé en centimes entiers)"""
+        fact_sales = self.table('Fact_Sales')
+        if fact_sales.empty:
+            return {}
+        revenue = from_cents(sum_cents(amount_cents(fact_sales)))
+        orders = fact_sales['OrderID'].nunique()
+        return {
+            'total_revenue': revenue,
+            'total_orders': orders,
+            'avg_order_value': revenue / max(orders, 1),
+            'total_quantity': int(fact_sales['Quantity'].sum()),
+            'total_customers': fact_sales['CustomerID'].nunique(),
+            'total_products': fact_sales['ProductID'].nunique()
+        }
@@ -0,0 +1,363 @@
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from config import DATA_PATH, DATASET_CONFIG
+
+# =============================================================================
+# PUBLICATION ATOMIQUE DU JEU DE DONNÉES (VERSIONS + POINTEUR current.json)
+# =============================================================================
+#
+#   data/
+#   ├── current.json                 # version publiée + fichier de chaque table
+#   └── _versions/
+#       ├── 20250101T120000000000/   # version complète, jamais modifiée
+#       └── .20250102T120000000000.tmp/   # version en cours d'écriture
+#
+# Les tables sont écrites par blocs dans un dossier temporaire (en parallèle,
+# éventuellement compressées), puis le dossier est renommé et current.json
+# remplacé d'un seul coup : un lecteur voit l'ancienne ou la nouvelle version,
+# jamais un fichier à moitié écrit.
+#
+# Chaque table est décrite dans le manifeste par son empreinte de contenu, son
+# nombre de lignes et son schéma. L'empreinte porte sur le texte CSV non
+# compressé, et non sur les types en mémoire ni sur les octets du fichier
+# (l'en-tête gzip contient une date) : une table relue du CSV (int64 au lieu
+# de int32, Int64 au lieu de int64...) garde la même empreinte si son contenu
+# publié est identique. Une table dont l'empreinte n'a pas changé
+# n'est pas réécrite : l'empreinte est calculée avant d'ouvrir le fichier, qui
+# devient un lien physique vers la version précédente. Les caches en aval (figures, requêtes) peuvent se baser sur ces
+# empreintes pour savoir ce qui a réellement changé.
+#
+# Les sorties en dossier (Fact_Sales partitionnée, fact_store) sont écrites
+# dans la version en cours, initialisées par liens physiques depuis la version
+# publiée : une exécution interrompue ne modifie jamais ce que voient les
+# lecteurs, qui les localisent via current.json (resolve_directory).
+#
+# Les tables et dossiers non réécrits par une exécution sont repris de la
+# version publiée (un ETL ne publie que ses propres sorties), sauf ceux que
+# l'exécution retire explicitement (withdraw: sorties désactivées du
+# pipeline), qui disparaissent du manifeste.
+
+CURRENT_FILE = 'current.json'
+VERSIONS_DIR = '_versions'
+VERSION_MANIFEST = '_dataset.json'
+
+EXTENSIONS = {None: '.csv', 'gzip': '.csv.gz', 'zstd': '.csv.zst'}
+
+
+def _open_text(path, compression):
+    """Ouvrir un fichier texte en écriture, compressé ou non"""
+    if compression is None:
+        return open(path, 'w', newline='', encoding='utf-8-sig')
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', newline='', encoding='utf-8-sig', compresslevel=6)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("La compression zstd nécessite le module 'zstandard' (pip install zstandard)")
+        stream = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+        return io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    raise ValueError(f"Compression inconnue: {compression}")
+
+
+def csv_chunks(df, chunksize=50_000):
+    """Texte CSV d'un DataFrame, bloc par bloc (en-tête dans le premier bloc)"""
+    for start in range(0, max(len(df), 1), chunksize):
+        yield df.iloc[start:start + chunksize].to_csv(header=start == 0, index=False)
+
+
+def frame_hash(df, chunksize=50_000):
+    """Empreinte du contenu publié d'un DataFrame (texte CSV, indépendant des types en mémoire)"""
+    digest = hashlib.sha256()
+    for text in csv_chunks(df, chunksize):
+        digest.update(text.encode('utf-8'))
+    return 'csv-sha256:' + digest.hexdigest()
+
+
+class HashingWriter(io.TextIOBase):
+    """Flux texte qui calcule l'empreinte CSV (frame_hash) de ce qui y est écrit"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.digest = hashlib.sha256()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        self.digest.update(text.encode('utf-8'))
+        return self.stream.write(text)
+
+    def hexdigest(self):
+        return 'csv-sha256:' + self.digest.hexdigest()
+
+
+def _link_or_copy(source, target):
+    """Lien physique (aucune donnée recopiée), copie si le système de fichiers le refuse"""
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def _write_json(path, payload):
+    """Écrire un JSON de façon atomique (fichier temporaire puis renommage)"""
+    tmp = Path(path).with_name(f'.{Path(path).name}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def read_current(root=DATA_PATH):
+    """Lire le pointeur de la version publiée (None si aucune version)"""
+    try:
+        with open(Path(root) / CURRENT_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def resolve_table(root, table):
+    """Chemin du fichier d'une table dans la version publiée (à défaut data/<table>.csv)"""
+    root = Path(root)
+    current = read_current(root)
+    if current is not None and table in current['tables']:
+        return root / current['path'] / current['tables'][table]['file']
+    return root / f'{table}.csv'
+
+
+def resolve_directory(root, name):
+    """Chemin d'un dossier (partitions, stockage colonnaire) de la version publiée (à défaut data/<name>)"""
+    root = Path(root)
+    current = read_current(root)
+    if current is not None and name in current.get('directories', {}):
+        return root / current['path'] / name
+    return root / name
+
+
+def table_hashes(root=DATA_PATH):
+    """Empreintes des tables de la version publiée (clés de cache en aval)"""
+    current = read_current(root)
+    if current is None:
+        return {}
+    return {name: entry.get('hash') for name, entry in current['tables'].items()}
+
+
+class DatasetWriter:
+    """Écriture d'une nouvelle version du jeu de données, publiée atomiquement"""
+
+    def __init__(self, root=DATA_PATH, compression=None, chunksize=50_000,
+                 max_workers=4, keep_versions=3):
+        if compression not in EXTENSIONS:
+            raise ValueError(f"Compression inconnue: {compression}")
+        self.root = Path(root)
+        self.compression = compression
+        self.chunksize = chunksize
+        self.max_workers = max_workers
+        self.keep_versions = keep_versions
+        self.version = None
+        self.staging = None
+        self.previous = None
+        self.tables = {}
+        self.directories = {}
+        self.withdrawn = set()
+        self._stream_hashes = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, root=DATA_PATH):
+        return cls(root, **DATASET_CONFIG)
+
+    def begin(self):
+        """Ouvrir une nouvelle version dans un dossier temporaire"""
+        self.version = datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        self.staging = self.root / VERSIONS_DIR / f'.{self.version}.tmp'
+        self.staging.mkdir(parents=True)
+        self.previous = read_current(self.root)
+        self.tables = {}
+        self.directories = {}
+        self.withdrawn = set()
+        self._stream_hashes = {}
+        return self
+
+    def file_name(self, name):
+        return f'{name}{EXTENSIONS[self.compression]}'
+
+    @contextmanager
+    def open(self, name):
+        """Flux texte vers le fichier d'une table de la version en cours
+
+        L'empreinte du texte écrit est retenue pour register().
+        """
+        with _open_text(self.staging / self.file_name(name), self.compression) as f:
+            writer = HashingWriter(f)
+            yield writer
+        with self._lock:
+            self._stream_hashes[name] = writer.hexdigest()
+
+    def _previous_entry(self, name):
+        if self.previous is None:
+            return None
+        return self.previous['tables'].get(name)
+
+    def _unchanged(self, name, content_hash):
+        """Entrée de la version publiée si la table y a la même empreinte (et le même format)"""
+        previous = self._previous_entry(name)
+        if previous is not None and previous.get('hash') == content_hash \
+                and previous['file'] == self.file_name(name):
+            return previous
+        return None
+
+    def _reuse(self, name, entry, source=None):
+        """Reprendre le fichier d'une table de la version publiée"""
+        source = source or self.previous
+        _link_or_copy(self.root / source['path'] / entry['file'], self.staging / entry['file'])
+        with self._lock:
+            self.tables[name] = dict(entry, changed=False)
+
+    def _reuse_directory(self, name, source):
+        """Reprendre un dossier de la version publiée (liens physiques, fichier par fichier)"""
+        shutil.copytree(self.root / source['path'] / name, self.staging / name,
+                        copy_function=_link_or_copy)
+
+    def directory(self, name):
+        """Dossier d'une sortie hors CSV dans la version en cours
+
+        Initialisé avec le contenu de la version publiée, ce qui permet une
+        mise à jour partielle (partitions touchées uniquement).
+        """
+        with self._lock:
+            if name not in self.directories:
+                if self.previous is not None and name in self.previous.get('directories', {}):
+                    self._reuse_directory(name, self.previous)
+                self.directories[name] = {'path': name}
+        return self.staging / name
+
+    def withdraw(self, names):
+        """Retirer des sorties de la version en cours (non reprises de la version publiée)"""
+        with self._lock:
+            self.withdrawn.update(names)
+
+    def register(self, name, rows, schema, content_hash=None):
+        """Déclarer une table écrite dans la version en cours
+
+        Sans empreinte fournie, celle du texte écrit via open() est reprise ;
+        un fichier identique à la version publiée est remplacé par un lien vers
+        celle-ci.
+        """
+        if content_hash is None:
+            with self._lock:
+                content_hash = self._stream_hashes.pop(name)
+            previous = self._unchanged(name, content_hash)
+            if previous is not None:
+                (self.staging / self.file_name(name)).unlink()
+                self._reuse(name, previous)
+                return False
+
+        previous = self._previous_entry(name)
+        with self._lock:
+            self.tables[name] = {
+                'file': self.file_name(name),
+                'hash': content_hash,
+                'rows': int(rows),
+                'schema': {str(c): str(t) for c, t in schema.items()},
+                'changed': previous is None or previous.get('hash') != content_hash
+            }
+        return True
+
+    def write(self, name, df):
+        """Écrire un DataFrame par blocs de `chunksize` lignes
+
+        Si la version publiée contient la table, son empreinte est d'abord
+        calculée (sérialisation sans écriture) : une table identique n'ouvre
+        aucun fichier et devient un lien vers la version publiée (retourne
+        False). Sinon l'empreinte est calculée pendant l'écriture.
+        """
+        if self._previous_entry(name) is not None:
+            previous = self._unchanged(name, frame_hash(df, self.chunksize))
+            if previous is not None:
+                self._reuse(name, previous)
+                return False
+
+        with self.open(name) as f:
+            for text in csv_chunks(df, self.chunksize):
+                f.write(text)
+        with self._lock:
+            content_hash = self._stream_hashes.pop(name)
+        self.register(name, len(df), df.dtypes.to_dict(), content_hash)
+        return True
+
+    def write_all(self, tables, write=None):
+        """Écrire plusieurs tables en parallèle (write: fonction(nom, df), self.write par défaut)"""
+        write = write or self.write
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for future in [executor.submit(write, name, df) for name, df in tables.items()]:
+                future.result()
+
+    def commit(self):
+        """Publier la version: renommage du dossier puis bascule de current.json"""
+        # Tables non réécrites ni retirées par cette exécution: reprises de la
+        # version publiée (relue ici, un autre ETL a pu publier depuis begin())
+        latest = read_current(self.root)
+        if latest is not None:
+            for name, entry in latest['tables'].items():
+                if name not in self.tables and name not in self.withdrawn:
+                    self._reuse(name, entry, latest)
+            for name, entry in latest.get('directories', {}).items():
+                if name not in self.directories and name not in self.withdrawn:
+                    self._reuse_directory(name, latest)
+                    self.directories[name] = entry
+
+        manifest = {
+            'version': self.version,
+            'previous': self.previous['version'] if self.previous is not None else None,
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'compression': self.compression,
+            'tables': dict(sorted(self.tables.items())),
+            'directories': dict(sorted(self.directories.items()))
+        }
+        _write_json(self.staging / VERSION_MANIFEST, manifest)
+
+        final = self.root / VERSIONS_DIR / self.version
+        os.replace(self.staging, final)
+        _write_json(self.root / CURRENT_FILE, dict(manifest, path=f'{VERSIONS_DIR}/{self.version}'))
+        self.staging = None
+
+        self._prune()
+        return manifest
+
+    def abort(self):
+        """Abandonner la version en cours (la version publiée reste intacte)"""
+        if self.staging is not None:
+            shutil.rmtree(self.staging, ignore_errors=True)
+            self.staging = None
+
+    def publish(self, tables, withdrawn=()):
+        """Écrire et publier un ensemble de tables en une seule version (withdrawn: sorties retirées)"""
+        self.begin()
+        try:
+            self.withdraw(withdrawn)
+            self.write_all(tables)
+            return self.commit()
+        except Exception:
+            self.abort()
+            raise
+
+    def _prune(self):
+        """Supprimer les versions les plus anciennes au-delà de keep_versions"""
+        versions = sorted(
+            p for p in (self.root / VERSIONS_DIR).iterdir()
+            if p.is_dir() and not p.name.startswith('.')
+        )
+        for old in versions[:-self.keep_versions]:
+            shutil.rmtree(old, ignore_errors=True)
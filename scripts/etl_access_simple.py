@@ -1,9 +1,13 @@
 import pyodbc
+import numpy as np
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import logging
 import sys
 from config import DATA_PATH, REPORTS_PATH, ACCESS_DB_CONFIG
+from pipeline import AsyncPipeline
+from dataset import DatasetWriter
 
 # Configuration du logging
 logging.basicConfig(
@@ -33,7 +37,16 @@ class SimpleAccessETL:
         self.connection = None
         self.data = {}
         self.output_path = DATA_PATH
+        self.dataset = None  # Version du jeu de données en cours d'écriture
 
+    def open_connection(self):
+        """Ouvrir une nouvelle connexion ODBC (une par thread en mode rapide)"""
+        conn_string = (
+            f"DRIVER={self.config['driver']};"
+            f"DBQ={self.config['database_path']};"
+        )
+        return pyodbc.connect(conn_string)
+    
     def connect(self):
         """Établir la connexion à Access Database"""
         try:
@@ -43,12 +56,7 @@ class SimpleAccessETL:
                 logger.error(f"❌ Fichier Access introuvable: {db_path}")
                 return False
             
-            conn_string = (
-                f"DRIVER={self.config['driver']};"
-                f"DBQ={db_path};"
-            )
-            
-            self.connection = pyodbc.connect(conn_string)
+            self.connection = self.open_connection()
             logger.info(f"✅ Connexion à Access établie: {db_path}")
             return True
             
@@ -72,16 +80,17 @@ class SimpleAccessETL:
             logger.error(f"❌ Erreur lors de la liste des tables: {e}")
             return []
     
-    def extract_table(self, table_name):
+    def extract_table(self, table_name, connection=None):
         """Extraire les données d'une table Access"""
         try:
             query = f"SELECT * FROM [{table_name}]"
-            df = pd.read_sql(query, self.connection)
+            df = pd.read_sql(query, connection or self.connection)
             logger.info(f"✅ Table '{table_name}' extraite: {len(df)} lignes, {len(df.columns)} colonnes")
             return df
         except Exception as e:
+            # Pas de table vide à la place: la version en cours serait publiée sans elle
             logger.error(f"❌ Erreur extraction '{table_name}': {e}")
-            return pd.DataFrame()
+            raise
     
     def extract_all(self):
         """Extraire toutes les tables"""
@@ -108,21 +117,158 @@ class SimpleAccessETL:
         try:
             Path(self.output_path).mkdir(parents=True, exist_ok=True)
             
-            saved_count = 0
-            for table_name, df in self.data.items():
-                if df is not None and not df.empty:
-                    file_path = Path(self.output_path) / f'{prefix}{table_name}.csv'
-                    df.to_csv(file_path, index=False, encoding='utf-8-sig')
-                    logger.info(f"✅ {prefix}{table_name}.csv sauvegardé ({len(df)} lignes)")
-                    saved_count += 1
+            tables = {name: df for name, df in self.data.items() if df is not None and not df.empty}
+            self.dataset = DatasetWriter.from_config(self.output_path).begin()
+            try:
+                self.dataset.write_all(tables, write=lambda name, df: self.save_table(name, df, prefix))
+                manifest = self.dataset.commit()
+            except Exception:
+                self.dataset.abort()
+                raise
             
-            logger.info(f"✅ Total: {saved_count} fichiers sauvegardés")
+            logger.info(f"✅ Total: {len(tables)} fichiers sauvegardés (version {manifest['version']})")
             return True
             
         except Exception as e:
             logger.error(f"❌ Erreur lors du chargement: {str(e)}")
             return False
     
+    def save_table(self, table_name, df, prefix='access_'):
+        """Écrire une table extraite dans la version en cours"""
+        if self.dataset.write(f'{prefix}{table_name}', df):
+            logger.info(f"✅ {self.dataset.file_name(prefix + table_name)} sauvegardé ({len(df)} lignes)")
+        else:
+            logger.info(f"♻️ {self.dataset.file_name(prefix + table_name)} inchangée (lien vers la version précédente)")
+    
+    # =============================================================================
+    # EXTRACTION BRUTE RAPIDE (PAR LOTS, SANS TABLE COMPLÈTE EN MÉMOIRE)
+    # =============================================================================
+    
+    @staticmethod
+    def format_date(value):
+        """Date ou horodatage ODBC au format ISO (NULL conservé)"""
+        if value is None:
+            return None
+        return value.isoformat(sep=' ') if hasattr(value, 'hour') else value.isoformat()
+    
+    @classmethod
+    def batch_frame(cls, batch, columns):
+        """Convertir un lot de lignes ODBC en colonnes (NULL -> vide, dates ISO)"""
+        arrays = [np.array(values, dtype=object) for values in zip(*batch)]
+        iso = np.frompyfunc(cls.format_date, 1, 1)
+        for i, values in enumerate(arrays):
+            # Type de la colonne d'après sa première valeur non nulle
+            sample = next((v for v in values if v is not None), None)
+            if hasattr(sample, 'isoformat'):
+                arrays[i] = iso(values)
+        frame = pd.DataFrame(dict(enumerate(arrays)), copy=False)
+        frame.columns = columns
+        return frame
+    
+    def dump_table(self, table_name, prefix='access_', batch_size=5000):
+        """Extraire une table directement du curseur vers le CSV, par lots colonnaires"""
+        safe_name = table_name.replace(' ', '_').replace('-', '_')
+        name = f'{prefix}{safe_name}'
+        
+        connection = self.open_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT * FROM [{table_name}]")
+            columns = [c[0] for c in cursor.description]
+            
+            rows = 0
+            # Fichier de la version en cours: invisible des lecteurs jusqu'à la publication
+            with self.dataset.open(name) as f:
+                pd.DataFrame(columns=columns).to_csv(f, index=False)
+                # Chaque lot est mis en colonnes puis écrit à la suite: mémoire bornée par batch_size
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    self.batch_frame(batch, columns).to_csv(f, mode='a', header=False, index=False)
+                    rows += len(batch)
+            cursor.close()
+            
+            schema = {c[0]: getattr(c[1], '__name__', c[1]) for c in cursor.description}
+            if self.dataset.register(name, rows, schema):
+                logger.info(f"✅ {self.dataset.file_name(name)} écrit en flux ({rows} lignes, {len(columns)} colonnes)")
+            else:
+                logger.info(f"♻️ {self.dataset.file_name(name)} inchangée (lien vers la version précédente)")
+            return rows
+        finally:
+            connection.close()
+    
+    def dump_all(self, prefix='access_', max_workers=4, batch_size=5000):
+        """Extraire toutes les tables en parallèle (une connexion par thread)"""
+        logger.info("=" * 50)
+        logger.info(f"EXTRACTION BRUTE PARALLÈLE ({max_workers} threads)")
+        logger.info("=" * 50)
+        
+        Path(self.output_path).mkdir(parents=True, exist_ok=True)
+        tables = self.list_tables()
+        self.dataset = DatasetWriter.from_config(self.output_path).begin()
+        
+        results = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(self.dump_table, table, prefix, batch_size): table
+                for table in tables
+            }
+            for future in as_completed(futures):
+                table = futures[future]
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    logger.error(f"❌ Erreur extraction '{table}': {e}")
+        
+        logger.info(f"✅ Total: {len(results)}/{len(tables)} tables extraites")
+        if len(results) < len(tables):
+            # Version incomplète: la version publiée précédente reste en place
+            self.dataset.abort()
+            return False
+        self.dataset.commit()
+        return True
+    
+    # =============================================================================
+    # PIPELINE ASYNCHRONE (EXTRACTION ET ÉCRITURE EN RECOUVREMENT)
+    # =============================================================================
+    
+    def extract_with_own_connection(self, table_name):
+        """Extraire une table sur une connexion dédiée (une connexion par thread)"""
+        connection = self.open_connection()
+        try:
+            return self.extract_table(table_name, connection=connection)
+        finally:
+            connection.close()
+    
+    def run_pipeline(self, max_workers=4):
+        """Extraire les tables en parallèle et écrire chacune dès son arrivée"""
+        logger.info("=" * 50)
+        logger.info(f"PIPELINE ASYNCHRONE ({max_workers} connexions)")
+        logger.info("=" * 50)
+        
+        Path(self.output_path).mkdir(parents=True, exist_ok=True)
+        tables = self.list_tables()
+        self.dataset = DatasetWriter.from_config(self.output_path).begin()
+        pipeline = AsyncPipeline(
+            self.data,
+            extract=self.extract_with_own_connection,
+            load=self.save_table,
+            max_workers=max_workers
+        )
+        try:
+            pipeline.run([(table.replace(' ', '_').replace('-', '_'), table) for table in tables])
+            self.dataset.commit()
+        except Exception as e:
+            # Extraction ou écriture en échec: la version publiée précédente reste en place
+            logger.error(f"❌ Pipeline interrompu, version abandonnée: {e}")
+            self.dataset.abort()
+            return False
+        
+        saved = sum(1 for df in self.data.values() if df is not None and not df.empty)
+        logger.info(f"✅ Total: {saved}/{len(tables)} fichiers sauvegardés")
+        return True
+    
     def close(self):
         """Fermer la connexion à Access"""
         if self.connection:
@@ -132,19 +278,30 @@ class SimpleAccessETL:
             except Exception as e:
                 logger.error(f"❌ Erreur lors de la fermeture: {e}")
     
-    def run(self):
-        """Exécuter le pipeline ETL complet"""
+    def run(self, fast=False, pipelined=False):
+        """Exécuter le pipeline ETL complet (fast=True: extraction brute parallèle,
+        pipelined=True: extraction et écriture asynchrones en recouvrement)"""
         try:
             # Connection
             if not self.connect():
                 return False
             
-            # Extraction
-            self.extract_all()
-            
-            # Load
-            if not self.load():
-                return False
+            if fast:
+                # Extraction et écriture en flux, par lots colonnaires (jamais la table entière en mémoire)
+                if not self.dump_all():
+                    self.close()
+                    return False
+            elif pipelined:
+                if not self.run_pipeline():
+                    self.close()
+                    return False
+            else:
+                # Extraction
+                self.extract_all()
+                
+                # Load
+                if not self.load():
+                    return False
             
             logger.info("=" * 50)
             logger.info("ETL ACCESS TERMINÉ AVEC SUCCÈS")
@@ -171,9 +328,9 @@ if __name__ == "__main__":
     ╚═══════════════════════════════════════════════════════════════╝
     """)
     
-    # Créer et exécuter l'ETL
+    # Créer et exécuter l'ETL (--fast: extraction brute, --async: pipeline asynchrone)
     etl = SimpleAccessETL(ACCESS_DB_CONFIG)
-    success = etl.run()
+    success = etl.run(fast='--fast' in sys.argv, pipelined='--async' in sys.argv)
     
     if success:
         print("\n✅ Pipeline ETL Access exécuté avec succès!")
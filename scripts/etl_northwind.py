@@ -1,3 +1,4 @@
+import json
 import pyodbc
 import pandas as pd
 import numpy as np
@@ -6,7 +7,24 @@ import os
 from pathlib import Path
 import logging
 import sys
-from config import DATA_PATH, REPORTS_PATH  # 🆕 Import paths from config
+from config import DATA_PATH, REPORTS_PATH, HLL_CONFIG, NORTHWIND_PIPELINE, SNAPSHOT_DATE  # 🆕 Import paths from config
+from fact_store import write_store
+from cdc import ChangeTrackingSource, load_cdc_state, save_cdc_state
+from extraction import (disabled_steps, projected_columns, read_query, required_columns,
+                        select_query, source_tables, table_options)
+from summary_state import SUMMARY_SPECS, SummaryState, replace_groups
+from hll import group_sketches
+from partitions import write_partitioned
+from pipeline import AsyncPipeline
+from dataset import DatasetWriter, resolve_table
+from scd import lookup_version_keys, scd2_merge
+from fingerprint import (FINGERPRINT_KEYS, diff_fingerprints, load_fingerprints,
+                         row_fingerprints, save_fingerprints)
+from validation import QUARANTINE_TABLE, VALIDATION_RULES, rule_columns, validate
+from integrity import RELATIONSHIPS, check_integrity
+from money import from_cents, line_amount_cents
+from geography import dim_geography, iso3, region_group
+from marts import customer_rfm, sales_by_geo, sales_timeseries
 
 # Configuration du logging
 logging.basicConfig(
@@ -28,17 +46,7 @@ if sys.platform == 'win32':
 # CONFIGURATION
 # =============================================================================
 
-# Configuration de la connexion SQL Server
-# Modifier ces paramètres selon votre configuration
-SQL_SERVER_CONFIG = {
-    'server': 'localhost',  # SQL Server Express
-    'database': 'Northwind',
-    'driver': '{ODBC Driver 17 for SQL Server}',
-    # Pour l'authentification Windows, laisser username/password vides
-    'username': '',
-    'password': '',
-    'trusted_connection': 'yes'  # Authentification Windows
-}
+# Connexion, tables, transformations et sorties: voir NORTHWIND_PIPELINE (config.py)
 
 # Chemin de sortie des données
 OUTPUT_PATH = '../data/'
@@ -50,52 +58,139 @@ OUTPUT_PATH = '../data/'
 class NorthwindETL:
     """Classe principale pour l'ETL Northwind"""
     
-    def __init__(self, config):
-        self.config = config
+    # Transformations: (méthode, tables d'entrée, tables produites)
+    TRANSFORM_STEPS = [
+        ('validate_sources', list(VALIDATION_RULES) + ['Employees'],
+         list(VALIDATION_RULES) + [QUARANTINE_TABLE]),
+        ('create_dim_customers', ['Customers', QUARANTINE_TABLE],
+         ['Dim_Customers', 'Dim_Customers_History']),
+        ('create_dim_products', ['Products', 'Categories', 'Suppliers', QUARANTINE_TABLE],
+         ['Dim_Products', 'Dim_Products_History']),
+        ('create_dim_employees', ['Employees'], ['Dim_Employees', 'Dim_Employees_History']),
+        ('create_dim_geography', ['Dim_Customers', 'Suppliers'], ['Dim_Geography']),
+        ('create_fact_sales',
+         ['Orders', 'OrderDetails', 'Dim_Customers_History', 'Dim_Products_History',
+          'Dim_Employees_History', QUARANTINE_TABLE],
+         ['Fact_Sales']),
+        ('create_dim_time', ['Fact_Sales'], ['Dim_Time']),
+        ('check_integrity',
+         ['Fact_Sales', 'Orders', 'Dim_Products', 'Dim_Customers', 'Dim_Employees',
+          'Categories', 'Suppliers'], []),
+        ('create_sales_summary', ['Fact_Sales', 'Dim_Products', 'Dim_Customers'],
+         ['Sales_By_Month', 'Sales_By_Category', 'Sales_By_Country',
+          'Top_Products', 'Sketches_Sales', 'Customer_RFM', 'Sales_Timeseries',
+          'Sales_By_Geo'])
+    ]
+    
+    # Colonnes sources lues par chaque étape (les colonnes extraites en sont dérivées)
+    STEP_COLUMNS = {
+        'create_dim_customers': {'Customers': ['CustomerID', 'CompanyName', 'ContactName', 'City', 'Country']},
+        'create_dim_products': {
+            'Products': ['ProductID', 'ProductName', 'SupplierID', 'CategoryID', 'UnitPrice'],
+            'Categories': ['CategoryID', 'CategoryName', 'Description'],
+            'Suppliers': ['SupplierID', 'CompanyName', 'Country']
+        },
+        'create_dim_employees': {'Employees': ['EmployeeID', 'FirstName', 'LastName', 'HireDate']},
+        'create_dim_geography': {'Suppliers': ['Country', 'City']},
+        'create_fact_sales': {
+            'Orders': ['OrderID', 'CustomerID', 'EmployeeID', 'OrderDate'],
+            'OrderDetails': ['OrderID', 'ProductID', 'UnitPrice', 'Quantity', 'Discount']
+        }
+    }
+    
+    # Colonnes sources reprises telles quelles dans les dimensions publiées
+    # (dashboard, etl_unified.py, notebooks)
+    OUTPUT_COLUMNS = {
+        'Products': ['UnitsInStock', 'UnitsOnOrder', 'ReorderLevel', 'Discontinued'],
+        'Employees': ['Title', 'Country']
+    }
+    
+    # Dimensions historisées (SCD2): clé métier, clé de version, colonnes
+    # écrasées sur la version courante et colonnes hors historique
+    SCD_DIMENSIONS = {
+        'Dim_Customers': ('CustomerID', 'CustomerSK', [], ['ISO3']),
+        'Dim_Products': ('ProductID', 'ProductSK', ['UnitsInStock', 'UnitsOnOrder', 'ReorderLevel'], []),
+        'Dim_Employees': ('EmployeeID', 'EmployeeSK', [], ['YearsOfService', 'Photo'])
+    }
+    
+    def __init__(self, config=None, snapshot_date=None, pipeline=None):
+        # Définition du pipeline (tables, options, étapes, sorties) et connexion
+        self.pipeline = pipeline or NORTHWIND_PIPELINE
+        self.config = config or self.pipeline['source']
+        self.tables = source_tables(self.pipeline)
+        self.disabled_steps = disabled_steps(self.TRANSFORM_STEPS, self.pipeline)
+        self.required_columns = self.derive_required_columns()
         self.connection = None
         self.data = {}
         self.output_path = DATA_PATH  # 🆕 Use config path instead of relative path
+        # Date d'arrêté partagée par toutes les transformations
+        self.snapshot_date = pd.Timestamp(snapshot_date or SNAPSHOT_DATE or datetime.now()).normalize()
+        self.summary_state = None
+        self.touched_months = None  # None: réécrire toutes les partitions
+        self.dataset = None  # Version du jeu de données en cours d'écriture
+        self.fingerprints = None  # Empreintes des tables extraites (diff au prochain passage)
+
+    def open_connection(self):
+        """Ouvrir une nouvelle connexion ODBC (une par thread dans le pipeline asynchrone)"""
+        if self.config['trusted_connection'] == 'yes':
+            conn_string = (
+                f"DRIVER={self.config['driver']};"
+                f"SERVER={self.config['server']};"
+                f"DATABASE={self.config['database']};"
+                f"Trusted_Connection=yes;"
+                f"TrustServerCertificate=yes;"
+            )
+        else:
+            conn_string = (
+                f"DRIVER={self.config['driver']};"
+                f"SERVER={self.config['server']};"
+                f"DATABASE={self.config['database']};"
+                f"UID={self.config['username']};"
+                f"PWD={self.config['password']};"
+                f"TrustServerCertificate=yes;"
+            )
+        return pyodbc.connect(conn_string)
 
     def connect(self):
         """Établir la connexion à SQL Server"""
         try:
-            if self.config['trusted_connection'] == 'yes':
-                conn_string = (
-                    f"DRIVER={self.config['driver']};"
-                    f"SERVER={self.config['server']};"
-                    f"DATABASE={self.config['database']};"
-                    f"Trusted_Connection=yes;"
-                    f"TrustServerCertificate=yes;"
-                )
-            else:
-                conn_string = (
-                    f"DRIVER={self.config['driver']};"
-                    f"SERVER={self.config['server']};"
-                    f"DATABASE={self.config['database']};"
-                    f"UID={self.config['username']};"
-                    f"PWD={self.config['password']};"
-                    f"TrustServerCertificate=yes;"
-                )
-            
-            self.connection = pyodbc.connect(conn_string)
+            self.connection = self.open_connection()
             logger.info("✅ Connexion à SQL Server établie avec succès")
             return True
         except Exception as e:
             logger.error(f"❌ Erreur de connexion: {e}")
             return False
     
-    def extract_table(self, table_name, query=None):
-        """Extraire les données d'une table"""
+    def derive_required_columns(self):
+        """Colonnes sources utiles en aval: étapes actives, règles de qualité, clés et sorties"""
+        steps = [columns for method, columns in self.STEP_COLUMNS.items()
+                 if method not in self.disabled_steps]
+        if 'validate_sources' not in self.disabled_steps:
+            steps.append(rule_columns())
+        if 'check_integrity' not in self.disabled_steps:
+            steps += [{table: [column], parent: [key]}
+                      for table, column, parent, key in RELATIONSHIPS]
+        return required_columns(*steps, FINGERPRINT_KEYS, self.OUTPUT_COLUMNS)
+    
+    def extract_columns(self, table_name):
+        """Colonnes extraites d'une table source (None: toutes)"""
+        options = table_options(self.pipeline, table_name)
+        return projected_columns(options, self.required_columns.get(table_name.replace(' ', '')))
+    
+    def extract_table(self, table_name, query=None, connection=None):
+        """Extraire les données d'une table (options déclarées dans le pipeline)"""
         try:
+            options = table_options(self.pipeline, table_name)
             if query is None:
-                query = f"SELECT * FROM {table_name}"
+                query = select_query(table_name, options, self.extract_columns(table_name))
             
-            df = pd.read_sql(query, self.connection)
+            df = read_query(query, connection or self.connection, options['batch_size'])
             logger.info(f"✅ Table '{table_name}' extraite: {len(df)} lignes")
             return df
         except Exception as e:
+            # Pas de table vide à la place: la version en cours serait publiée sans elle
             logger.error(f"❌ Erreur extraction '{table_name}': {e}")
-            return pd.DataFrame()
+            raise
     
     def extract_all(self):
         """Extraire toutes les tables principales de Northwind"""
@@ -103,27 +198,19 @@ class NorthwindETL:
         logger.info("DÉBUT DE L'EXTRACTION")
         logger.info("=" * 50)
         
-        # Tables principales de Northwind
-        tables = [
-            'Categories',
-            'Customers',
-            'Employees',
-            'Orders',
-            'Order Details',
-            'Products',
-            'Shippers',
-            'Suppliers',
-            'Region',
-            'Territories'
-        ]
-        
-        for table in tables:
-            # Gérer les noms de tables avec espaces
-            safe_name = table.replace(' ', '')
-            self.data[safe_name] = self.extract_table(f"[{table}]")
+        for safe_name, table in self.tables.items():
+            self.data[safe_name] = self.extract_table(table)
         
         logger.info(f"✅ Extraction terminée: {len(self.data)} tables")
         return self.data
+    
+    def validate_sources(self):
+        """Contrôler les tables extraites avant transformation (rejets en quarantaine)"""
+        tables, quarantine = validate(self.data)
+        # Mise à jour en place: le pipeline asynchrone partage ce dictionnaire
+        self.data.update({name: tables[name] for name in VALIDATION_RULES})
+        self.data[QUARANTINE_TABLE] = quarantine
+        return quarantine
 
     # =============================================================================
     # TRANSFORMATION
@@ -135,20 +222,20 @@ class NorthwindETL:
         logger.info("DÉBUT DES TRANSFORMATIONS")
         logger.info("=" * 50)
         
-        # 1. Créer la table de faits des ventes (Fact_Sales)
-        self.create_fact_sales()
-        
-        # 2. Créer les dimensions
-        self.create_dim_customers()
-        self.create_dim_products()
-        self.create_dim_employees()
-        self.create_dim_time()
-        
-        # 3. Calculs agrégés
-        self.create_sales_summary()
+        # Étapes de TRANSFORM_STEPS dans l'ordre (la validation précède la détection des changements)
+        self.run_steps(*[method for method, _, _ in self.TRANSFORM_STEPS
+                         if method != 'validate_sources'])
         
         logger.info("✅ Transformations terminées")
     
+    def run_steps(self, *methods):
+        """Exécuter les étapes demandées qui ne sont pas désactivées dans le pipeline"""
+        for method in methods:
+            if method in self.disabled_steps:
+                logger.info(f"ℹ️ Étape '{method}' désactivée")
+                continue
+            getattr(self, method)()
+    
     def create_fact_sales(self):
         """Créer la table de faits des ventes"""
         logger.info("Création de Fact_Sales...")
@@ -160,6 +247,14 @@ class NorthwindETL:
             logger.warning("⚠️ Données manquantes pour Fact_Sales")
             return
         
+        fact_sales = self.attach_version_keys(self.build_fact_rows(order_details, orders))
+        
+        self.data['Fact_Sales'] = fact_sales
+        logger.info(f"✅ Fact_Sales créée: {len(fact_sales)} lignes")
+    
+    @staticmethod
+    def build_fact_rows(order_details, orders):
+        """Construire les lignes de faits à partir de lignes de commandes"""
         # Jointure Orders et Order Details
         fact_sales = pd.merge(
             order_details,
@@ -168,15 +263,13 @@ class NorthwindETL:
             how='left'
         )
         
-        # Calcul du montant total par ligne
-        fact_sales['TotalAmount'] = (
-            fact_sales['UnitPrice'] * 
-            fact_sales['Quantity'] * 
-            (1 - fact_sales['Discount'])
+        # Montant par ligne en centimes entiers (sommes exactes), dollars pour l'affichage
+        fact_sales['TotalAmountCents'] = line_amount_cents(
+            fact_sales['UnitPrice'],
+            fact_sales['Quantity'],
+            fact_sales['Discount']
         )
-        
-        # Arrondir les montants
-        fact_sales['TotalAmount'] = fact_sales['TotalAmount'].round(2)
+        fact_sales['TotalAmount'] = from_cents(fact_sales['TotalAmountCents'])
         
         # Conversion des dates
         if 'OrderDate' in fact_sales.columns:
@@ -186,8 +279,24 @@ class NorthwindETL:
             fact_sales['Quarter'] = fact_sales['OrderDate'].dt.quarter
             fact_sales['DayOfWeek'] = fact_sales['OrderDate'].dt.dayofweek
         
-        self.data['Fact_Sales'] = fact_sales
-        logger.info(f"✅ Fact_Sales créée: {len(fact_sales)} lignes")
+        return fact_sales
+    
+    def attach_version_keys(self, fact_sales):
+        """Ajouter à chaque fait la clé de la version de dimension valide à sa date"""
+        if fact_sales.empty or 'OrderDate' not in fact_sales.columns:
+            return fact_sales
+        for name, (key, surrogate_key, _, _) in self.SCD_DIMENSIONS.items():
+            history = self.data.get(f'{name}_History')
+            if history is None or history.empty or key not in fact_sales.columns:
+                continue
+            fact_sales[surrogate_key] = lookup_version_keys(
+                fact_sales, history, key, 'OrderDate', surrogate_key
+            )
+        return fact_sales
+    
+    def check_integrity(self):
+        """Contrôler les clés étrangères du fait et des dimensions (voir integrity.py)"""
+        return check_integrity(self.data)
     
     def create_dim_customers(self):
         """Créer la dimension Clients"""
@@ -203,11 +312,14 @@ class NorthwindETL:
         customers['Country'] = customers['Country'].fillna('Non spécifié')
         customers['City'] = customers['City'].fillna('Non spécifié')
         
-        # Segmentation des clients par région
-        customers['Region_Group'] = customers['Country'].apply(self.categorize_region)
+        # Code ISO-3 et segmentation des clients par région (voir geography.py)
+        customers['ISO3'] = iso3(customers['Country'])
+        customers['Region_Group'] = region_group(customers['ISO3'])
         
         self.data['Dim_Customers'] = customers
         logger.info(f"✅ Dim_Customers créée: {len(customers)} lignes")
+        
+        self.create_history('Dim_Customers', customers)
     
     def create_dim_products(self):
         """Créer la dimension Produits"""
@@ -253,6 +365,8 @@ class NorthwindETL:
         
         self.data['Dim_Products'] = products
         logger.info(f"✅ Dim_Products créée: {len(products)} lignes")
+        
+        self.create_history('Dim_Products', products)
     
     def create_dim_employees(self):
         """Créer la dimension Employés"""
@@ -266,15 +380,44 @@ class NorthwindETL:
         # Nom complet
         employees['FullName'] = employees['FirstName'] + ' ' + employees['LastName']
         
-        # Calcul de l'ancienneté
+        # Calcul de l'ancienneté (à la date d'arrêté: résultat reproductible)
         if 'HireDate' in employees.columns:
             employees['HireDate'] = pd.to_datetime(employees['HireDate'])
             employees['YearsOfService'] = (
-                (datetime.now() - employees['HireDate']).dt.days / 365
+                (self.snapshot_date - employees['HireDate']).dt.days / 365
             ).round(1)
         
         self.data['Dim_Employees'] = employees
         logger.info(f"✅ Dim_Employees créée: {len(employees)} lignes")
+        
+        self.create_history('Dim_Employees', employees)
+    
+    def create_history(self, name, dimension):
+        """Historiser une dimension (SCD2): seules les lignes modifiées ouvrent une version"""
+        key, surrogate_key, overwrite, excluded = self.SCD_DIMENSIONS[name]
+        # Ancienneté (dépend de la date d'arrêté), photo binaire... hors historique
+        tracked = dimension.drop(columns=excluded, errors='ignore')
+        attributes = [c for c in tracked.columns if c != key and c not in overwrite]
+        
+        history = None
+        history_path = resolve_table(self.output_path, f'{name}_History')
+        if history_path.exists():
+            history = pd.read_csv(history_path, encoding='utf-8-sig')
+        
+        history, opened, closed = scd2_merge(
+            history, tracked, key, attributes, self.snapshot_date,
+            surrogate_key=surrogate_key, overwrite=overwrite
+        )
+        self.data[f'{name}_History'] = history
+        logger.info(f"✅ {name}_History: {opened} versions ouvertes, {closed} fermées "
+                    f"(arrêté du {self.snapshot_date.date()})")
+    
+    def create_dim_geography(self):
+        """Créer la dimension Géographie (pays ISO-3, région, ville des clients et fournisseurs)"""
+        geography = dim_geography(self.data.get('Dim_Customers'), self.data.get('Suppliers'))
+        self.data['Dim_Geography'] = geography
+        logger.info(f"✅ Dim_Geography créée: {len(geography)} lignes, "
+                    f"{geography['ISO3'].nunique()} pays")
     
     def create_dim_time(self):
         """Créer la dimension Temps"""
@@ -311,82 +454,316 @@ class NorthwindETL:
         if fact_sales.empty:
             return
         
-        # Ventes par mois
-        sales_by_month = fact_sales.groupby(['Year', 'Month']).agg({
-            'TotalAmount': 'sum',
-            'OrderID': 'nunique',
-            'Quantity': 'sum'
-        }).reset_index()
-        sales_by_month.columns = ['Year', 'Month', 'TotalSales', 'OrderCount', 'TotalQuantity']
-        self.data['Sales_By_Month'] = sales_by_month
-        
-        # Ventes par catégorie
         products = self.data.get('Dim_Products', pd.DataFrame())
-        if not products.empty and 'CategoryName' in products.columns:
-            sales_with_category = pd.merge(
-                fact_sales,
-                products[['ProductID', 'CategoryName']],
-                on='ProductID',
-                how='left'
-            )
-            sales_by_category = sales_with_category.groupby('CategoryName').agg({
-                'TotalAmount': 'sum',
-                'Quantity': 'sum'
-            }).reset_index()
-            sales_by_category.columns = ['CategoryName', 'TotalSales', 'TotalQuantity']
-            self.data['Sales_By_Category'] = sales_by_category
-        
-        # Ventes par pays client
         customers = self.data.get('Dim_Customers', pd.DataFrame())
-        if not customers.empty:
-            sales_with_country = pd.merge(
-                fact_sales,
-                customers[['CustomerID', 'Country']],
-                on='CustomerID',
-                how='left'
-            )
-            sales_by_country = sales_with_country.groupby('Country').agg({
-                'TotalAmount': 'sum',
-                'OrderID': 'nunique'
-            }).reset_index()
-            sales_by_country.columns = ['Country', 'TotalSales', 'OrderCount']
-            self.data['Sales_By_Country'] = sales_by_country
+        
+        # État additif (groupe x commande) dont dérivent tous les résumés
+        self.summary_state = SummaryState.from_facts(fact_sales, products, customers)
+        self.data.update(self.summary_state.summaries())
         
         # Top 10 produits
-        top_products = fact_sales.groupby('ProductID').agg({
-            'TotalAmount': 'sum',
-            'Quantity': 'sum'
-        }).reset_index()
-        top_products = top_products.nlargest(10, 'TotalAmount')
-        if not products.empty:
-            top_products = pd.merge(
-                top_products,
-                products[['ProductID', 'ProductName']],
-                on='ProductID',
-                how='left'
-            )
-        self.data['Top_Products'] = top_products
+        self.data['Top_Products'] = self.summary_state.top_products(products)
+        
+        # Tables analytiques: segmentation RFM et séries temporelles
+        self.create_marts()
+        
+        # Sketches HyperLogLog fusionnables (comptages distincts par tranche)
+        if HLL_CONFIG['enabled'] and self.publishes('Sketches_Sales'):
+            self.data['Sketches_Sales'] = self.create_distinct_sketches(fact_sales)
         
         logger.info("✅ Résumés de ventes créés")
     
-    @staticmethod
-    def categorize_region(country):
-        """Catégoriser les pays par région"""
-        europe = ['Germany', 'UK', 'France', 'Spain', 'Italy', 'Sweden', 
-                  'Finland', 'Austria', 'Belgium', 'Denmark', 'Ireland',
-                  'Norway', 'Poland', 'Portugal', 'Switzerland']
-        north_america = ['USA', 'Canada', 'Mexico']
-        south_america = ['Brazil', 'Argentina', 'Venezuela']
-        
-        if country in europe:
-            return 'Europe'
-        elif country in north_america:
-            return 'Amérique du Nord'
-        elif country in south_america:
-            return 'Amérique du Sud'
+    def create_marts(self):
+        """Matérialiser les tables analytiques à partir de l'état des résumés (sans relire les faits)"""
+        if self.summary_state is None:
+            self.summary_state = SummaryState.load()
+        if self.summary_state is None:
+            return
+        
+        # Seules les tables publiées par le pipeline sont calculées
+        for name, create in (('Customer_RFM', self.create_customer_rfm),
+                             ('Sales_Timeseries', self.create_sales_timeseries),
+                             ('Sales_By_Geo', self.create_sales_by_geo)):
+            if self.publishes(name):
+                create()
+    
+    def create_customer_rfm(self):
+        """Segmentation RFM des clients"""
+        rfm = customer_rfm(
+            self.summary_state.customer_orders(),
+            self.snapshot_date,
+            self.data.get('Dim_Customers')
+        )
+        self.data['Customer_RFM'] = rfm
+        logger.info(f"✅ Customer_RFM créée: {len(rfm)} clients "
+                    f"({rfm['Segment'].value_counts().to_dict()})")
+    
+    def create_sales_timeseries(self):
+        """Séries jour/semaine/mois/trimestre avec fenêtres glissantes et variations"""
+        timeseries = sales_timeseries(self.summary_state.customer_orders())
+        self.data['Sales_Timeseries'] = timeseries
+        logger.info(f"✅ Sales_Timeseries créée: {len(timeseries)} lignes "
+                    f"({timeseries['Grain'].value_counts().to_dict()})")
+    
+    def create_sales_by_geo(self):
+        """Ventes par région, pays (ISO-3) et ville, pour la carte du dashboard"""
+        geo = sales_by_geo(self.summary_state.customer_orders(), self.data.get('Dim_Customers'))
+        self.data['Sales_By_Geo'] = geo
+        logger.info(f"✅ Sales_By_Geo créée: {len(geo)} lignes "
+                    f"({geo['Level'].value_counts().to_dict()})")
+    
+    def create_distinct_sketches(self, fact_sales):
+        """Créer un sketch HLL par grain (Année, Mois, Pays) et par colonne"""
+        customers = self.data.get('Dim_Customers', pd.DataFrame())
+        grain = list(HLL_CONFIG['grain'])
+        sales = fact_sales
+        if 'Country' in grain:
+            if customers.empty:
+                grain.remove('Country')
+            else:
+                sales = pd.merge(
+                    fact_sales,
+                    customers[['CustomerID', 'Country']],
+                    on='CustomerID',
+                    how='left'
+                )
+                sales['Country'] = sales['Country'].fillna('Non spécifié')
+        
+        sketches = None
+        for column in HLL_CONFIG['columns']:
+            part = group_sketches(sales, grain, column, HLL_CONFIG['precision'])
+            sketches = part if sketches is None else pd.merge(sketches, part, on=grain, how='outer')
+        logger.info(f"✅ Sketches_Sales créée: {len(sketches)} groupes (p={HLL_CONFIG['precision']})")
+        return sketches
+    
+    # =============================================================================
+    # DIFFÉRENCES ENTRE EXTRACTIONS (EMPREINTES DE LIGNES)
+    # =============================================================================
+    
+    def detect_changes(self):
+        """Empreinter les tables extraites et les comparer à l'extraction publiée"""
+        previous = load_fingerprints()
+        self.fingerprints = {}
+        diffs = {}
+        for table, keys in FINGERPRINT_KEYS.items():
+            df = self.data.get(table)
+            if df is None or df.empty:
+                continue
+            self.fingerprints[table] = row_fingerprints(df, keys)
+            if table in previous:
+                diffs[table] = diff_fingerprints(previous[table], self.fingerprints[table], keys)
+                if not diffs[table].empty:
+                    logger.info(f"🔄 {table}: {diffs[table].counts()}")
+        return diffs
+    
+    def changed_orders(self, diffs):
+        """OrderID à retraiter, ou None si une transformation complète est nécessaire"""
+        if not diffs or set(diffs) != set(self.fingerprints):
+            return None
+        if not {'Orders', 'OrderDetails'} <= set(diffs) or 'create_fact_sales' in self.disabled_steps:
+            return None
+        # Produits, catégories, fournisseurs et clients alimentent les résumés
+        if any(not diff.empty for table, diff in diffs.items()
+               if table not in ('Orders', 'OrderDetails', 'Employees')):
+            return None
+        changed = pd.concat([diffs['Orders'].changed_keys()['OrderID'],
+                             diffs['OrderDetails'].changed_keys()['OrderID']])
+        return set(changed.astype(int))
+    
+    def transform_changes(self, order_ids):
+        """Ne retraiter que les commandes modifiées depuis l'extraction publiée"""
+        self.load_warehouse([
+            'Fact_Sales', 'Sales_By_Month', 'Sales_By_Category', 'Sales_By_Country',
+            'Top_Products', 'Sketches_Sales'
+        ])
+        if 'Fact_Sales' not in self.data:
+            return False
+        
+        logger.info("=" * 50)
+        logger.info(f"TRANSFORMATIONS INCRÉMENTALES ({len(order_ids)} commandes modifiées)")
+        logger.info("=" * 50)
+        
+        self.run_steps('create_dim_customers', 'create_dim_products',
+                       'create_dim_employees', 'create_dim_geography')
+        
+        if order_ids:
+            orders = self.data['Orders']
+            order_details = self.data['OrderDetails']
+            self.apply_changes(
+                order_ids,
+                orders[orders['OrderID'].isin(order_ids)],
+                order_details[order_details['OrderID'].isin(order_ids)]
+            )
         else:
-            return 'Autre'
-
+            self.touched_months = set()
+            logger.info("✅ Aucune commande modifiée depuis la dernière extraction")
+            self.create_marts()
+        self.run_steps('create_dim_time', 'check_integrity')
+        
+        logger.info("✅ Transformations terminées")
+        return True
+    
+    # =============================================================================
+    # MISE À JOUR INCRÉMENTALE (CDC)
+    # =============================================================================
+    
+    def load_warehouse(self, tables=None):
+        """Relire les tables déjà publiées dans data/"""
+        tables = tables or [
+            'Fact_Sales', 'Dim_Customers', 'Dim_Products',
+            'Dim_Customers_History', 'Dim_Products_History', 'Dim_Employees_History',
+            'Sales_By_Month', 'Sales_By_Category', 'Sales_By_Country', 'Top_Products',
+            'Sketches_Sales', QUARANTINE_TABLE
+        ]
+        for table in tables:
+            file_path = resolve_table(self.output_path, table)
+            if file_path.exists():
+                self.data[table] = pd.read_csv(file_path, encoding='utf-8-sig')
+        if 'Fact_Sales' in self.data:
+            self.data['Fact_Sales']['OrderDate'] = pd.to_datetime(self.data['Fact_Sales']['OrderDate'])
+        return self.data
+    
+    def apply_changes(self, order_ids, orders, order_details):
+        """Remplacer dans Fact_Sales les lignes des commandes modifiées"""
+        fact_sales = self.data['Fact_Sales']
+        touched = fact_sales['OrderID'].isin(order_ids)
+        removed = fact_sales[touched]
+        
+        # Les commandes supprimées n'ont plus de lignes courantes
+        added = pd.DataFrame(columns=fact_sales.columns)
+        if not orders.empty and not order_details.empty:
+            added = self.attach_version_keys(self.build_fact_rows(order_details, orders))
+        
+        parts = [df for df in (fact_sales[~touched], added) if not df.empty]
+        fact_sales = pd.concat(parts, ignore_index=True) if parts else fact_sales.iloc[0:0]
+        self.data['Fact_Sales'] = fact_sales.sort_values(['OrderID', 'ProductID'], ignore_index=True)
+        logger.info(f"✅ Fact_Sales: -{len(removed)} / +{len(added)} lignes")
+        
+        changed = pd.concat([removed, added])[['Year', 'Month']].dropna().drop_duplicates()
+        self.touched_months = set(changed.itertuples(index=False, name=None))
+        
+        self.refresh_sales_summary(removed, added)
+    
+    def refresh_sales_summary(self, removed, added):
+        """Mettre à jour les résumés à partir des seules lignes retirées/ajoutées"""
+        products = self.data.get('Dim_Products', pd.DataFrame())
+        customers = self.data.get('Dim_Customers', pd.DataFrame())
+        
+        if self.summary_state is None:
+            self.summary_state = SummaryState.load()
+        if self.summary_state is None:
+            # Premier passage sans état: reconstruction à partir de l'historique
+            logger.info("ℹ️ État des résumés absent: reconstruction complète")
+            self.create_sales_summary()
+            return
+        
+        touched = {}
+        for rows, sign in ((removed, -1), (added, 1)):
+            for name, groups in self.summary_state.apply(rows, sign, products, customers).items():
+                touched[name] = pd.concat([touched.get(name), groups]).drop_duplicates()
+        
+        for name, groups in touched.items():
+            keys = SUMMARY_SPECS[name]['keys']
+            fresh = self.summary_state.summary(name, groups)
+            self.data[name] = replace_groups(self.data.get(name), fresh, keys, groups)
+        
+        self.data['Top_Products'] = self.summary_state.top_products(products)
+        self.create_marts()
+        
+        # Un sketch HLL ne sait pas retirer une valeur: les mois touchés sont reconstruits
+        if HLL_CONFIG['enabled'] and self.publishes('Sketches_Sales') and 'Sales_By_Month' in touched:
+            months = touched['Sales_By_Month']
+            fact_sales = self.data['Fact_Sales']
+            in_months = pd.MultiIndex.from_frame(fact_sales[['Year', 'Month']]).isin(
+                pd.MultiIndex.from_frame(months)
+            )
+            fresh = self.create_distinct_sketches(fact_sales[in_months])
+            self.data['Sketches_Sales'] = replace_groups(
+                self.data.get('Sketches_Sales'), fresh, ['Year', 'Month'], months
+            )
+        logger.info(f"✅ Résumés de ventes mis à jour ({len(removed) + len(added)} lignes de delta)")
+    
+    def fetch_changed_rows(self, source, table, order_ids):
+        """Relire les lignes courantes des commandes modifiées (options de la table)"""
+        options = table_options(self.pipeline, table)
+        return source.fetch_rows(table, options['incremental_key'] or 'OrderID', sorted(order_ids),
+                                 columns=self.extract_columns(table), where=options['where'])
+    
+    def validate_changes(self, order_ids, orders, order_details):
+        """Soumettre les lignes relues par le CDC aux règles de qualité d'une extraction complète"""
+        if 'validate_sources' in self.disabled_steps:
+            return orders, order_details
+        
+        # Tables de référence relues à la source (petites), contrôlées comme en exécution complète
+        tables = {name: self.extract_table(self.tables.get(name, name))
+                  for name in ('Customers', 'Products', 'Employees')}
+        tables['Orders'] = orders
+        # Commandes supprimées: leurs lignes restantes ne produiront aucun fait
+        tables['OrderDetails'] = order_details if not orders.empty else order_details.iloc[0:0]
+        rules = {name: rules for name, rules in VALIDATION_RULES.items() if not tables[name].empty}
+        tables, quarantine = validate(tables, rules)
+        self.merge_quarantine(order_ids, quarantine)
+        return tables['Orders'], tables['OrderDetails']
+    
+    def merge_quarantine(self, order_ids, quarantine):
+        """Remplacer dans la quarantaine publiée les rejets des lignes recontrôlées"""
+        previous = self.data.get(QUARANTINE_TABLE)
+        if previous is not None and not previous.empty:
+            order_id = previous['Record'].map(lambda record: json.loads(record).get('OrderID'))
+            replaced = previous['Table'].isin(['Customers', 'Products']) | (
+                previous['Table'].isin(['Orders', 'OrderDetails']) & order_id.isin(order_ids)
+            )
+            quarantine = pd.concat([previous[~replaced], quarantine], ignore_index=True)
+        self.data[QUARANTINE_TABLE] = quarantine
+    
+    def change_source(self):
+        """Source des changements capturés (change tracking SQL Server)"""
+        return ChangeTrackingSource(self.connection)
+    
+    def run_incremental(self):
+        """Appliquer les changements capturés depuis la dernière synchronisation"""
+        last_version = load_cdc_state()
+        if last_version is None:
+            logger.info("ℹ️ Aucune synchronisation précédente: exécution complète")
+            return self.run()
+        
+        try:
+            if not self.connect():
+                return False
+            
+            source = self.change_source()
+            version, order_ids = source.poll(last_version)
+            if order_ids is None:
+                self.close()
+                return self.run()
+            
+            if not order_ids:
+                logger.info(f"✅ Aucun changement depuis la version {last_version}")
+                save_cdc_state(version)
+                self.close()
+                return True
+            
+            logger.info(f"🔄 {len(order_ids)} commandes modifiées depuis la version {last_version}")
+            self.load_warehouse()
+            orders = self.fetch_changed_rows(source, 'Orders', order_ids)
+            order_details = self.fetch_changed_rows(source, 'Order Details', order_ids)
+            orders, order_details = self.validate_changes(order_ids, orders, order_details)
+            self.apply_changes(order_ids, orders, order_details)
+            
+            if not self.load():
+                self.close()
+                return False
+            
+            save_cdc_state(version)
+            logger.info(f"✅ Synchronisation incrémentale terminée (version {version})")
+            self.close()
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur ETL incrémental: {str(e)}")
+            self.close()
+            return False
+    
     # =============================================================================
     # CHARGEMENT
     # =============================================================================
@@ -405,12 +782,27 @@ class NorthwindETL:
             # Ensure directory exists
             Path(output_path).mkdir(parents=True, exist_ok=True)
             
-            # Save all tables from self.data dictionary
-            for table_name, df in self.data.items():
-                if df is not None and not df.empty:
-                    file_path = Path(output_path) / f'{table_name}.csv'
-                    df.to_csv(file_path, index=False, encoding='utf-8-sig')
-                    logger.info(f"✅ {table_name}.csv sauvegardé ({len(df)} lignes)")
+            # Toutes les tables dans une nouvelle version, publiée d'un bloc
+            tables = {name: df for name, df in self.data.items()
+                      if df is not None and not df.empty and self.publishes(name)}
+            # Quarantaine publiée même vide (sinon celle de la version précédente serait reprise)
+            if QUARANTINE_TABLE in self.data:
+                tables[QUARANTINE_TABLE] = self.data[QUARANTINE_TABLE]
+            self.dataset = DatasetWriter.from_config(output_path).begin()
+            self.dataset.withdraw(self.withdrawn_outputs())
+            try:
+                self.dataset.write_all(tables, write=self.save_table)
+                manifest = self.dataset.commit()
+            except Exception:
+                self.dataset.abort()
+                raise
+            logger.info(f"✅ Version {manifest['version']} publiée ({len(manifest['tables'])} tables)")
+            
+            # État des résumés et empreintes pour la prochaine mise à jour incrémentale
+            if self.summary_state is not None:
+                self.summary_state.save()
+            if self.fingerprints:
+                save_fingerprints(self.fingerprints, self.snapshot_date)
             
             return True
             
@@ -418,6 +810,42 @@ class NorthwindETL:
             logger.error(f"❌ Erreur lors du chargement: {str(e)}")
             return False
     
+    def publishes(self, table_name):
+        """La table fait-elle partie des sorties publiées du pipeline"""
+        return table_name not in self.pipeline.get('disabled_outputs', [])
+    
+    def withdrawn_outputs(self):
+        """Sorties désactivées ou produites par une étape désactivée: retirées de la version publiée"""
+        withdrawn = set(self.pipeline.get('disabled_outputs', []))
+        for method, _, outputs in self.TRANSFORM_STEPS:
+            if method in self.disabled_steps:
+                withdrawn.update(name for name in outputs if name not in self.tables)
+        if 'Fact_Sales' in withdrawn:
+            withdrawn.add('fact_store')
+        return withdrawn
+    
+    def save_table(self, table_name, df):
+        """Écrire une table dans la version en cours (et Fact_Sales en partitions et en fact_store)"""
+        if not self.publishes(table_name):
+            return
+        if self.dataset.write(table_name, df):
+            logger.info(f"✅ {self.dataset.file_name(table_name)} écrit ({len(df)} lignes)")
+        else:
+            logger.info(f"♻️ {self.dataset.file_name(table_name)} inchangée (lien vers la version précédente)")
+        
+        if table_name == 'Fact_Sales':
+            # Copie partitionnée Year=/Month= (seuls les mois touchés en incrémental)
+            partitions = write_partitioned(
+                df, self.dataset.directory('Fact_Sales'), ['Year', 'Month'],
+                stats_columns=['OrderDate', 'OrderID', 'TotalAmount'],
+                only=self.touched_months
+            )
+            logger.info(f"✅ Fact_Sales/ partitionnée ({len(partitions)} partitions)")
+            
+            # Stockage colonnaire mappable partagé par les workers du dashboard
+            write_store(df, 'Fact_Sales', self.dataset.directory('fact_store'))
+            logger.info("✅ Fact_Sales publiée dans fact_store/ (colonnes .npy)")
+    
     def close(self):
         """Fermer la connexion à SQL Server"""
         if self.connection:
@@ -434,16 +862,31 @@ class NorthwindETL:
             if not self.connect():
                 return False
             
+            # Version de suivi des modifications avant l'extraction (point de départ du CDC)
+            version = None
+            try:
+                version = self.change_source().current_version()
+            except Exception as e:
+                logger.info(f"ℹ️ Change tracking indisponible, CDC désactivé: {e}")
+            
             # Extraction
             self.extract_all()
             
-            # Transformation
-            self.transform()
+            # Contrôle qualité: les lignes invalides ne rejoignent pas les transformations
+            self.run_steps('validate_sources')
+            
+            # Transformation (seules les commandes modifiées si le reste est inchangé)
+            order_ids = self.changed_orders(self.detect_changes())
+            if order_ids is None or not self.transform_changes(order_ids):
+                self.transform()
             
             # Load
             if not self.load():
                 return False
             
+            if version is not None:
+                save_cdc_state(version)
+            
             logger.info("=" * 50)
             logger.info("ETL TERMINÉ AVEC SUCCÈS")
             logger.info("=" * 50)
@@ -457,6 +900,77 @@ class NorthwindETL:
             self.close()
             return False
 
+    # =============================================================================
+    # PIPELINE ASYNCHRONE (EXTRACTION, TRANSFORMATION ET ÉCRITURE EN RECOUVREMENT)
+    # =============================================================================
+    
+    def extract_with_own_connection(self, table):
+        """Extraire une table sur une connexion dédiée (pyodbc: une connexion par thread)"""
+        connection = self.open_connection()
+        try:
+            return self.extract_table(table, connection=connection)
+        finally:
+            connection.close()
+    
+    def run_async(self, max_workers=4):
+        """Exécuter l'ETL en pipeline: chaque table part vers la transformation et le disque dès son extraction"""
+        try:
+            if not self.connect():
+                return False
+            
+            version = None
+            try:
+                version = self.change_source().current_version()
+            except Exception as e:
+                logger.info(f"ℹ️ Change tracking indisponible, CDC désactivé: {e}")
+            
+            logger.info("=" * 50)
+            logger.info(f"PIPELINE ASYNCHRONE ({max_workers} connexions)")
+            logger.info("=" * 50)
+            
+            Path(self.output_path).mkdir(parents=True, exist_ok=True)
+            self.dataset = DatasetWriter.from_config(self.output_path).begin()
+            self.dataset.withdraw(self.withdrawn_outputs())
+            pipeline = AsyncPipeline(
+                self.data,
+                extract=self.extract_with_own_connection,
+                load=self.save_table,
+                transforms=[(getattr(self, method), inputs, outputs)
+                            for method, inputs, outputs in self.TRANSFORM_STEPS
+                            if method not in self.disabled_steps],
+                max_workers=max_workers
+            )
+            try:
+                pipeline.run(self.tables.items())
+                quarantine = self.data.get(QUARANTINE_TABLE)
+                if quarantine is not None and quarantine.empty:
+                    self.save_table(QUARANTINE_TABLE, quarantine)
+                self.detect_changes()
+                manifest = self.dataset.commit()
+            except Exception:
+                self.dataset.abort()
+                raise
+            logger.info(f"✅ Version {manifest['version']} publiée ({len(manifest['tables'])} tables)")
+            
+            if self.summary_state is not None:
+                self.summary_state.save()
+            save_fingerprints(self.fingerprints, self.snapshot_date)
+            if version is not None:
+                save_cdc_state(version)
+            
+            logger.info("=" * 50)
+            logger.info("ETL TERMINÉ AVEC SUCCÈS")
+            logger.info("=" * 50)
+            logger.info(f"📁 Données sauvegardées dans: {self.output_path}")
+            
+            self.close()
+            return True
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur ETL asynchrone: {str(e)}")
+            self.close()
+            return False
+
 # =============================================================================
 # POINT D'ENTRÉE
 # =============================================================================
@@ -469,9 +983,19 @@ if __name__ == "__main__":
     ╚═══════════════════════════════════════════════════════════════╝
     """)
     
-    # Créer et exécuter l'ETL
-    etl = NorthwindETL(SQL_SERVER_CONFIG)
-    success = etl.run()
+    # Créer et exécuter l'ETL (--incremental: appliquer seulement les changements,
+    # --async: extraction, transformations et écritures en recouvrement,
+    # --snapshot AAAA-MM-JJ: date d'arrêté des transformations)
+    snapshot_date = None
+    if '--snapshot' in sys.argv:
+        snapshot_date = sys.argv[sys.argv.index('--snapshot') + 1]
+    etl = NorthwindETL(snapshot_date=snapshot_date)
+    if '--incremental' in sys.argv:
+        success = etl.run_incremental()
+    elif '--async' in sys.argv:
+        success = etl.run_async()
+    else:
+        success = etl.run()
     
     if success:
         print("\n✅ Pipeline ETL exécuté avec succès!")
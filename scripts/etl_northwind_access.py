@@ -6,7 +6,11 @@ import os
 from pathlib import Path
 import logging
 import sys
-from config import DATA_PATH, REPORTS_PATH, ACCESS_DB_CONFIG
+from config import DATA_PATH, REPORTS_PATH, ACCESS_PIPELINE, SNAPSHOT_DATE
+from dataset import DatasetWriter
+from extraction import read_query, select_query, source_tables, table_options
+from geography import iso3, region_group
+from money import from_cents, line_amount_cents
 
 # Configuration du logging
 logging.basicConfig(
@@ -31,11 +35,15 @@ if sys.platform == 'win32':
 class NorthwindAccessETL:
     """Classe ETL pour Northwind Access Database"""
     
-    def __init__(self, config):
-        self.config = config
+    def __init__(self, config=None, snapshot_date=None, pipeline=None):
+        # Définition du pipeline (tables, options, sorties) et connexion
+        self.pipeline = pipeline or ACCESS_PIPELINE
+        self.config = config or self.pipeline['source']
         self.connection = None
         self.data = {}
         self.output_path = DATA_PATH
+        # Date d'arrêté partagée par toutes les transformations
+        self.snapshot_date = pd.Timestamp(snapshot_date or SNAPSHOT_DATE or datetime.now()).normalize()
 
     def connect(self):
         """Établir la connexion à Access Database"""
@@ -83,17 +91,19 @@ class NorthwindAccessETL:
             return []
     
     def extract_table(self, table_name, query=None):
-        """Extraire les données d'une table Access"""
+        """Extraire les données d'une table Access (options déclarées dans le pipeline)"""
         try:
+            options = table_options(self.pipeline, table_name)
             if query is None:
-                query = f"SELECT * FROM [{table_name}]"
+                query = select_query(table_name, options)
             
-            df = pd.read_sql(query, self.connection)
+            df = read_query(query, self.connection, options['batch_size'])
             logger.info(f"✅ Table '{table_name}' extraite: {len(df)} lignes")
             return df
         except Exception as e:
+            # Pas de table vide à la place: la version en cours serait publiée sans elle
             logger.error(f"❌ Erreur extraction '{table_name}': {e}")
-            return pd.DataFrame()
+            raise
     
     def extract_all(self):
         """Extraire toutes les tables principales de Northwind Access"""
@@ -104,24 +114,9 @@ class NorthwindAccessETL:
         # Lister les tables disponibles
         available_tables = self.list_tables()
         
-        # Tables principales de Northwind (noms standards)
-        standard_tables = [
-            'Categories',
-            'Customers',
-            'Employees',
-            'Orders',
-            'Order Details',
-            'Products',
-            'Shippers',
-            'Suppliers',
-            'Region',
-            'Territories'
-        ]
-        
-        # Extraire chaque table si elle existe
-        for table in standard_tables:
+        # Extraire chaque table activée dans ACCESS_PIPELINE si elle existe
+        for safe_name, table in source_tables(self.pipeline).items():
             if table in available_tables:
-                safe_name = table.replace(' ', '')
                 self.data[safe_name] = self.extract_table(table)
             else:
                 logger.warning(f"⚠️ Table '{table}' non trouvée dans la base Access")
@@ -172,15 +167,13 @@ class NorthwindAccessETL:
             how='left'
         )
         
-        # Calcul du montant total par ligne
-        fact_sales['TotalAmount'] = (
-            fact_sales['UnitPrice'] * 
-            fact_sales['Quantity'] * 
-            (1 - fact_sales['Discount'])
+        # Montant par ligne en centimes entiers (sommes exactes), dollars pour l'affichage
+        fact_sales['TotalAmountCents'] = line_amount_cents(
+            fact_sales['UnitPrice'],
+            fact_sales['Quantity'],
+            fact_sales['Discount']
         )
-        
-        # Arrondir les montants
-        fact_sales['TotalAmount'] = fact_sales['TotalAmount'].round(2)
+        fact_sales['TotalAmount'] = from_cents(fact_sales['TotalAmountCents'])
         
         # Conversion des dates
         if 'OrderDate' in fact_sales.columns:
@@ -207,8 +200,9 @@ class NorthwindAccessETL:
         customers['Country'] = customers['Country'].fillna('Non spécifié')
         customers['City'] = customers['City'].fillna('Non spécifié')
         
-        # Segmentation des clients par région
-        customers['Region_Group'] = customers['Country'].apply(self.categorize_region)
+        # Code ISO-3 et segmentation des clients par région (voir geography.py)
+        customers['ISO3'] = iso3(customers['Country'])
+        customers['Region_Group'] = region_group(customers['ISO3'])
         
         self.data['Dim_Customers'] = customers
         logger.info(f"✅ Dim_Customers créée: {len(customers)} lignes")
@@ -274,7 +268,7 @@ class NorthwindAccessETL:
         if 'HireDate' in employees.columns:
             employees['HireDate'] = pd.to_datetime(employees['HireDate'])
             employees['YearsOfService'] = (
-                (datetime.now() - employees['HireDate']).dt.days / 365
+                (self.snapshot_date - employees['HireDate']).dt.days / 365
             ).round(1)
         
         self.data['Dim_Employees'] = employees
@@ -317,11 +311,12 @@ class NorthwindAccessETL:
         
         # Ventes par mois
         sales_by_month = fact_sales.groupby(['Year', 'Month']).agg({
-            'TotalAmount': 'sum',
+            'TotalAmountCents': 'sum',
             'OrderID': 'nunique',
             'Quantity': 'sum'
         }).reset_index()
-        sales_by_month.columns = ['Year', 'Month', 'TotalSales', 'OrderCount', 'TotalQuantity']
+        sales_by_month.columns = ['Year', 'Month', 'TotalSalesCents', 'OrderCount', 'TotalQuantity']
+        sales_by_month['TotalSales'] = from_cents(sales_by_month['TotalSalesCents'])
         self.data['Sales_By_Month'] = sales_by_month
         
         # Ventes par catégorie
@@ -334,10 +329,11 @@ class NorthwindAccessETL:
                 how='left'
             )
             sales_by_category = sales_with_category.groupby('CategoryName').agg({
-                'TotalAmount': 'sum',
+                'TotalAmountCents': 'sum',
                 'Quantity': 'sum'
             }).reset_index()
-            sales_by_category.columns = ['CategoryName', 'TotalSales', 'TotalQuantity']
+            sales_by_category.columns = ['CategoryName', 'TotalSalesCents', 'TotalQuantity']
+            sales_by_category['TotalSales'] = from_cents(sales_by_category['TotalSalesCents'])
             self.data['Sales_By_Category'] = sales_by_category
         
         # Ventes par pays client
@@ -350,18 +346,20 @@ class NorthwindAccessETL:
                 how='left'
             )
             sales_by_country = sales_with_country.groupby('Country').agg({
-                'TotalAmount': 'sum',
+                'TotalAmountCents': 'sum',
                 'OrderID': 'nunique'
             }).reset_index()
-            sales_by_country.columns = ['Country', 'TotalSales', 'OrderCount']
+            sales_by_country.columns = ['Country', 'TotalSalesCents', 'OrderCount']
+            sales_by_country['TotalSales'] = from_cents(sales_by_country['TotalSalesCents'])
             self.data['Sales_By_Country'] = sales_by_country
         
         # Top 10 produits
         top_products = fact_sales.groupby('ProductID').agg({
-            'TotalAmount': 'sum',
+            'TotalAmountCents': 'sum',
             'Quantity': 'sum'
         }).reset_index()
-        top_products = top_products.nlargest(10, 'TotalAmount')
+        top_products = top_products.nlargest(10, 'TotalAmountCents')
+        top_products['TotalAmount'] = from_cents(top_products['TotalAmountCents'])
         if not products.empty:
             top_products = pd.merge(
                 top_products,
@@ -373,24 +371,6 @@ class NorthwindAccessETL:
         
         logger.info("✅ Résumés de ventes créés")
     
-    @staticmethod
-    def categorize_region(country):
-        """Catégoriser les pays par région"""
-        europe = ['Germany', 'UK', 'France', 'Spain', 'Italy', 'Sweden', 
-                  'Finland', 'Austria', 'Belgium', 'Denmark', 'Ireland',
-                  'Norway', 'Poland', 'Portugal', 'Switzerland']
-        north_america = ['USA', 'Canada', 'Mexico']
-        south_america = ['Brazil', 'Argentina', 'Venezuela']
-        
-        if country in europe:
-            return 'Europe'
-        elif country in north_america:
-            return 'Amérique du Nord'
-        elif country in south_america:
-            return 'Amérique du Sud'
-        else:
-            return 'Autre'
-
     # =============================================================================
     # CHARGEMENT
     # =============================================================================
@@ -410,11 +390,18 @@ class NorthwindAccessETL:
             Path(output_path).mkdir(parents=True, exist_ok=True)
             
             # Save all tables with prefix to distinguish from SQL Server data
-            for table_name, df in self.data.items():
-                if df is not None and not df.empty:
-                    file_path = Path(output_path) / f'{prefix}{table_name}.csv'
-                    df.to_csv(file_path, index=False, encoding='utf-8-sig')
-                    logger.info(f"✅ {prefix}{table_name}.csv sauvegardé ({len(df)} lignes)")
+            # (nouvelle version du jeu de données, publiée d'un bloc)
+            disabled = self.pipeline.get('disabled_outputs', [])
+            tables = {f'{prefix}{name}': df for name, df in self.data.items()
+                      if df is not None and not df.empty and name not in disabled}
+            manifest = DatasetWriter.from_config(output_path).publish(
+                tables, withdrawn=[f'{prefix}{name}' for name in disabled])
+            for name in tables:
+                entry = manifest['tables'][name]
+                if entry['changed']:
+                    logger.info(f"✅ {entry['file']} sauvegardé ({len(tables[name])} lignes)")
+                else:
+                    logger.info(f"♻️ {entry['file']} inchangée (lien vers la version précédente)")
             
             return True
             
@@ -474,7 +461,7 @@ if __name__ == "__main__":
     """)
     
     # Créer et exécuter l'ETL
-    etl = NorthwindAccessETL(ACCESS_DB_CONFIG)
+    etl = NorthwindAccessETL()
     success = etl.run()
     
     if success:
@@ -0,0 +1,496 @@
+import pandas as pd
+from pathlib import Path
+import logging
+import sys
+from config import DATA_PATH, REPORTS_PATH
+from partitions import write_partitioned
+from pipeline import AsyncPipeline
+from dataset import DatasetWriter, resolve_table
+from money import amount_cents, from_cents, line_amount_cents
+from geography import iso3, region_group
+
+# Configuration du logging
+logging.basicConfig(
+    level=logging.INFO,
+    handlers=[
+        logging.FileHandler(REPORTS_PATH / 'etl_unified_log.txt', encoding='utf-8'),
+        logging.StreamHandler()
+    ],
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+
+logger = logging.getLogger(__name__)
+
+# Fixer l'encodage de la console Windows
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+
+# =============================================================================
+# CONFORMATION SQL SERVER + ACCESS -> FAIT UNIFIÉ
+# =============================================================================
+#
+# Les deux sources ont des clés incompatibles (OrderID/CustomerID SQL Server,
+# 'Order ID'/'Customer ID' entiers côté Access). Chaque clé est préfixée par sa
+# source (SQL_..., ACC_...) pour former une clé de substitution unique, puis
+# les attributs utiles au dashboard sont dénormalisés dans la table de faits :
+# le navigateur charge un seul jeu de données déjà fusionné.
+#
+# Une même entité (client, produit, employé) présente dans les deux sources
+# est reconnue par sa clé naturelle (nom) et n'apparaît qu'une fois dans sa
+# dimension conforme ; les faits de l'autre source sont rattachés à sa clé.
+# Une ligne de commande présente dans les deux sources (même client, date,
+# produit conformes et même quantité, voir LINE_BUSINESS_KEY) n'est gardée
+# qu'une fois : les identifiants bruts (OrderID, ProductID) des deux bases
+# n'ont aucun rapport entre eux et ne servent jamais à rapprocher des lignes.
+# Dans les deux cas, la source prioritaire (SOURCE_PRECEDENCE) l'emporte.
+
+SOURCES = {'SQL': 'SQL Server', 'ACC': 'Access'}
+
+# Priorité des sources, de la plus fiable à la moins fiable
+SOURCE_PRECEDENCE = ['SQL', 'ACC']
+
+UNIFIED_NAME = 'Fact_Sales_Unified'
+
+# Clé métier d'une ligne de commande, sur les clés conformes
+LINE_BUSINESS_KEY = ['CustomerKey', 'OrderDate', 'ProductKey', 'Quantity']
+
+FACT_COLUMNS = [
+    'LineKey', 'OrderKey', 'ProductKey', 'CustomerKey', 'EmployeeKey', 'Source',
+    'OrderID', 'ProductID', 'CustomerID', 'EmployeeID', 'OrderDate',
+    'Quantity', 'UnitPrice', 'Discount', 'TotalAmount', 'TotalAmountCents', 'Year', 'Month',
+    'CompanyName', 'Country', 'ProductName', 'CategoryName', 'EmployeeName'
+]
+
+
+def surrogate_key(source, values):
+    """Construire une clé de substitution préfixée par la source"""
+    return source + '_' + pd.Series(values).astype('string').str.replace(r'\.0$', '', regex=True)
+
+
+def match_key(values):
+    """Forme de comparaison d'une clé naturelle (casse et espaces ignorés)"""
+    return values.astype('string').str.split().str.join(' ').str.casefold()
+
+
+def conform_entities(frames, key, natural_key):
+    """Fusionner les lignes d'une même entité entre sources
+
+    frames: {source: DataFrame conforme}. Retourne (dimension, correspondance
+    clé de source -> clé conforme). La clé conforme et les attributs viennent
+    de la source prioritaire, complétés par les autres sources. Une entité sans
+    clé naturelle n'est jamais fusionnée.
+    """
+    parts = [frames[source] for source in SOURCE_PRECEDENCE
+             if source in frames and not frames[source].empty]
+    if not parts:
+        return pd.DataFrame(), pd.Series(dtype='string')
+
+    rows = pd.concat([df.drop_duplicates(key, keep='last') for df in parts], ignore_index=True)
+    match = match_key(rows[natural_key]).fillna(rows[key].astype('string'))
+    groups = rows.groupby(match, sort=False)
+    key_map = pd.Series(groups[key].transform('first').to_numpy(), index=rows[key].to_numpy())
+    dimension = groups.first().reset_index(drop=True)
+    return dimension, key_map
+
+
+class UnifiedSalesETL:
+    """Fusion des sorties SQL Server et Access en un fait et des dimensions conformes"""
+
+    SOURCE_TABLES = ['Fact_Sales', 'Dim_Customers', 'Dim_Products', 'Dim_Employees',
+                     'access_Orders', 'access_Order_Details', 'access_Customers',
+                     'access_Products', 'access_Employees']
+
+    # Conformations: (méthode, tables d'entrée, tables produites)
+    TRANSFORM_STEPS = [
+        ('conform_customers', ['Dim_Customers', 'access_Customers'], ['Dim_Customers_Unified']),
+        ('conform_products', ['Dim_Products', 'access_Products'], ['Dim_Products_Unified']),
+        ('conform_employees', ['Dim_Employees', 'access_Employees'], ['Dim_Employees_Unified']),
+        ('create_unified_fact', ['Fact_Sales', 'access_Orders', 'access_Order_Details',
+                                 'Dim_Customers_Unified', 'Dim_Products_Unified',
+                                 'Dim_Employees_Unified'], [UNIFIED_NAME])
+    ]
+
+    def __init__(self, data_path=DATA_PATH):
+        self.data_path = Path(data_path)
+        self.output_path = Path(data_path)
+        self.data = {}
+        self.key_maps = {}  # Clé de source -> clé conforme, par dimension
+        self.dataset = None  # Version du jeu de données en cours d'écriture
+
+    # =============================================================================
+    # EXTRACTION (fichiers produits par les deux ETL)
+    # =============================================================================
+
+    def read_csv(self, name):
+        """Lire une table publiée dans data/ (DataFrame vide si absente)"""
+        file_path = resolve_table(self.data_path, name)
+        if not file_path.exists():
+            logger.warning(f"⚠️ {name}.csv non trouvé")
+            return pd.DataFrame()
+        df = pd.read_csv(file_path, encoding='utf-8-sig')
+        logger.info(f"✅ {file_path.name} lu: {len(df)} lignes")
+        return df
+
+    def extract_all(self):
+        """Lire les tables des deux sources"""
+        logger.info("=" * 50)
+        logger.info("DÉBUT DE L'EXTRACTION (SQL SERVER + ACCESS)")
+        logger.info("=" * 50)
+
+        for name in self.SOURCE_TABLES:
+            self.data[name] = self.read_csv(name)
+        return self.data
+
+    # =============================================================================
+    # TRANSFORMATION (conformation)
+    # =============================================================================
+
+    def transform(self):
+        """Conformer les dimensions puis construire le fait unifié"""
+        logger.info("=" * 50)
+        logger.info("DÉBUT DE LA CONFORMATION")
+        logger.info("=" * 50)
+
+        self.conform_customers()
+        self.conform_products()
+        self.conform_employees()
+        self.create_unified_fact()
+
+        logger.info("✅ Conformation terminée")
+
+    def conform_customers(self):
+        """Dimension Clients conforme (clé CustomerKey, un client par nom de société)"""
+        sql = self.data['Dim_Customers']
+        acc = self.data['access_Customers']
+        frames = {}
+
+        if not sql.empty:
+            frames['SQL'] = pd.DataFrame({
+                'CustomerKey': surrogate_key('SQL', sql['CustomerID']),
+                'Source': 'SQL',
+                'CustomerID': sql['CustomerID'].astype('string'),
+                'CompanyName': sql['CompanyName'],
+                'ContactName': sql['ContactName'],
+                'City': sql['City'],
+                'Country': sql['Country']
+            })
+
+        if not acc.empty:
+            contact = (acc['First Name'].fillna('') + ' ' + acc['Last Name'].fillna('')).str.strip()
+            frames['ACC'] = pd.DataFrame({
+                'CustomerKey': surrogate_key('ACC', acc['ID']),
+                'Source': 'ACC',
+                'CustomerID': acc['ID'].astype('string'),
+                'CompanyName': acc['Company'],
+                'ContactName': contact.replace('', 'Non spécifié'),
+                'City': acc['City'].fillna('Non spécifié'),
+                'Country': acc['Country/Region'].fillna('USA')
+            })
+
+        customers, self.key_maps['CustomerKey'] = conform_entities(frames, 'CustomerKey', 'CompanyName')
+        if not customers.empty:
+            customers['CompanyName'] = customers['CompanyName'].fillna('Unknown')
+            # Même classement géographique pour les deux sources (geography.py)
+            customers['Region_Group'] = region_group(iso3(customers['Country']))
+
+        self.data['Dim_Customers_Unified'] = customers
+        logger.info(f"✅ Dim_Customers_Unified créée: {len(customers)} lignes")
+
+    def conform_products(self):
+        """Dimension Produits conforme (clé ProductKey, un produit par nom)"""
+        sql = self.data['Dim_Products']
+        acc = self.data['access_Products']
+        frames = {}
+
+        if not sql.empty:
+            frames['SQL'] = pd.DataFrame({
+                'ProductKey': surrogate_key('SQL', sql['ProductID']),
+                'Source': 'SQL',
+                'ProductID': sql['ProductID'].astype('string'),
+                'ProductName': sql['ProductName'],
+                'CategoryName': sql['CategoryName'],
+                'UnitPrice': sql['UnitPrice']
+            })
+
+        if not acc.empty:
+            frames['ACC'] = pd.DataFrame({
+                'ProductKey': surrogate_key('ACC', acc['ID']),
+                'Source': 'ACC',
+                'ProductID': acc['ID'].astype('string'),
+                'ProductName': acc['Product Name'],
+                'CategoryName': acc['Category'].fillna('General'),
+                'UnitPrice': pd.to_numeric(acc['List Price'], errors='coerce').fillna(0)
+            })
+
+        products, self.key_maps['ProductKey'] = conform_entities(frames, 'ProductKey', 'ProductName')
+        if not products.empty:
+            products['ProductName'] = products['ProductName'].fillna('Unknown')
+
+        self.data['Dim_Products_Unified'] = products
+        logger.info(f"✅ Dim_Products_Unified créée: {len(products)} lignes")
+
+    def conform_employees(self):
+        """Dimension Employés conforme (clé EmployeeKey, un employé par nom complet)"""
+        sql = self.data['Dim_Employees']
+        acc = self.data['access_Employees']
+        frames = {}
+
+        if not sql.empty:
+            frames['SQL'] = pd.DataFrame({
+                'EmployeeKey': surrogate_key('SQL', sql['EmployeeID']),
+                'Source': 'SQL',
+                'EmployeeID': sql['EmployeeID'].astype('string'),
+                'FirstName': sql['FirstName'],
+                'LastName': sql['LastName']
+            })
+
+        if not acc.empty:
+            frames['ACC'] = pd.DataFrame({
+                'EmployeeKey': surrogate_key('ACC', acc['ID']),
+                'Source': 'ACC',
+                'EmployeeID': acc['ID'].astype('string'),
+                'FirstName': acc['First Name'].fillna(''),
+                'LastName': acc['Last Name'].fillna('')
+            })
+
+        for df in frames.values():
+            df['FullName'] = (df['FirstName'].fillna('') + ' ' + df['LastName'].fillna('')).str.strip()
+        employees, self.key_maps['EmployeeKey'] = conform_entities(frames, 'EmployeeKey', 'FullName')
+
+        self.data['Dim_Employees_Unified'] = employees
+        logger.info(f"✅ Dim_Employees_Unified créée: {len(employees)} lignes")
+
+    def sql_fact_lines(self):
+        """Lignes de faits SQL Server au format conforme"""
+        fact = self.data['Fact_Sales']
+        if fact.empty:
+            return pd.DataFrame()
+
+        return pd.DataFrame({
+            'LineKey': surrogate_key('SQL', fact['OrderID']) + '_' + fact['ProductID'].astype('string'),
+            'OrderKey': surrogate_key('SQL', fact['OrderID']),
+            'ProductKey': surrogate_key('SQL', fact['ProductID']),
+            'CustomerKey': surrogate_key('SQL', fact['CustomerID']),
+            'EmployeeKey': surrogate_key('SQL', fact['EmployeeID']),
+            'Source': 'SQL',
+            'OrderID': fact['OrderID'].astype('string'),
+            'ProductID': fact['ProductID'].astype('string'),
+            'CustomerID': fact['CustomerID'].astype('string'),
+            'EmployeeID': fact['EmployeeID'].astype('string'),
+            'OrderDate': pd.to_datetime(fact['OrderDate']),
+            'Quantity': fact['Quantity'],
+            'UnitPrice': fact['UnitPrice'],
+            'Discount': fact['Discount'],
+            'TotalAmount': fact['TotalAmount'],
+            'TotalAmountCents': amount_cents(fact)
+        })
+
+    def access_fact_lines(self):
+        """Lignes de faits Access (commandes sans détail incluses, montant nul)"""
+        orders = self.data['access_Orders']
+        details = self.data['access_Order_Details']
+        if orders.empty:
+            return pd.DataFrame()
+
+        lines = pd.merge(
+            orders[['Order ID', 'Customer ID', 'Employee ID', 'Order Date']],
+            details[['ID', 'Order ID', 'Product ID', 'Quantity', 'Unit Price', 'Discount']]
+            if not details.empty else pd.DataFrame(columns=['ID', 'Order ID', 'Product ID',
+                                                            'Quantity', 'Unit Price', 'Discount']),
+            on='Order ID',
+            how='left'
+        )
+        has_detail = lines['ID'].notna()
+
+        quantity = pd.to_numeric(lines['Quantity'], errors='coerce').fillna(0)
+        unit_price = pd.to_numeric(lines['Unit Price'], errors='coerce').fillna(0)
+        discount = pd.to_numeric(lines['Discount'], errors='coerce').fillna(0)
+        cents = line_amount_cents(unit_price, quantity, discount)
+        order_key = surrogate_key('ACC', lines['Order ID'])
+
+        return pd.DataFrame({
+            'LineKey': surrogate_key('ACC', lines['ID']).where(has_detail, order_key + '_NONE'),
+            'OrderKey': order_key,
+            'ProductKey': surrogate_key('ACC', lines['Product ID']).where(has_detail, 'UNKNOWN'),
+            'CustomerKey': surrogate_key('ACC', lines['Customer ID']),
+            'EmployeeKey': surrogate_key('ACC', lines['Employee ID']),
+            'Source': 'ACC',
+            'OrderID': lines['Order ID'].astype('string'),
+            'ProductID': lines['Product ID'].astype('Int64').astype('string'),
+            'CustomerID': lines['Customer ID'].astype('string'),
+            'EmployeeID': lines['Employee ID'].astype('string'),
+            'OrderDate': pd.to_datetime(lines['Order Date']),
+            'Quantity': quantity,
+            'UnitPrice': unit_price,
+            'Discount': discount,
+            'TotalAmount': from_cents(cents),
+            'TotalAmountCents': cents
+        })
+
+    def create_unified_fact(self):
+        """Construire le fait unifié, dédupliqué et dénormalisé"""
+        logger.info(f"Création de {UNIFIED_NAME}...")
+
+        lines = {'SQL': self.sql_fact_lines(), 'ACC': self.access_fact_lines()}
+        parts = [lines[source] for source in SOURCE_PRECEDENCE if not lines[source].empty]
+        if not parts:
+            logger.warning(f"⚠️ Données manquantes pour {UNIFIED_NAME}")
+            return
+
+        fact = pd.concat(parts, ignore_index=True)
+
+        # Entités fusionnées entre sources: rattachement à la clé conforme
+        for key, key_map in self.key_maps.items():
+            fact[key] = fact[key].map(key_map).fillna(fact[key])
+
+        # Déduplication sur la clé métier conforme (commandes sans détail exclues):
+        # une ligne présente dans plusieurs sources est gardée depuis la source prioritaire
+        before = len(fact)
+        business_key = fact[LINE_BUSINESS_KEY].assign(
+            OrderDate=fact['OrderDate'].dt.normalize(),
+            Quantity=fact['Quantity'].astype('float64'))
+        first_source = fact['Source'].groupby(
+            [business_key[column] for column in LINE_BUSINESS_KEY], dropna=False, sort=False
+        ).transform('first')
+        duplicate = (fact['Source'] != first_source) & (fact['ProductKey'] != 'UNKNOWN')
+        fact = fact[~duplicate].reset_index(drop=True)
+        if len(fact) < before:
+            logger.info(f"🧹 {before - len(fact)} lignes présentes dans une source prioritaire supprimées")
+
+        fact['Year'] = fact['OrderDate'].dt.year.astype('Int64')
+        fact['Month'] = fact['OrderDate'].dt.month.astype('Int64')
+
+        # Attributs dénormalisés: plus aucune jointure côté navigateur
+        customers = self.data['Dim_Customers_Unified']
+        products = self.data['Dim_Products_Unified']
+        employees = self.data['Dim_Employees_Unified']
+        if not customers.empty:
+            fact = fact.merge(customers[['CustomerKey', 'CompanyName', 'Country']],
+                              on='CustomerKey', how='left')
+        if not products.empty:
+            fact = fact.merge(products[['ProductKey', 'ProductName', 'CategoryName']],
+                              on='ProductKey', how='left')
+        if not employees.empty:
+            fact = fact.merge(employees[['EmployeeKey', 'FullName']].rename(
+                columns={'FullName': 'EmployeeName'}), on='EmployeeKey', how='left')
+
+        for column in ['CompanyName', 'Country', 'ProductName', 'CategoryName', 'EmployeeName']:
+            if column not in fact.columns:
+                fact[column] = 'Unknown'
+            fact[column] = fact[column].fillna('Unknown')
+
+        fact = fact[FACT_COLUMNS].sort_values(['Source', 'OrderDate', 'LineKey'], ignore_index=True)
+        self.data[UNIFIED_NAME] = fact
+        logger.info(f"✅ {UNIFIED_NAME} créée: {len(fact)} lignes, "
+                    f"{fact['OrderKey'].nunique()} commandes")
+
+    # =============================================================================
+    # CHARGEMENT (partitionné par source et année)
+    # =============================================================================
+
+    def load(self):
+        """Écrire le fait partitionné et les dimensions conformes"""
+        logger.info("=" * 50)
+        logger.info("DÉBUT DU CHARGEMENT")
+        logger.info("=" * 50)
+
+        try:
+            tables = {}
+            for name in [UNIFIED_NAME, 'Dim_Customers_Unified', 'Dim_Products_Unified',
+                         'Dim_Employees_Unified']:
+                df = self.data.get(name, pd.DataFrame())
+                if not df.empty:
+                    tables[name] = df
+
+            self.dataset = DatasetWriter.from_config(self.output_path).begin()
+            try:
+                self.dataset.write_all(tables, write=self.save_table)
+                self.dataset.commit()
+            except Exception:
+                self.dataset.abort()
+                raise
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erreur lors du chargement: {str(e)}")
+            return False
+
+    def save_table(self, name, df):
+        """Écrire le fait (partitionné par source et année) ou une dimension conforme"""
+        if name == UNIFIED_NAME:
+            partitions = write_partitioned(
+                df, self.dataset.directory(UNIFIED_NAME), ['Source', 'Year'],
+                stats_columns=['OrderDate', 'TotalAmount']
+            )
+            logger.info(f"✅ {UNIFIED_NAME}/ écrit: {len(partitions)} partitions, {len(df)} lignes")
+        elif self.dataset.write(name, df):
+            logger.info(f"✅ {self.dataset.file_name(name)} sauvegardé ({len(df)} lignes)")
+        else:
+            logger.info(f"♻️ {self.dataset.file_name(name)} inchangée (lien vers la version précédente)")
+
+    def run_async(self):
+        """Conformation en pipeline: lectures, conformations et écritures en recouvrement"""
+        try:
+            self.dataset = DatasetWriter.from_config(self.output_path).begin()
+            pipeline = AsyncPipeline(
+                self.data,
+                extract=self.read_csv,
+                load=self.save_table,
+                transforms=[(getattr(self, method), inputs, outputs)
+                            for method, inputs, outputs in self.TRANSFORM_STEPS],
+                load_sources=False
+            )
+            try:
+                pipeline.run([(name, name) for name in self.SOURCE_TABLES])
+                self.dataset.commit()
+            except Exception:
+                self.dataset.abort()
+                raise
+
+            logger.info("=" * 50)
+            logger.info("CONFORMATION TERMINÉE AVEC SUCCÈS")
+            logger.info("=" * 50)
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erreur de conformation: {str(e)}")
+            return False
+
+    def run(self):
+        """Exécuter la conformation complète"""
+        try:
+            self.extract_all()
+            self.transform()
+            if not self.load():
+                return False
+
+            logger.info("=" * 50)
+            logger.info("CONFORMATION TERMINÉE AVEC SUCCÈS")
+            logger.info("=" * 50)
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erreur de conformation: {str(e)}")
+            return False
+
+# =============================================================================
+# POINT D'ENTRÉE
+# =============================================================================
+
+if __name__ == "__main__":
+    print("""
+    ╔═══════════════════════════════════════════════════════════════╗
+    ║     FAIT UNIFIÉ SQL SERVER + ACCESS - Business Intelligence   ║
+    ║                    Projet BI 2025                             ║
+    ╚═══════════════════════════════════════════════════════════════╝
+    """)
+
+    # --async: lectures, conformations et écritures en recouvrement
+    etl = UnifiedSalesETL()
+    success = etl.run_async() if '--async' in sys.argv else etl.run()
+
+    if success:
+        print(f"\n✅ Fait unifié disponible dans 'data/{UNIFIED_NAME}/'")
+    else:
+        print("\n❌ La conformation a rencontré des erreurs.")
+        print("📋 Consultez le fichier de log pour plus de détails.")
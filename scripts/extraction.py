@@ -0,0 +1,88 @@
+import pandas as pd
+
+# =============================================================================
+# EXTRACTION PILOTÉE PAR LA DÉFINITION DU PIPELINE
+# =============================================================================
+#
+# Les tables à extraire et leurs options sont déclarées dans config.py
+# (NORTHWIND_PIPELINE, ACCESS_PIPELINE). Chaque table est lue par une requête
+# construite à partir de ses options : désactiver une table, restreindre ses
+# colonnes ou filtrer ses lignes réduit le volume transféré sans toucher aux
+# ETL.
+#
+# Sans option 'columns', seules les colonnes utiles en aval sont lues : l'ETL
+# en dérive la liste (colonnes lues par ses étapes, règles de qualité, clés,
+# colonnes publiées) et la passe à select_query(). 'columns' force une liste
+# explicite, ou '*' pour toutes les colonnes.
+
+# Options d'une table et valeurs par défaut
+TABLE_DEFAULTS = {
+    'enabled': True,
+    'columns': None,
+    'where': None,
+    'batch_size': None,
+    'incremental_key': None
+}
+
+
+def table_options(pipeline, table):
+    """Options d'une table, complétées par les valeurs par défaut (table non déclarée: défauts)"""
+    options = pipeline['tables'].get(table) or {}
+    unknown = set(options) - set(TABLE_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Options inconnues pour la table '{table}': {sorted(unknown)}")
+    return {**TABLE_DEFAULTS, **options}
+
+
+def source_tables(pipeline):
+    """Tables activées: nom interne (sans espaces) -> nom dans la source"""
+    return {
+        table.replace(' ', ''): table
+        for table in pipeline['tables']
+        if table_options(pipeline, table)['enabled']
+    }
+
+
+def required_columns(*requirements):
+    """Union des colonnes requises par table ({table: [colonnes]}, ordre conservé)"""
+    columns = {}
+    for requirement in requirements:
+        for table, names in requirement.items():
+            columns.setdefault(table, {}).update(dict.fromkeys(names))
+    return {table: list(names) for table, names in columns.items()}
+
+
+def projected_columns(options, required=None):
+    """Colonnes à extraire (None: toutes): option 'columns', sinon colonnes requises"""
+    if options['columns'] == '*':
+        return None
+    return list(options['columns'] or required or []) or None
+
+
+def select_query(table, options, required=None):
+    """Requête SELECT d'une table selon ses options (colonnes, filtre)"""
+    columns = projected_columns(options, required)
+    selected = ', '.join(f'[{c}]' for c in columns) if columns else '*'
+    query = f"SELECT {selected} FROM [{table}]"
+    if options['where']:
+        query += f" WHERE {options['where']}"
+    return query
+
+
+def read_query(query, connection, batch_size=None):
+    """Exécuter une requête, par lots de batch_size lignes si demandé"""
+    if not batch_size:
+        return pd.read_sql(query, connection)
+    chunks = list(pd.read_sql(query, connection, chunksize=batch_size))
+    if not chunks:
+        return pd.DataFrame()
+    return pd.concat(chunks, ignore_index=True)
+
+
+def disabled_steps(steps, pipeline):
+    """Noms des étapes désactivées, après vérification qu'elles existent"""
+    disabled = set(pipeline.get('disabled_transforms', []))
+    unknown = disabled - {method for method, _, _ in steps}
+    if unknown:
+        raise ValueError(f"Transformations inconnues: {sorted(unknown)}")
+    return disabled
@@ -0,0 +1,99 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from config import DATA_PATH
+
+# =============================================================================
+# STOCKAGE COLONNAIRE PARTAGÉ (memory-map)
+# =============================================================================
+#
+# Chaque table est écrite une seule fois par l'ETL sous la forme d'un fichier
+# .npy par colonne. Les lecteurs ouvrent ces fichiers avec mmap_mode='r' : les
+# pages sont partagées par le cache du système, donc N processus du dashboard
+# partagent une seule copie physique de Fact_Sales.
+#
+# Les colonnes texte sont dictionnarisées (codes int32 + catégories dans le
+# schéma JSON) afin de rester mappables sans désérialisation.
+
+FACT_STORE_PATH = DATA_PATH / 'fact_store'
+SCHEMA_FILE = '_schema.json'
+
+
+def write_store(df, name, store_path=FACT_STORE_PATH):
+    """Écrire une table en colonnes .npy (remplacement atomique du dossier)"""
+    target = Path(store_path) / name
+    tmp = Path(store_path) / f'{name}.tmp'
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+
+    schema = {'rows': len(df), 'columns': []}
+    for column in df.columns:
+        series = df[column]
+        entry = {'name': column, 'file': f'{len(schema["columns"]):03d}.npy'}
+
+        if pd.api.types.is_datetime64_any_dtype(series):
+            values = series.to_numpy(dtype='datetime64[ns]')
+            entry['kind'] = 'datetime'
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            values = series.to_numpy()
+            entry['kind'] = 'numeric'
+        else:
+            codes, categories = pd.factorize(series.astype('string'), use_na_sentinel=True)
+            values = codes.astype(np.int32)
+            entry['kind'] = 'category'
+            entry['categories'] = [str(c) for c in categories]
+
+        np.save(tmp / entry['file'], np.ascontiguousarray(values), allow_pickle=False)
+        schema['columns'].append(entry)
+
+    with open(tmp / SCHEMA_FILE, 'w', encoding='utf-8') as f:
+        json.dump(schema, f, ensure_ascii=False)
+
+    # Publication: l'ancien dossier est écarté puis le nouveau renommé
+    old = Path(store_path) / f'{name}.old'
+    if target.exists():
+        if old.exists():
+            shutil.rmtree(old)
+        os.replace(target, old)
+    os.replace(tmp, target)
+    if old.exists():
+        shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+def has_store(name, store_path=FACT_STORE_PATH):
+    """Indiquer si une table est disponible dans le stockage colonnaire"""
+    return (Path(store_path) / name / SCHEMA_FILE).exists()
+
+
+def store_columns(name, store_path=FACT_STORE_PATH):
+    """Lister les colonnes d'une table du stockage"""
+    with open(Path(store_path) / name / SCHEMA_FILE, encoding='utf-8') as f:
+        return [c['name'] for c in json.load(f)['columns']]
+
+
+def open_store(name, columns=None, store_path=FACT_STORE_PATH):
+    """Ouvrir une table en lecture seule, sans copie (np.load en mmap)"""
+    folder = Path(store_path) / name
+    with open(folder / SCHEMA_FILE, encoding='utf-8') as f:
+        schema = json.load(f)
+
+    wanted = None if columns is None else set(columns)
+    arrays = {}
+    for entry in schema['columns']:
+        if wanted is not None and entry['name'] not in wanted:
+            continue
+        values = np.load(folder / entry['file'], mmap_mode='r', allow_pickle=False)
+        if entry['kind'] == 'category':
+            values = pd.Categorical.from_codes(values, categories=entry['categories'])
+        arrays[entry['name']] = values
+
+    if columns is not None:
+        arrays = {c: arrays[c] for c in columns if c in arrays}
+    return pd.DataFrame(arrays, copy=False)
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+from config import STATE_PATH
+
+# =============================================================================
+# EMPREINTES DE LIGNES ET DIFFÉRENCES ENTRE DEUX EXTRACTIONS
+# =============================================================================
+#
+# Chaque table extraite est réduite à une empreinte 64 bits par clé (KeyHash)
+# et par ligne (RowHash), calculées de façon vectorisée. Les empreintes de
+# l'extraction publiée sont conservées dans data/_state ; à l'exécution
+# suivante, la comparaison donne les clés insérées, modifiées et supprimées
+# pour une fraction du coût d'une transformation complète.
+
+FINGERPRINT_FILE = STATE_PATH / 'fingerprints.pkl'
+
+# Tables comparées d'une extraction à l'autre et leurs clés
+FINGERPRINT_KEYS = {
+    'Orders': ['OrderID'],
+    'OrderDetails': ['OrderID', 'ProductID'],
+    'Products': ['ProductID'],
+    'Categories': ['CategoryID'],
+    'Suppliers': ['SupplierID'],
+    'Customers': ['CustomerID'],
+    'Employees': ['EmployeeID']
+}
+
+
+def _hash64(df):
+    """Empreinte 64 bits (signée, pour un stockage int64) de chaque ligne"""
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy(dtype=np.uint64)
+    return hashes.view(np.int64)
+
+
+def row_fingerprints(df, keys):
+    """Clés, empreinte de clé et empreinte de ligne de chaque enregistrement"""
+    fingerprints = df[keys].reset_index(drop=True)
+    fingerprints['KeyHash'] = _hash64(df[keys])
+    fingerprints['RowHash'] = _hash64(df)
+    return fingerprints
+
+
+class RowDiff:
+    """Clés insérées, modifiées et supprimées entre deux extractions d'une table"""
+
+    def __init__(self, inserted, updated, deleted):
+        self.inserted = inserted
+        self.updated = updated
+        self.deleted = deleted
+
+    @property
+    def empty(self):
+        return self.inserted.empty and self.updated.empty and self.deleted.empty
+
+    def changed_keys(self):
+        """Toutes les clés touchées (insertions, modifications et suppressions)"""
+        return pd.concat([self.inserted, self.updated, self.deleted], ignore_index=True)
+
+    def counts(self):
+        return {'I': len(self.inserted), 'U': len(self.updated), 'D': len(self.deleted)}
+
+
+def diff_fingerprints(previous, current, keys):
+    """Comparer deux jeux d'empreintes (jointure sur KeyHash, sans relire les données)"""
+    positions = pd.Index(previous['KeyHash']).get_indexer(current['KeyHash'])
+    known = positions >= 0
+    previous_rows = previous['RowHash'].to_numpy()[positions[known]]
+    modified = np.zeros(len(current), dtype=bool)
+    modified[known] = previous_rows != current['RowHash'].to_numpy()[known]
+
+    deleted = ~previous['KeyHash'].isin(current['KeyHash']).to_numpy()
+    return RowDiff(
+        current.loc[~known, keys].reset_index(drop=True),
+        current.loc[modified, keys].reset_index(drop=True),
+        previous.loc[deleted, keys].reset_index(drop=True)
+    )
+
+
+def load_fingerprints(path=None):
+    """Relire les empreintes de la dernière extraction publiée ({} si absentes)"""
+    try:
+        return pd.read_pickle(path or FINGERPRINT_FILE)['tables']
+    except FileNotFoundError:
+        return {}
+
+
+def save_fingerprints(tables, snapshot_date, path=None):
+    """Mémoriser les empreintes de l'extraction publiée"""
+    pd.to_pickle({'snapshot': snapshot_date, 'tables': tables}, path or FINGERPRINT_FILE)
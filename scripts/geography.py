@@ -0,0 +1,109 @@
+import logging
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# DIMENSION GÉOGRAPHIQUE (CODES ISO-3 ET GROUPES DE RÉGIONS)
+# =============================================================================
+#
+# Les noms de pays des sources (UK, USA, variantes locales...) sont résolus
+# une seule fois, dans l'ETL, en codes ISO 3166-1 alpha-3. Le dashboard
+# cartographie directement les codes (locationmode='ISO-3') : plus de
+# rapprochement de noms au rendu, ni de pays ignorés silencieusement.
+
+# ISO-3 -> (nom de référence, groupe de régions)
+COUNTRIES = {
+    'ARG': ('Argentina', 'Amérique du Sud'),
+    'AUS': ('Australia', 'Asie-Pacifique'),
+    'AUT': ('Austria', 'Europe'),
+    'BEL': ('Belgium', 'Europe'),
+    'BRA': ('Brazil', 'Amérique du Sud'),
+    'CAN': ('Canada', 'Amérique du Nord'),
+    'CHE': ('Switzerland', 'Europe'),
+    'DEU': ('Germany', 'Europe'),
+    'DNK': ('Denmark', 'Europe'),
+    'ESP': ('Spain', 'Europe'),
+    'FIN': ('Finland', 'Europe'),
+    'FRA': ('France', 'Europe'),
+    'GBR': ('United Kingdom', 'Europe'),
+    'IRL': ('Ireland', 'Europe'),
+    'ITA': ('Italy', 'Europe'),
+    'JPN': ('Japan', 'Asie-Pacifique'),
+    'MEX': ('Mexico', 'Amérique du Nord'),
+    'NLD': ('Netherlands', 'Europe'),
+    'NOR': ('Norway', 'Europe'),
+    'POL': ('Poland', 'Europe'),
+    'PRT': ('Portugal', 'Europe'),
+    'SGP': ('Singapore', 'Asie-Pacifique'),
+    'SWE': ('Sweden', 'Europe'),
+    'USA': ('United States', 'Amérique du Nord'),
+    'VEN': ('Venezuela', 'Amérique du Sud')
+}
+
+# Autres graphies rencontrées dans les sources -> ISO-3
+COUNTRY_ALIASES = {
+    'UK': 'GBR', 'Great Britain': 'GBR', 'England': 'GBR', 'Scotland': 'GBR',
+    'US': 'USA', 'United States of America': 'USA',
+    'Deutschland': 'DEU', 'España': 'ESP', 'Brasil': 'BRA', 'México': 'MEX',
+    'Schweiz': 'CHE', 'Suisse': 'CHE', 'Österreich': 'AUT', 'Belgique': 'BEL',
+    'België': 'BEL', 'Danmark': 'DNK', 'Sverige': 'SWE', 'Suomi': 'FIN',
+    'Norge': 'NOR', 'Polska': 'POL', 'Éire': 'IRL', 'Italia': 'ITA',
+    'Holland': 'NLD', 'The Netherlands': 'NLD', 'Nederland': 'NLD'
+}
+
+# Groupe des pays non résolus
+UNKNOWN_REGION = 'Autre'
+
+GEOGRAPHY_COLUMNS = ['ISO3', 'CountryName', 'Region_Group', 'Country', 'City']
+
+
+def _normalize(name):
+    """Forme de comparaison d'un nom de pays (casse, points et espaces ignorés)"""
+    return ' '.join(str(name).replace('.', '').split()).casefold()
+
+
+# Table de résolution construite une fois à l'import: nom, alias ou code -> ISO-3
+_LOOKUP = {
+    _normalize(name): iso
+    for iso, (country, _) in COUNTRIES.items()
+    for name in (iso, country)
+}
+_LOOKUP.update({_normalize(alias): iso for alias, iso in COUNTRY_ALIASES.items()})
+
+
+def iso3(countries):
+    """Codes ISO-3 d'une série de noms de pays (NA si non résolu, avec avertissement)"""
+    countries = pd.Series(countries)
+    # Résolution sur les valeurs distinctes uniquement, puis report sur les lignes
+    resolved = {name: _LOOKUP.get(_normalize(name)) for name in countries.dropna().unique()}
+    unmatched = sorted(str(name) for name, iso in resolved.items() if iso is None)
+    if unmatched:
+        logger.warning(f"⚠️ Pays sans code ISO-3: {unmatched}")
+    return countries.map(resolved).astype('string')
+
+
+def region_group(iso_codes):
+    """Groupe de régions d'une série de codes ISO-3"""
+    regions = {iso: region for iso, (_, region) in COUNTRIES.items()}
+    return pd.Series(iso_codes).map(regions).fillna(UNKNOWN_REGION)
+
+
+def country_name(iso_codes):
+    """Nom de référence d'une série de codes ISO-3"""
+    names = {iso: name for iso, (name, _) in COUNTRIES.items()}
+    return pd.Series(iso_codes).map(names)
+
+
+def dim_geography(*locations):
+    """Dim_Geography: une ligne par (pays, ville) des tables fournies (Country, City)"""
+    parts = [df[['Country', 'City']] for df in locations if df is not None and not df.empty]
+    if not parts:
+        return pd.DataFrame(columns=GEOGRAPHY_COLUMNS)
+
+    geography = pd.concat(parts, ignore_index=True).drop_duplicates(ignore_index=True)
+    geography['ISO3'] = iso3(geography['Country'])
+    geography['CountryName'] = country_name(geography['ISO3']).fillna(geography['Country'])
+    geography['Region_Group'] = region_group(geography['ISO3'])
+    return geography[GEOGRAPHY_COLUMNS].sort_values(['ISO3', 'City'], ignore_index=True)
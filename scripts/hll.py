@@ -0,0 +1,132 @@
+import base64
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# HYPERLOGLOG - COMPTAGE DISTINCT APPROXIMATIF ET FUSIONNABLE
+# =============================================================================
+#
+# Un sketch de précision p occupe 2^p registres d'un octet (p=11 -> 2 Ko) et
+# estime le nombre de valeurs distinctes avec une erreur relative d'environ
+# 1.04 / sqrt(2^p). Deux sketches se fusionnent par maximum registre à
+# registre : on peut donc combiner partitions, mois ou pays sans relire les
+# faits.
+
+DEFAULT_PRECISION = 11
+
+
+def hash_values(values):
+    """Hacher des valeurs en entiers 64 bits (vectorisé, stable entre exécutions)"""
+    series = pd.Series(values)
+    if not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+
+
+def _leading_zeros(x):
+    """Nombre de zéros en tête d'entiers 64 bits non nuls (vectorisé)"""
+    zeros = np.zeros(x.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        small = x < (np.uint64(1) << np.uint64(64 - shift))
+        zeros[small] += shift
+        x = np.where(small, x << np.uint64(shift), x)
+    return zeros
+
+
+def _registers(hashes, precision):
+    """Index de registre et rang (position du premier bit à 1) de chaque hachage"""
+    p = np.uint64(precision)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    # Bit sentinelle: le rang est borné à 64 - p + 1
+    rest = (hashes << p) | (np.uint64(1) << (p - np.uint64(1)))
+    rank = (_leading_zeros(rest) + 1).astype(np.uint8)
+    return index, rank
+
+
+class HyperLogLog:
+    """Sketch HyperLogLog à précision configurable"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 18:
+            raise ValueError("La précision doit être comprise entre 4 et 18")
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = (
+            np.zeros(self.m, dtype=np.uint8) if registers is None
+            else np.asarray(registers, dtype=np.uint8)
+        )
+
+    @classmethod
+    def from_values(cls, values, precision=DEFAULT_PRECISION):
+        sketch = cls(precision)
+        sketch.add_hashes(hash_values(values))
+        return sketch
+
+    def add_hashes(self, hashes):
+        """Ajouter des hachages 64 bits au sketch"""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if hashes.size == 0:
+            return self
+        index, rank = _registers(hashes, self.precision)
+        np.maximum.at(self.registers, index, rank)
+        return self
+
+    def add(self, values):
+        return self.add_hashes(hash_values(values))
+
+    def merge(self, other):
+        """Fusionner un autre sketch (union des ensembles)"""
+        if other.precision != self.precision:
+            raise ValueError("Impossible de fusionner des sketches de précisions différentes")
+        return HyperLogLog(self.precision, np.maximum(self.registers, other.registers))
+
+    def count(self):
+        """Estimer le nombre de valeurs distinctes"""
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # Correction petites cardinalités (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+    def to_string(self):
+        """Sérialiser le sketch (pour le stocker dans une colonne CSV)"""
+        return f'{self.precision}:' + base64.b64encode(self.registers.tobytes()).decode('ascii')
+
+    @classmethod
+    def from_string(cls, text):
+        precision, payload = text.split(':', 1)
+        registers = np.frombuffer(base64.b64decode(payload), dtype=np.uint8).copy()
+        return cls(int(precision), registers)
+
+
+def merge_all(sketches, precision=DEFAULT_PRECISION):
+    """Fusionner une liste de sketches (sérialisés ou non)"""
+    result = None
+    for sketch in sketches:
+        if isinstance(sketch, str):
+            sketch = HyperLogLog.from_string(sketch)
+        result = sketch if result is None else result.merge(sketch)
+    return result if result is not None else HyperLogLog(precision)
+
+
+def group_sketches(df, keys, column, precision=DEFAULT_PRECISION):
+    """Construire un sketch sérialisé par groupe pour une colonne"""
+    index, rank = _registers(hash_values(df[column]), precision)
+
+    # Registre max par (groupe, index) puis un tableau de registres par groupe
+    registers = pd.DataFrame({'_index': index, '_rank': rank})
+    for key in keys:
+        registers[key] = df[key].to_numpy()
+    best = registers.groupby(keys + ['_index'], sort=False)['_rank'].max().reset_index()
+
+    rows = []
+    for group, part in best.groupby(keys, sort=True):
+        sketch = HyperLogLog(precision)
+        sketch.registers[part['_index'].to_numpy()] = part['_rank'].to_numpy()
+        group = group if isinstance(group, tuple) else (group,)
+        rows.append(dict(zip(keys, group), **{f'{column}_HLL': sketch.to_string()}))
+    return pd.DataFrame(rows, columns=keys + [f'{column}_HLL'])
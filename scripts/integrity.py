@@ -0,0 +1,131 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import INTEGRITY_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# INTÉGRITÉ RÉFÉRENTIELLE (INDEX DE CLÉS TRIÉES + searchsorted)
+# =============================================================================
+#
+# Les clés de chaque table de référence sont triées une seule fois ; les
+# valeurs distinctes des clés étrangères y sont cherchées par dichotomie
+# (np.searchsorted), soit O(n + u log m) sans jointure. Les faits sont
+# parcourus par blocs pour borner la mémoire.
+
+# (table, clé étrangère, table de référence, clé)
+RELATIONSHIPS = [
+    ('Dim_Products', 'CategoryID', 'Categories', 'CategoryID'),
+    ('Dim_Products', 'SupplierID', 'Suppliers', 'SupplierID'),
+    ('Fact_Sales', 'OrderID', 'Orders', 'OrderID'),
+    ('Fact_Sales', 'ProductID', 'Dim_Products', 'ProductID'),
+    ('Fact_Sales', 'CustomerID', 'Dim_Customers', 'CustomerID'),
+    ('Fact_Sales', 'EmployeeID', 'Dim_Employees', 'EmployeeID')
+]
+
+
+def _key_values(values):
+    """Clés non nulles sous une forme comparable (entiers, flottants ou texte)"""
+    values = pd.Series(values).dropna()
+    if pd.api.types.is_integer_dtype(values) or pd.api.types.is_bool_dtype(values):
+        return values.to_numpy(dtype=np.int64)
+    if pd.api.types.is_float_dtype(values):
+        return values.to_numpy(dtype=np.float64)
+    return values.astype(str).to_numpy(dtype=object)
+
+
+class KeyIndex:
+    """Clés d'une table de référence, triées et dédoublonnées"""
+
+    def __init__(self, keys):
+        self.keys = np.unique(_key_values(keys))
+
+    def contains(self, values):
+        """Présence de chaque valeur dans l'index (valeurs non nulles)"""
+        values = _key_values(values)
+        if len(self.keys) == 0:
+            return np.zeros(len(values), dtype=bool)
+        if values.dtype.kind != self.keys.dtype.kind:
+            # Types différents (ex. clé entière relue en flottant): comparaison numérique
+            if values.dtype.kind in 'if' and self.keys.dtype.kind in 'if':
+                values, keys = values.astype(np.float64), self.keys.astype(np.float64)
+            else:
+                values, keys = values.astype(str).astype(object), self.keys.astype(str).astype(object)
+        else:
+            keys = self.keys
+        # Recherche sur les valeurs distinctes triées (accès mémoire séquentiels),
+        # puis report sur chaque ligne par les codes de factorisation
+        codes, distinct = pd.factorize(values)
+        order = np.argsort(distinct, kind='stable')
+        distinct = np.asarray(distinct)[order]
+        positions = np.searchsorted(keys, distinct)
+        positions[positions == len(keys)] = 0
+        found = np.empty(len(distinct), dtype=bool)
+        found[order] = keys[positions] == distinct
+        return found[codes]
+
+
+def orphan_mask(values, index):
+    """Masque des clés étrangères non nulles absentes de l'index"""
+    values = pd.Series(values)
+    present = values.notna().to_numpy()
+    mask = present.copy()
+    mask[present] = ~index.contains(values[present])
+    return pd.Series(mask, index=values.index)
+
+
+def count_orphans(values, index, chunksize, sample_size):
+    """Nombre de clés orphelines et échantillon, bloc par bloc"""
+    orphans = 0
+    sample = []
+    for start in range(0, len(values), chunksize):
+        chunk = values.iloc[start:start + chunksize]
+        mask = orphan_mask(chunk, index).to_numpy()
+        orphans += int(mask.sum())
+        if len(sample) < sample_size and mask.any():
+            sample += [v for v in pd.unique(chunk[mask]).tolist() if v not in sample][:sample_size - len(sample)]
+    return orphans, sample
+
+
+def check_integrity(tables, relationships=None, fail=None):
+    """Contrôler les clés étrangères des tables présentes
+
+    Retourne un rapport (une ligne par relation: lignes, orphelines,
+    échantillon). Avec fail (INTEGRITY_CONFIG['fail_on_orphans'] par défaut),
+    une relation violée lève une erreur.
+    """
+    relationships = RELATIONSHIPS if relationships is None else relationships
+    fail = INTEGRITY_CONFIG['fail_on_orphans'] if fail is None else fail
+    started = time.perf_counter()
+    indexes = {}
+    report = []
+    for table, column, parent, key in relationships:
+        child = tables.get(table)
+        reference = tables.get(parent)
+        if child is None or reference is None or column not in child.columns:
+            continue
+        if (parent, key) not in indexes:
+            indexes[parent, key] = KeyIndex(reference[key])
+        orphans, sample = count_orphans(
+            child[column], indexes[parent, key],
+            INTEGRITY_CONFIG['chunksize'], INTEGRITY_CONFIG['sample_size']
+        )
+        report.append({
+            'Table': table, 'Column': column, 'References': f'{parent}.{key}',
+            'Rows': len(child), 'Orphans': orphans, 'Sample': sample
+        })
+        if orphans:
+            logger.warning(f"⚠️ {table}.{column} -> {parent}.{key}: {orphans} clés orphelines "
+                           f"(ex. {sample})")
+
+    report = pd.DataFrame(report, columns=['Table', 'Column', 'References', 'Rows', 'Orphans', 'Sample'])
+    violated = int((report['Orphans'] > 0).sum())
+    logger.info(f"⏱️ Intégrité référentielle: {len(report)} relations contrôlées, "
+                f"{violated} en défaut ({time.perf_counter() - started:.3f}s)")
+    if fail and violated:
+        raise ValueError(f"Intégrité référentielle: {violated} relations avec des clés orphelines")
+    return report
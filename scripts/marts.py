@@ -0,0 +1,228 @@
+import numpy as np
+import pandas as pd
+
+from geography import country_name, iso3, region_group
+from money import from_cents
+
+# =============================================================================
+# MAGASINS ANALYTIQUES PRÉCALCULÉS (MARTS)
+# =============================================================================
+#
+# Tables dérivées, prêtes à l'emploi pour le dashboard et les notebooks. Elles
+# sont calculées à partir des états compacts maintenus par l'ETL (voir
+# summary_state.py), sans relire l'historique complet des faits.
+
+# -----------------------------------------------------------------------------
+# Segmentation RFM des clients (Récence, Fréquence, Montant)
+# -----------------------------------------------------------------------------
+
+# Nombre de classes par score (quintiles: 1 = plus faible, 5 = meilleur)
+RFM_QUANTILES = 5
+
+# Segments évalués dans l'ordre: (segment, scores R admis, scores F admis)
+RFM_SEGMENTS = [
+    ('Champions', (4, 5), (4, 5)),
+    ('Fidèles', (3, 5), (3, 5)),
+    ('Nouveaux', (4, 5), (1, 2)),
+    ('Potentiels fidèles', (3, 5), (1, 2)),
+    ('À ne pas perdre', (1, 2), (4, 5)),
+    ('À risque', (1, 2), (3, 3)),
+    ('En hibernation', (2, 2), (1, 2)),
+    ('Perdus', (1, 1), (1, 2))
+]
+
+RFM_COLUMNS = [
+    'CustomerID', 'CompanyName', 'Country', 'FirstOrderDate', 'LastOrderDate',
+    'Recency', 'Frequency', 'Monetary', 'MonetaryCents', 'TotalQuantity',
+    'R_Score', 'F_Score', 'M_Score', 'RFM_Cell', 'Segment', 'AsOf'
+]
+
+
+def quantile_scores(values, ascending=True, quantiles=RFM_QUANTILES):
+    """Score 1..quantiles selon le rang centile (vectorisé, ex-aequo au même rang)"""
+    ranks = values.rank(method='average', pct=True, ascending=ascending)
+    return np.ceil(ranks * quantiles).clip(1, quantiles).astype('int64')
+
+
+def customer_rfm(customer_orders, as_of, dim_customers=None):
+    """Construire Customer_RFM à partir d'une ligne par (client, commande)
+
+    customer_orders: CustomerID, OrderDate, OrderID, TotalAmountCents, Quantity
+    as_of: date d'arrêté de la récence (jours depuis la dernière commande)
+    """
+    as_of = pd.Timestamp(as_of)
+    if customer_orders.empty:
+        return pd.DataFrame(columns=RFM_COLUMNS)
+
+    rfm = customer_orders.groupby('CustomerID').agg(
+        FirstOrderDate=('OrderDate', 'min'),
+        LastOrderDate=('OrderDate', 'max'),
+        Frequency=('OrderID', 'size'),
+        MonetaryCents=('TotalAmountCents', 'sum'),
+        TotalQuantity=('Quantity', 'sum')
+    ).reset_index()
+    rfm['MonetaryCents'] = rfm['MonetaryCents'].astype('int64')
+    rfm['TotalQuantity'] = rfm['TotalQuantity'].astype('int64')
+    rfm['Recency'] = (as_of - rfm['LastOrderDate']).dt.days
+    rfm['Monetary'] = from_cents(rfm['MonetaryCents'])
+
+    # Récence: moins de jours = meilleur score
+    rfm['R_Score'] = quantile_scores(rfm['Recency'], ascending=False)
+    rfm['F_Score'] = quantile_scores(rfm['Frequency'])
+    rfm['M_Score'] = quantile_scores(rfm['MonetaryCents'])
+    rfm['RFM_Cell'] = (rfm['R_Score'].astype(str) + rfm['F_Score'].astype(str)
+                       + rfm['M_Score'].astype(str))
+
+    conditions = [
+        rfm['R_Score'].between(*r) & rfm['F_Score'].between(*f)
+        for _, r, f in RFM_SEGMENTS
+    ]
+    rfm['Segment'] = np.select(conditions, [name for name, _, _ in RFM_SEGMENTS], default='Autres')
+    rfm['AsOf'] = as_of
+
+    if dim_customers is not None and not dim_customers.empty:
+        rfm = rfm.merge(dim_customers[['CustomerID', 'CompanyName', 'Country']],
+                        on='CustomerID', how='left')
+    else:
+        rfm['CompanyName'] = pd.NA
+        rfm['Country'] = pd.NA
+
+    return rfm[RFM_COLUMNS].sort_values('CustomerID', ignore_index=True)
+
+
+# -----------------------------------------------------------------------------
+# Séries temporelles des ventes (fenêtres glissantes, cumuls, variations)
+# -----------------------------------------------------------------------------
+
+# Grain -> (période pandas, décalage en périodes pour la comparaison annuelle).
+# Jour et semaine sont comparés à 52 semaines plus tôt (même jour de semaine).
+TIMESERIES_GRAINS = {
+    'Day': ('D', 364),
+    'Week': ('W-SUN', 52),
+    'Month': ('M', 12),
+    'Quarter': ('Q', 4)
+}
+
+# Fenêtres glissantes, en jours calendaires
+ROLLING_WINDOWS = [7, 30, 90]
+
+TIMESERIES_MEASURES = ['TotalSalesCents', 'OrderCount', 'TotalQuantity']
+
+TIMESERIES_COLUMNS = (
+    ['Grain', 'Period', 'PeriodStart', 'PeriodEnd',
+     'TotalSales', 'TotalSalesCents', 'OrderCount', 'TotalQuantity', 'AvgOrderValue']
+    + [f'{m}_{w}D' for m in ('TotalSales', 'OrderCount') for w in ROLLING_WINDOWS]
+    + ['CumulativeSales', 'CumulativeOrders']
+    + [f'{m}_{d}' for d in ('PoP', 'YoY') for m in ('TotalSales', 'OrderCount', 'AvgOrderValue')]
+)
+
+
+def _change(current, previous):
+    """Variation relative (NaN si la période de référence est vide ou absente)"""
+    previous = previous.where(previous != 0)
+    return (current - previous) / previous
+
+
+def sales_timeseries(customer_orders):
+    """Construire Sales_Timeseries (jour, semaine, mois, trimestre) en une passe
+
+    customer_orders: une ligne par commande (OrderDate, TotalAmountCents,
+    Quantity), voir SummaryState.customer_orders(). La série journalière est
+    complétée sur tout le calendrier (jours sans vente à zéro) : fenêtres
+    glissantes et décalages sont alors de simples opérations positionnelles.
+    """
+    if customer_orders.empty:
+        return pd.DataFrame(columns=TIMESERIES_COLUMNS)
+
+    orders = customer_orders.assign(OrderDate=pd.to_datetime(customer_orders['OrderDate']))
+    daily = orders.groupby('OrderDate').agg(
+        TotalSalesCents=('TotalAmountCents', 'sum'),
+        OrderCount=('OrderID', 'size'),
+        TotalQuantity=('Quantity', 'sum')
+    )
+    calendar = pd.date_range(daily.index.min(), daily.index.max(), freq='D')
+    daily = daily.reindex(calendar, fill_value=0).astype('int64')
+
+    # Fenêtres glissantes et cumuls sur les jours, relus en fin de chaque période
+    running = pd.DataFrame(index=calendar)
+    for window in ROLLING_WINDOWS:
+        rolled = daily[['TotalSalesCents', 'OrderCount']].rolling(window, min_periods=1).sum()
+        running[f'TotalSales_{window}D'] = from_cents(rolled['TotalSalesCents'].astype('int64')).to_numpy()
+        running[f'OrderCount_{window}D'] = rolled['OrderCount'].astype('int64')
+    running['CumulativeSales'] = from_cents(daily['TotalSalesCents'].cumsum()).to_numpy()
+    running['CumulativeOrders'] = daily['OrderCount'].cumsum()
+
+    series = []
+    for grain, (freq, year_lag) in TIMESERIES_GRAINS.items():
+        periods = calendar.to_period(freq)
+        totals = daily.groupby(periods)[TIMESERIES_MEASURES].sum()
+        ts = totals.join(running.groupby(periods).last())
+        ts['TotalSales'] = from_cents(ts['TotalSalesCents']).to_numpy()
+        ts['AvgOrderValue'] = ts['TotalSales'] / ts['OrderCount'].where(ts['OrderCount'] != 0)
+
+        # Périodes contiguës: variations par décalage positionnel
+        for lag, suffix in ((1, 'PoP'), (year_lag, 'YoY')):
+            for measure in ('TotalSales', 'OrderCount', 'AvgOrderValue'):
+                ts[f'{measure}_{suffix}'] = _change(ts[measure], ts[measure].shift(lag))
+
+        ts['Grain'] = grain
+        ts['Period'] = ts.index.astype(str)
+        ts['PeriodStart'] = ts.index.start_time.normalize()
+        ts['PeriodEnd'] = ts.index.end_time.normalize()
+        series.append(ts.reset_index(drop=True))
+
+    return pd.concat(series, ignore_index=True)[TIMESERIES_COLUMNS]
+
+
+# -----------------------------------------------------------------------------
+# Ventes par zone géographique (région, pays ISO-3, ville)
+# -----------------------------------------------------------------------------
+
+# Niveau -> clés de regroupement
+GEO_LEVELS = {
+    'Region': ['Region_Group'],
+    'Country': ['Region_Group', 'ISO3', 'Country'],
+    'City': ['Region_Group', 'ISO3', 'Country', 'City']
+}
+
+GEO_COLUMNS = [
+    'Level', 'Region_Group', 'ISO3', 'Country', 'City',
+    'TotalSales', 'TotalSalesCents', 'OrderCount', 'CustomerCount', 'TotalQuantity'
+]
+
+
+def sales_by_geo(customer_orders, dim_customers):
+    """Construire Sales_By_Geo (une ligne par région, pays et ville)
+
+    customer_orders: une ligne par commande (CustomerID, TotalAmountCents,
+    Quantity), voir SummaryState.customer_orders(). Chaque commande est
+    rattachée à la zone de son client; les pays non résolus restent visibles
+    (ISO3 manquant) au lieu de disparaître des totaux.
+    """
+    if customer_orders.empty or dim_customers is None or dim_customers.empty:
+        return pd.DataFrame(columns=GEO_COLUMNS)
+
+    columns = ['CustomerID', 'Country', 'City'] + (['ISO3'] if 'ISO3' in dim_customers.columns else [])
+    places = dim_customers[columns].drop_duplicates('CustomerID')
+    if 'ISO3' not in places.columns:
+        places['ISO3'] = iso3(places['Country'])
+    places['Region_Group'] = region_group(places['ISO3'])
+    places['Country'] = country_name(places['ISO3']).fillna(places['Country'])
+    orders = customer_orders.merge(places, on='CustomerID', how='left')
+
+    rollups = []
+    for level, keys in GEO_LEVELS.items():
+        rollup = orders.groupby(keys, dropna=False).agg(
+            TotalSalesCents=('TotalAmountCents', 'sum'),
+            OrderCount=('OrderID', 'size'),
+            CustomerCount=('CustomerID', 'nunique'),
+            TotalQuantity=('Quantity', 'sum')
+        ).reset_index()
+        rollup['Level'] = level
+        rollups.append(rollup)
+
+    geo = pd.concat(rollups, ignore_index=True)
+    geo['TotalSalesCents'] = geo['TotalSalesCents'].astype('int64')
+    geo['TotalQuantity'] = geo['TotalQuantity'].astype('int64')
+    geo['TotalSales'] = from_cents(geo['TotalSalesCents'])
+    return geo.reindex(columns=GEO_COLUMNS)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# MONTANTS EN VIRGULE FIXE (CENTIMES ENTIERS)
+# =============================================================================
+#
+# Les montants sont calculés et additionnés en centimes int64 : une somme
+# d'entiers est exacte et ne dépend pas de l'ordre des additions, donc un
+# agrégat calculé par partitions, en parallèle ou de façon incrémentale est
+# identique au bit près à un calcul global. Les colonnes en dollars (float)
+# ne servent qu'à l'affichage et sont dérivées des centimes.
+
+CENTS = 100
+
+# Remises exprimées en points de base (0.05 -> 500)
+DISCOUNT_SCALE = 10_000
+
+
+def to_cents(amounts):
+    """Convertir des montants décimaux en centimes entiers (demi-centime arrondi vers le haut)"""
+    amounts = pd.to_numeric(pd.Series(amounts), errors='coerce').fillna(0)
+    values = amounts.to_numpy(dtype=np.float64)
+    # Arrondi à 1e-6 centime d'abord: 2.675 (2.67499...) est bien un demi-centime
+    scaled = np.round(np.abs(values) * CENTS, 6)
+    cents = np.sign(values) * np.floor(scaled + 0.5)
+    return pd.Series(cents.astype(np.int64), index=amounts.index)
+
+
+def from_cents(cents):
+    """Centimes entiers -> dollars (float, pour l'affichage et les CSV)"""
+    if np.isscalar(cents):
+        return int(cents) / CENTS
+    return pd.Series(cents).astype(np.int64) / CENTS
+
+
+def line_amount_cents(unit_price, quantity, discount):
+    """Montant d'une ligne, prix x quantité x (1 - remise), calculé en entiers
+
+    Le seul arrondi (au centime, demi vers le haut) intervient à la fin, sur
+    une valeur entière exacte.
+    """
+    price = to_cents(unit_price)
+    quantity = pd.to_numeric(pd.Series(quantity), errors='coerce').fillna(0)
+    discount = pd.to_numeric(pd.Series(discount), errors='coerce').fillna(0)
+    if (quantity % 1 != 0).any():
+        # Quantités fractionnaires (Access): produit flottant arrondi au centime par ligne
+        amounts = price.to_numpy() / CENTS * quantity.to_numpy() * (1 - discount.to_numpy())
+        return to_cents(pd.Series(amounts, index=price.index))
+    quantity = quantity.astype(np.int64)
+    rate = np.rint(discount.to_numpy(dtype=np.float64) * DISCOUNT_SCALE).astype(np.int64)
+    gross = price.to_numpy() * quantity.to_numpy() * (DISCOUNT_SCALE - rate)
+    return pd.Series((gross + DISCOUNT_SCALE // 2) // DISCOUNT_SCALE, index=price.index)
+
+
+def sum_cents(cents):
+    """Somme exacte (entière) de centimes"""
+    return int(np.sum(np.asarray(cents, dtype=np.int64)))
+
+
+def amount_cents(df, amount='TotalAmount'):
+    """Centimes d'une table de faits (colonne <amount>Cents, sinon dérivés des dollars)"""
+    column = f'{amount}Cents'
+    if column in df.columns:
+        return df[column].astype(np.int64)
+    return to_cents(df[amount])
@@ -0,0 +1,164 @@
+import json
+import os
+import shutil
+from pathlib import Path
+
+import pandas as pd
+
+# =============================================================================
+# STOCKAGE PARTITIONNÉ (STYLE HIVE) AVEC MANIFESTE
+# =============================================================================
+#
+#   Fact_Sales/
+#   ├── _manifest.json               # partitions, lignes, min/max par colonne
+#   ├── Year=1996/Month=07/part-0000.csv
+#   └── Year=1996/Month=08/part-0000.csv
+#
+# Le manifeste permet d'écarter des partitions (valeurs de partition ou
+# statistiques min/max) sans ouvrir les fichiers. La lecture (projection,
+# prédicats) passe par query.py.
+
+MANIFEST_FILE = '_manifest.json'
+
+
+def _format_value(column, value):
+    """Valeur de partition telle qu'écrite dans le chemin (Month=03)"""
+    if column == 'Month':
+        return f'{int(value):02d}'
+    return str(value)
+
+
+def _stat(value):
+    """Valeur min/max sérialisable en JSON"""
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _column_stats(df, columns):
+    stats = {}
+    for column in columns:
+        if column in df.columns and df[column].notna().any():
+            stats[column] = {'min': _stat(df[column].min()), 'max': _stat(df[column].max())}
+    return stats
+
+
+def read_manifest(root):
+    """Lire le manifeste d'un dossier partitionné (None s'il n'existe pas)"""
+    try:
+        with open(Path(root) / MANIFEST_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_manifest(root, manifest):
+    tmp = Path(root) / f'{MANIFEST_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, Path(root) / MANIFEST_FILE)
+
+
+def write_partitioned(df, root, partition_cols, fmt='csv', stats_columns=None, only=None):
+    """Écrire une table partitionnée
+
+    only: ensemble de tuples de valeurs de partition à réécrire. Les autres
+    partitions (fichiers et entrées du manifeste) sont conservées telles
+    quelles, ce qui permet une mise à jour incrémentale.
+    """
+    root = Path(root)
+    stats_columns = stats_columns or []
+    extension = 'parquet' if fmt == 'parquet' else 'csv'
+
+    previous = read_manifest(root) if only is not None else None
+    if previous is None:
+        # Aucune version précédente à compléter: réécriture complète
+        only = None
+    if only is None and root.exists():
+        # Réécriture complète: on repart d'un dossier vide
+        shutil.rmtree(root)
+    root.mkdir(parents=True, exist_ok=True)
+
+    entries = {}
+    if previous is not None:
+        for entry in previous['partitions']:
+            entries[tuple(entry['values'][c] for c in partition_cols)] = entry
+
+    wanted = None
+    if only is not None:
+        wanted = {tuple(_format_value(c, v) for c, v in zip(partition_cols, values))
+                  for values in only}
+
+    written = set()
+    for values, part in df.groupby(partition_cols, sort=True):
+        values = values if isinstance(values, tuple) else (values,)
+        key = tuple(_format_value(c, v) for c, v in zip(partition_cols, values))
+        if wanted is not None and key not in wanted:
+            continue
+
+        relative = Path(*[f'{c}={v}' for c, v in zip(partition_cols, key)]) / f'part-0000.{extension}'
+        target = root / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f'.{target.name}.tmp')
+        if fmt == 'parquet':
+            part.to_parquet(tmp, index=False)
+        else:
+            part.to_csv(tmp, index=False, encoding='utf-8-sig')
+        os.replace(tmp, target)
+
+        entries[key] = {
+            'path': relative.as_posix(),
+            'values': dict(zip(partition_cols, key)),
+            'rows': len(part),
+            'stats': _column_stats(part, stats_columns)
+        }
+        written.add(key)
+
+    # Partitions demandées mais désormais vides: suppression
+    for key in (wanted or set()) - written:
+        entry = entries.pop(key, None)
+        if entry is not None:
+            (root / entry['path']).unlink(missing_ok=True)
+
+    partitions = [entries[k] for k in sorted(entries)]
+    _write_manifest(root, {
+        'table': root.name,
+        'format': fmt,
+        'partition_by': list(partition_cols),
+        'rows': sum(p['rows'] for p in partitions),
+        'partitions': partitions
+    })
+    return partitions
+
+
+def _overlaps(stats, column, low, high):
+    """Indiquer si [min, max] d'une partition recoupe [low, high]"""
+    if column not in stats:
+        return True
+    low, high = _stat(low) if low is not None else None, _stat(high) if high is not None else None
+    if low is not None and stats[column]['max'] is not None and stats[column]['max'] < low:
+        return False
+    if high is not None and stats[column]['min'] is not None and stats[column]['min'] > high:
+        return False
+    return True
+
+
+def prune_partitions(manifest, ranges=None):
+    """Garder les partitions compatibles avec des bornes {colonne: (min, max)}"""
+    kept = []
+    for entry in manifest['partitions']:
+        keep = True
+        for column, (low, high) in (ranges or {}).items():
+            if column in entry['values']:
+                value = entry['values'][column]
+                value = int(value) if value.lstrip('-').isdigit() else value
+                keep = (low is None or value >= low) and (high is None or value <= high)
+            else:
+                keep = _overlaps(entry.get('stats', {}), column, low, high)
+            if not keep:
+                break
+        if keep:
+            kept.append(entry)
+    return kept
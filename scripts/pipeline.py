@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# PIPELINE ASYNCHRONE EXTRACTION -> TRANSFORMATION -> CHARGEMENT
+# =============================================================================
+#
+#   extraction (N threads) --[file bornée]--> transformations --[file bornée]--> écriture
+#
+# - chaque table extraite part aussitôt vers l'écriture et débloque les
+#   transformations dont toutes les entrées sont disponibles ; une table
+#   extraite qu'une transformation déclare en sortie (table source validée)
+#   n'est écrite qu'à la fin de cette transformation,
+# - les appels bloquants (pyodbc, pandas, écriture CSV) tournent dans un pool
+#   de threads, la boucle asyncio ne fait que coordonner,
+# - les files bornées ralentissent l'extraction si l'écriture prend du retard.
+#
+# La durée totale tend vers celle de l'étape la plus lente plutôt que vers la
+# somme des étapes.
+
+
+class AsyncPipeline:
+    """Étapes extraction / transformation / chargement concurrentes"""
+
+    def __init__(self, data, extract, load, transforms=None, load_sources=True,
+                 max_workers=4, load_workers=2, queue_size=4):
+        """
+        data: dictionnaire partagé des tables (self.data de l'ETL)
+        extract: fonction(source) -> DataFrame, appelée dans un thread
+        load: fonction(nom, DataFrame), appelée dans un thread
+        transforms: liste de (fonction, entrées, sorties); la fonction lit et
+            remplit `data` et s'exécute dès que ses entrées sont disponibles
+        load_sources: écrire aussi les tables extraites (après la transformation
+            qui les déclare en sortie, le cas échéant)
+        """
+        self.data = data
+        self.extract = extract
+        self.load = load
+        self.transforms = list(transforms or [])
+        self.load_sources = load_sources
+        self.max_workers = max_workers
+        self.load_workers = load_workers
+        self.queue_size = queue_size
+        self.timings = {'extraction': 0.0, 'transformation': 0.0, 'chargement': 0.0}
+        self._timings_lock = threading.Lock()
+
+    def run(self, sources):
+        """Exécuter le pipeline; sources: liste de (nom, source à extraire)"""
+        start = time.perf_counter()
+        asyncio.run(self._run(list(sources)))
+        elapsed = time.perf_counter() - start
+        busy = ', '.join(f"{stage} {seconds:.2f}s" for stage, seconds in self.timings.items())
+        logger.info(f"⏱️ Pipeline terminé en {elapsed:.2f}s (cumul par étape: {busy})")
+        return self.data
+
+    async def _call(self, executor, stage, func, *args):
+        """Exécuter un appel bloquant dans le pool et mesurer son temps"""
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                with self._timings_lock:
+                    self.timings[stage] += time.perf_counter() - started
+        return await asyncio.get_running_loop().run_in_executor(executor, timed)
+
+    async def _run(self, sources):
+        extracted = asyncio.Queue(self.queue_size)
+        to_load = asyncio.Queue(self.queue_size)
+        slots = asyncio.Semaphore(self.max_workers)
+        workers = self.max_workers + self.load_workers + 1
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+
+            async def extract_one(name, source):
+                async with slots:
+                    df = await self._call(executor, 'extraction', self.extract, source)
+                await extracted.put((name, df))
+
+            async def extract_stage():
+                try:
+                    await asyncio.gather(*(extract_one(n, s) for n, s in sources))
+                finally:
+                    await extracted.put(None)
+
+            async def transform_stage():
+                try:
+                    await self._transform_stage(executor, extracted, to_load)
+                finally:
+                    for _ in range(self.load_workers):
+                        await to_load.put(None)
+
+            async def load_stage():
+                while True:
+                    item = await to_load.get()
+                    if item is None:
+                        return
+                    name, df = item
+                    if df is not None and not df.empty:
+                        await self._call(executor, 'chargement', self.load, name, df)
+
+            await asyncio.gather(
+                extract_stage(),
+                transform_stage(),
+                *(load_stage() for _ in range(self.load_workers))
+            )
+
+    async def _transform_stage(self, executor, extracted, to_load):
+        """Recevoir les tables extraites et lancer les transformations prêtes"""
+        available = set()
+        pending = list(self.transforms)
+        running = {}
+        # Tables extraites réécrites par une transformation: écrites à la fin de celle-ci
+        produced = {name for _, _, outputs in self.transforms for name in outputs}
+        extracting = True
+        getter = asyncio.ensure_future(extracted.get())
+
+        def ready(transform):
+            _, inputs, _ = transform
+            missing = set(inputs) - available
+            if not missing:
+                return True
+            if extracting:
+                return False
+            # Extraction terminée: une entrée absente ne viendra que d'une autre transformation
+            upcoming = {out for _, _, outputs in pending + list(running.values())
+                        for out in outputs if out not in available}
+            return not (missing & upcoming)
+
+        while extracting or pending or running:
+            for transform in [t for t in pending if ready(t)]:
+                pending.remove(transform)
+                func = transform[0]
+                task = asyncio.ensure_future(self._call(executor, 'transformation', func))
+                running[task] = transform
+
+            waiting = set(running) | ({getter} if extracting else set())
+            if not waiting:
+                break
+            done, _ = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                if task is getter:
+                    item = task.result()
+                    if item is None:
+                        extracting = False
+                        continue
+                    name, df = item
+                    self.data[name] = df
+                    available.add(name)
+                    if self.load_sources and name not in produced:
+                        await to_load.put((name, df))
+                    getter = asyncio.ensure_future(extracted.get())
+                else:
+                    _, _, outputs = running.pop(task)
+                    task.result()
+                    for name in outputs:
+                        available.add(name)
+                        if name in self.data:
+                            await to_load.put((name, self.data[name]))
@@ -0,0 +1,180 @@
+import operator
+from pathlib import Path
+
+import pandas as pd
+
+from config import DATA_PATH
+from dataset import resolve_directory, resolve_table
+from partitions import prune_partitions, read_manifest
+
+# =============================================================================
+# REQUÊTES SUR LES SORTIES DE L'ETL (PROJECTION + PRÉDICATS POUSSÉS)
+# =============================================================================
+#
+#   query('Fact_Sales',
+#         columns=['OrderID', 'TotalAmount'],
+#         where=[('OrderDate', 'between', ('1997-01-01', '1997-03-31'))],
+#         group_by=['OrderID'],
+#         aggs={'Total': ('TotalAmount', 'sum')})
+#
+# - seules les colonnes utiles sont lues (usecols / columns),
+# - les partitions hors prédicats sont écartées grâce au manifeste,
+# - en Parquet, les prédicats sont transmis au lecteur (statistiques des
+#   row groups) ; en CSV, le fichier est filtré par blocs.
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge
+}
+
+CSV_CHUNK_SIZE = 200_000
+
+
+def _bounds(where):
+    """Bornes {colonne: (min, max)} déduites des prédicats, pour l'élagage"""
+    ranges = {}
+    for column, op, value in where or []:
+        if op == '==':
+            low, high = value, value
+        elif op in ('>', '>='):
+            low, high = value, None
+        elif op in ('<', '<='):
+            low, high = None, value
+        elif op == 'between':
+            low, high = value
+        elif op == 'in':
+            values = list(value)
+            try:
+                low, high = min(values), max(values)
+            except TypeError:
+                continue
+        else:
+            continue
+
+        current_low, current_high = ranges.get(column, (None, None))
+        if current_low is not None and low is not None:
+            low = max(current_low, low)
+        if current_high is not None and high is not None:
+            high = min(current_high, high)
+        ranges[column] = (low if low is not None else current_low,
+                          high if high is not None else current_high)
+    return ranges
+
+
+def _to_timestamp(value):
+    if isinstance(value, (list, tuple, set)):
+        return [pd.Timestamp(v) for v in value]
+    return pd.Timestamp(value)
+
+
+def _coerce(series, value):
+    """Aligner le type d'une valeur de prédicat sur celui de la colonne"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return _to_timestamp(value)
+    return value
+
+
+def apply_where(df, where):
+    """Appliquer les prédicats (vectorisés) à un DataFrame"""
+    if not where or df.empty:
+        return df
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in where:
+        series = df[column]
+        value = _coerce(series, value)
+        if op == 'in':
+            mask &= series.isin(value)
+        elif op == 'between':
+            mask &= series.between(value[0], value[1])
+        else:
+            mask &= OPERATORS[op](series, value)
+    return df[mask]
+
+
+def _parquet_filters(where):
+    """Prédicats au format pyarrow (liste de tuples)"""
+    filters = []
+    for column, op, value in where or []:
+        if op == 'between':
+            filters += [(column, '>=', value[0]), (column, '<=', value[1])]
+        elif op in OPERATORS or op == 'in':
+            filters.append((column, op, value))
+    return filters or None
+
+
+def _read_file(path, fmt, columns, where, dtype, parse_dates):
+    """Lire un fichier en poussant projection et prédicats"""
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns, filters=_parquet_filters(where))
+        return apply_where(df, where)
+
+    dtype = {c: t for c, t in (dtype or {}).items() if columns is None or c in columns}
+    parse_dates = [c for c in (parse_dates or []) if columns is None or c in columns]
+    frames = []
+    for chunk in pd.read_csv(path, usecols=columns, dtype=dtype, parse_dates=parse_dates,
+                             encoding='utf-8-sig', chunksize=CSV_CHUNK_SIZE):
+        frames.append(apply_where(chunk, where))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _needed_columns(columns, where, group_by, aggs):
+    if columns is None and not group_by and not aggs:
+        return None
+    needed = list(columns or [])
+    needed += [c for c, _, _ in where or []]
+    needed += list(group_by or [])
+    needed += [source for source, _ in (aggs or {}).values()]
+    return list(dict.fromkeys(needed))
+
+
+def query(table, columns=None, where=None, group_by=None, aggs=None,
+          dtype=None, parse_dates=None, data_path=DATA_PATH):
+    """Interroger une table de sortie de l'ETL et ne retourner que le résultat
+
+    table: nom de la table (dossier partitionné avec manifeste, sinon fichier
+        de la version publiée ou data/<table>.csv)
+    columns: colonnes à retourner (toutes si None)
+    where: liste de (colonne, opérateur, valeur); opérateurs ==, !=, <, <=,
+        >, >=, in, between
+    group_by / aggs: agrégation nommée, ex. {'Total': ('TotalAmount', 'sum')}
+    """
+    data_path = Path(data_path)
+    # Bornes de dates en Timestamp pour les comparer aux statistiques du manifeste
+    where = [
+        (c, op, _to_timestamp(v) if c in (parse_dates or []) else v)
+        for c, op, v in where or []
+    ]
+    read_columns = _needed_columns(columns, where, group_by, aggs)
+
+    root = resolve_directory(data_path, table)
+    manifest = read_manifest(root)
+    if manifest is not None:
+        fmt = manifest.get('format', 'csv')
+        entries = prune_partitions(manifest, _bounds(where))
+        frames = [
+            _read_file(root / entry['path'], fmt, read_columns, where,
+                       dtype, parse_dates)
+            for entry in entries
+        ]
+        frames = [f for f in frames if not f.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=read_columns)
+    else:
+        path = resolve_table(data_path, table)
+        if not path.exists():
+            return pd.DataFrame()
+        df = _read_file(path, 'csv', read_columns, where, dtype, parse_dates)
+
+    if aggs:
+        if group_by:
+            return df.groupby(list(group_by), observed=True).agg(**aggs).reset_index()
+        return pd.DataFrame({name: [df[source].agg(func)] for name, (source, func) in aggs.items()})
+
+    if columns is not None:
+        df = df[list(columns)]
+    return df.reset_index(drop=True)
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# DIMENSIONS À VARIATION LENTE (SCD TYPE 2)
+# =============================================================================
+#
+# Chaque version d'un membre de dimension est une ligne avec sa période de
+# validité [EffectiveFrom, EffectiveTo[ et sa clé de substitution (entier
+# propre à la version). La version courante a IsCurrent=True et
+# EffectiveTo=END_OF_TIME. D'une exécution à l'autre, seules les lignes dont
+# l'empreinte des attributs suivis a changé sont fermées puis rouvertes ; les
+# colonnes « écrasées » (stocks...) sont mises à jour sur la version courante
+# sans en créer de nouvelle.
+
+END_OF_TIME = pd.Timestamp('9999-12-31')
+
+
+def row_hash(df, columns):
+    """Empreinte 64 bits (vectorisée) des attributs suivis de chaque ligne"""
+    # Comparaison sur le texte: indépendante des types relus depuis le CSV
+    values = df[columns].astype('string').fillna('')
+    hashes = pd.util.hash_pandas_object(values, index=False).to_numpy(dtype=np.uint64)
+    return pd.Series(hashes.view(np.int64), index=df.index)
+
+
+def _align_types(history, incoming):
+    """Redonner à l'historique relu du CSV les types des lignes extraites"""
+    history = history.copy()
+    for column in incoming.columns.intersection(history.columns):
+        dtype = incoming[column].dtype
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            history[column] = pd.to_datetime(history[column])
+        else:
+            try:
+                history[column] = history[column].astype(dtype)
+            except (TypeError, ValueError):
+                pass
+    history['EffectiveFrom'] = pd.to_datetime(history['EffectiveFrom'])
+    history['EffectiveTo'] = pd.to_datetime(history['EffectiveTo'])
+    history['IsCurrent'] = history['IsCurrent'].astype(bool)
+    return history
+
+
+def _assign_surrogate_keys(history, surrogate_key):
+    """Numéroter les versions qui n'ont pas encore de clé de substitution"""
+    if surrogate_key not in history.columns:
+        history[surrogate_key] = pd.NA
+    keys = pd.to_numeric(history[surrogate_key], errors='coerce')
+    missing = keys.isna()
+    start = int(keys.max()) + 1 if keys.notna().any() else 1
+    keys[missing] = np.arange(start, start + int(missing.sum()))
+    history[surrogate_key] = keys.astype('int64')
+    return history
+
+
+def scd2_merge(history, incoming, key, attributes, as_of, surrogate_key=None, overwrite=None):
+    """Fusionner l'état courant d'une dimension dans son historique SCD2
+
+    history: historique publié (None ou vide au premier passage)
+    incoming: lignes extraites à la date as_of (une par clé métier)
+    attributes: colonnes dont un changement ouvre une nouvelle version
+    surrogate_key: colonne recevant une clé entière par version
+    overwrite: colonnes mises à jour sur la version courante, sans historique
+    Retourne (historique, nombre de versions ouvertes, nombre de versions fermées).
+    """
+    as_of = pd.Timestamp(as_of)
+    overwrite = [c for c in (overwrite or []) if c in incoming.columns]
+    incoming = incoming.copy()
+    incoming['RowHash'] = row_hash(incoming, attributes)
+
+    def open_versions(rows):
+        rows = rows.copy()
+        rows['EffectiveFrom'] = as_of
+        rows['EffectiveTo'] = END_OF_TIME
+        rows['IsCurrent'] = True
+        return rows
+
+    def finish(history):
+        history = history.sort_values([key, 'EffectiveFrom'], kind='stable', ignore_index=True)
+        if surrogate_key is not None:
+            history = _assign_surrogate_keys(history, surrogate_key)
+        return history
+
+    if history is None or history.empty:
+        return finish(open_versions(incoming)), len(incoming), 0
+
+    history = _align_types(history, incoming)
+
+    current = history.loc[history['IsCurrent'], [key, 'RowHash']]
+    if set(attributes) <= set(history.columns):
+        # Empreinte recalculée sur les attributs du jour: retirer une colonne
+        # (projection à l'extraction) n'ouvre pas de nouvelle version
+        current['RowHash'] = row_hash(history.loc[current.index], attributes)
+    compared = incoming[[key, 'RowHash']].merge(
+        current, on=key, how='outer', suffixes=('', '_current'), indicator=True
+    )
+    changed = compared['_merge'].eq('both') & compared['RowHash'].ne(compared['RowHash_current'])
+
+    # Nouvelles clés ou attributs modifiés: nouvelle version
+    opened = set(compared.loc[compared['_merge'].eq('left_only') | changed, key])
+    # Attributs modifiés ou membre disparu de la source: version courante fermée
+    closed = set(compared.loc[compared['_merge'].eq('right_only') | changed, key])
+
+    to_close = history['IsCurrent'] & history[key].isin(closed)
+    history.loc[to_close, 'EffectiveTo'] = as_of
+    history.loc[to_close, 'IsCurrent'] = False
+
+    # Colonnes écrasées: valeur du jour sur les versions courantes conservées
+    if overwrite:
+        latest = incoming.drop_duplicates(key, keep='last').set_index(key)[overwrite]
+        kept = history.index[history['IsCurrent'] & history[key].isin(latest.index)]
+        history.loc[kept, overwrite] = latest.loc[history.loc[kept, key]].to_numpy()
+
+    new_rows = open_versions(incoming[incoming[key].isin(opened)])
+    if not new_rows.empty:
+        history = pd.concat([history, new_rows], ignore_index=True)
+
+    return finish(history), len(new_rows), int(to_close.sum())
+
+
+def lookup_version_keys(facts, history, key, date_column, surrogate_key):
+    """Clé de la version valide à la date de chaque fait (jointure as-of vectorisée)"""
+    versions = history[[key, 'EffectiveFrom', surrogate_key]].copy()
+    versions['EffectiveFrom'] = pd.to_datetime(versions['EffectiveFrom'])
+    versions = versions.sort_values('EffectiveFrom')
+    if facts[key].dtype != versions[key].dtype:
+        versions[key] = versions[key].astype(facts[key].dtype)
+
+    left = facts[[key, date_column]].reset_index()
+    left[date_column] = pd.to_datetime(left[date_column])
+    left = left.dropna(subset=[key, date_column]).sort_values(date_column)
+    matched = pd.merge_asof(
+        left, versions, left_on=date_column, right_on='EffectiveFrom',
+        by=key, direction='backward'
+    )
+    keys = matched.set_index('index')[surrogate_key].reindex(facts.index)
+
+    # Faits antérieurs à la première version connue: version la plus ancienne
+    first = versions.drop_duplicates(key, keep='first').set_index(key)[surrogate_key]
+    keys = keys.fillna(facts[key].map(first))
+    return keys.astype('Int64')
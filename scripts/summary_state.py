@@ -0,0 +1,186 @@
+import pandas as pd
+
+from config import STATE_PATH
+from money import amount_cents, from_cents
+
+# =============================================================================
+# MAINTENANCE INCRÉMENTALE DES RÉSUMÉS DE VENTES
+# =============================================================================
+#
+# L'état conserve, pour chaque résumé, une ligne par (groupe, OrderID) avec le
+# nombre de lignes de faits, le montant et la quantité. Un lot de lignes
+# ajoutées (+1) ou retirées (-1) s'applique par simple addition ; une commande
+# disparaît d'un groupe quand son nombre de lignes retombe à zéro, ce qui donne
+# un comptage distinct exact des commandes, y compris après suppressions.
+# Les montants sont cumulés en centimes entiers : l'état ne dérive pas au fil
+# des mises à jour et donne les mêmes totaux qu'un recalcul complet.
+# Le même mécanisme tient, par client, une ligne par (date, commande) : la
+# tables Customer_RFM et Sales_Timeseries (marts.py) en dérivent sans relire
+# l'historique des faits.
+
+SUMMARY_STATE_FILE = STATE_PATH / 'summary_state.pkl'
+
+# Résumé -> clés de regroupement et colonnes publiées
+SUMMARY_SPECS = {
+    'Sales_By_Month': {
+        'keys': ['Year', 'Month'],
+        'columns': ['Year', 'Month', 'TotalSales', 'OrderCount', 'TotalQuantity', 'TotalSalesCents']
+    },
+    'Sales_By_Category': {
+        'keys': ['CategoryName'],
+        'columns': ['CategoryName', 'TotalSales', 'TotalQuantity', 'TotalSalesCents']
+    },
+    'Sales_By_Country': {
+        'keys': ['Country'],
+        'columns': ['Country', 'TotalSales', 'OrderCount', 'TotalSalesCents']
+    }
+}
+
+MEASURES = ['Lines', 'TotalAmountCents', 'Quantity']
+
+# Grain de l'état client (récence, fréquence et montant par client)
+CUSTOMER_KEYS = ['CustomerID', 'OrderDate', 'OrderID']
+
+
+class SummaryState:
+    """État additif des résumés (par groupe et par commande) et des totaux produits"""
+
+    def __init__(self, groups=None, products=None, customers=None):
+        self.groups = groups or {}
+        self.products = products if products is not None else pd.DataFrame(
+            columns=MEASURES, index=pd.Index([], name='ProductID')
+        )
+        self.customers = customers
+
+    @classmethod
+    def from_facts(cls, fact_sales, dim_products=None, dim_customers=None):
+        """Construire l'état complet à partir de Fact_Sales"""
+        state = cls()
+        state.apply(fact_sales, 1, dim_products, dim_customers)
+        return state
+
+    @staticmethod
+    def _prepare(rows, sign, dim_products, dim_customers):
+        """Ajouter les attributs de regroupement et le signe aux lignes de faits"""
+        delta = rows[['OrderID', 'ProductID', 'CustomerID', 'Year', 'Month', 'Quantity']].copy()
+        delta['OrderDate'] = pd.to_datetime(rows['OrderDate']).dt.normalize()
+        delta['Lines'] = sign
+        delta['TotalAmountCents'] = amount_cents(rows) * sign
+        delta['Quantity'] = delta['Quantity'] * sign
+        if dim_products is not None and not dim_products.empty and 'CategoryName' in dim_products.columns:
+            delta['CategoryName'] = delta['ProductID'].map(
+                dim_products.set_index('ProductID')['CategoryName']
+            )
+        if dim_customers is not None and not dim_customers.empty:
+            delta['Country'] = delta['CustomerID'].map(
+                dim_customers.set_index('CustomerID')['Country']
+            )
+        return delta
+
+    @staticmethod
+    def _merge(state, delta):
+        """Additionner un delta agrégé dans un état indexé, sans réaligner tout l'état"""
+        if state is None or state.empty:
+            merged = delta
+        else:
+            common = delta.index.intersection(state.index)
+            state = state.copy()
+            state.loc[common, MEASURES] = state.loc[common, MEASURES] + delta.loc[common, MEASURES]
+            merged = pd.concat([state, delta.drop(common)])
+        return merged[merged['Lines'] != 0]
+
+    def apply(self, rows, sign, dim_products=None, dim_customers=None):
+        """Appliquer un lot de lignes (+1 ajout, -1 retrait); retourne les groupes touchés"""
+        touched = {}
+        if rows is None or rows.empty:
+            return touched
+
+        delta = self._prepare(rows, sign, dim_products, dim_customers)
+
+        for name, spec in SUMMARY_SPECS.items():
+            keys = spec['keys']
+            if not set(keys) <= set(delta.columns):
+                continue
+            grouped = delta.groupby(keys + ['OrderID'])[MEASURES].sum()
+            self.groups[name] = self._merge(self.groups.get(name), grouped)
+            touched[name] = delta[keys].drop_duplicates()
+
+        by_product = delta.groupby('ProductID')[MEASURES].sum()
+        self.products = self._merge(self.products, by_product)
+
+        by_customer = delta.groupby(CUSTOMER_KEYS)[MEASURES].sum()
+        self.customers = self._merge(self.customers, by_customer)
+        return touched
+
+    def customer_orders(self):
+        """Commandes courantes par client (date, montant, quantité), une ligne par commande"""
+        if self.customers is None:
+            return pd.DataFrame(columns=CUSTOMER_KEYS + MEASURES)
+        return self.customers.reset_index()
+
+    def summary(self, name, groups=None):
+        """Calculer un résumé, éventuellement restreint à certains groupes"""
+        spec = SUMMARY_SPECS[name]
+        keys = spec['keys']
+        state = self.groups.get(name)
+        if state is None:
+            return pd.DataFrame(columns=spec['columns'])
+
+        if groups is not None:
+            wanted = pd.MultiIndex.from_frame(groups[keys])
+            state_keys = pd.MultiIndex.from_frame(state.index.to_frame(index=False)[keys])
+            state = state[state_keys.isin(wanted)]
+
+        summary = state.groupby(level=keys).agg(
+            TotalSalesCents=('TotalAmountCents', 'sum'),
+            OrderCount=('Lines', 'size'),
+            TotalQuantity=('Quantity', 'sum')
+        ).reset_index()
+        summary['TotalSalesCents'] = summary['TotalSalesCents'].astype('int64')
+        summary['TotalSales'] = from_cents(summary['TotalSalesCents'])
+        summary['TotalQuantity'] = summary['TotalQuantity'].astype('int64')
+        return summary[spec['columns']]
+
+    def summaries(self):
+        """Calculer tous les résumés à partir de l'état"""
+        return {name: self.summary(name) for name in SUMMARY_SPECS if name in self.groups}
+
+    def top_products(self, dim_products=None, n=10):
+        """Top des produits par chiffre d'affaires à partir des totaux maintenus"""
+        top = self.products.reset_index()[['ProductID', 'TotalAmountCents', 'Quantity']]
+        top['TotalAmountCents'] = top['TotalAmountCents'].astype('int64')
+        top['Quantity'] = top['Quantity'].astype('int64')
+        top = top.nlargest(n, 'TotalAmountCents')
+        top.insert(1, 'TotalAmount', from_cents(top['TotalAmountCents']))
+        if dim_products is not None and not dim_products.empty:
+            top = pd.merge(top, dim_products[['ProductID', 'ProductName']],
+                           on='ProductID', how='left')
+        return top.reset_index(drop=True)
+
+    def save(self, path=None):
+        """Sauvegarder l'état pour la prochaine exécution"""
+        pd.to_pickle({'groups': self.groups, 'products': self.products,
+                      'customers': self.customers}, path or SUMMARY_STATE_FILE)
+
+    @classmethod
+    def load(cls, path=None):
+        """Relire l'état sauvegardé (None s'il n'existe pas)"""
+        try:
+            payload = pd.read_pickle(path or SUMMARY_STATE_FILE)
+        except FileNotFoundError:
+            return None
+        # État d'un format antérieur (montants flottants, sans état client): reconstruction
+        if 'TotalAmountCents' not in payload['products'].columns or 'customers' not in payload:
+            return None
+        return cls(payload['groups'], payload['products'], payload['customers'])
+
+
+def replace_groups(summary, fresh, keys, groups):
+    """Remplacer dans un résumé publié les lignes des groupes recalculés"""
+    if summary is not None and not summary.empty:
+        stale = pd.MultiIndex.from_frame(summary[keys]).isin(pd.MultiIndex.from_frame(groups[keys]))
+        summary = summary[~stale]
+    parts = [df for df in (summary, fresh) if df is not None and not df.empty]
+    if not parts:
+        return fresh
+    return pd.concat(parts, ignore_index=True).sort_values(keys, ignore_index=True)
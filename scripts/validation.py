@@ -0,0 +1,154 @@
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from integrity import KeyIndex, orphan_mask
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# CONTRÔLE QUALITÉ DES TABLES EXTRAITES (RÈGLES DÉCLARATIVES + QUARANTAINE)
+# =============================================================================
+#
+# Chaque règle est évaluée en un seul passage vectorisé sur la colonne (ou
+# une recherche dans les clés triées pour l'intégrité référentielle, voir
+# integrity.py). Les lignes en échec sont retirées de la table et publiées
+# dans la table Quarantine, avec la liste des règles violées et
+# l'enregistrement d'origine (JSON). Les tables sont
+# contrôlées dans l'ordre du dictionnaire : une commande rejetée rend ses
+# lignes de commande orphelines, elles sont donc rejetées à leur tour.
+#
+# Règles disponibles:
+#   not_null    {'columns': [...]}
+#   range       {'column': ..., 'min': ..., 'max': ...}   (bornes incluses)
+#   unique      {'columns': [...]}                         (1re occurrence gardée)
+#   references  {'column': ..., 'table': ..., 'key': ...}  (key = column par défaut)
+
+QUARANTINE_TABLE = 'Quarantine'
+QUARANTINE_COLUMNS = ['Table', 'FailedRules', 'Record']
+
+VALIDATION_RULES = {
+    'Customers': [
+        {'check': 'not_null', 'columns': ['CustomerID', 'CompanyName']},
+        {'check': 'unique', 'columns': ['CustomerID']}
+    ],
+    'Products': [
+        {'check': 'not_null', 'columns': ['ProductID', 'ProductName', 'UnitPrice']},
+        {'check': 'range', 'column': 'UnitPrice', 'min': 0},
+        {'check': 'unique', 'columns': ['ProductID']}
+    ],
+    'Orders': [
+        {'check': 'not_null', 'columns': ['OrderID', 'OrderDate']},
+        {'check': 'unique', 'columns': ['OrderID']},
+        {'check': 'references', 'column': 'CustomerID', 'table': 'Customers'},
+        {'check': 'references', 'column': 'EmployeeID', 'table': 'Employees'}
+    ],
+    'OrderDetails': [
+        {'check': 'not_null', 'columns': ['OrderID', 'ProductID', 'UnitPrice', 'Quantity', 'Discount']},
+        {'check': 'range', 'column': 'UnitPrice', 'min': 0},
+        {'check': 'range', 'column': 'Quantity', 'min': 1},
+        {'check': 'range', 'column': 'Discount', 'min': 0, 'max': 1},
+        {'check': 'unique', 'columns': ['OrderID', 'ProductID']},
+        {'check': 'references', 'column': 'OrderID', 'table': 'Orders'},
+        {'check': 'references', 'column': 'ProductID', 'table': 'Products'}
+    ]
+}
+
+
+def rule_name(rule):
+    """Libellé d'une règle dans la table de quarantaine"""
+    check = rule['check']
+    if check in ('not_null', 'unique'):
+        return f"{check}({', '.join(rule['columns'])})"
+    if check == 'range':
+        return f"range({rule['column']} in [{rule.get('min', '')}, {rule.get('max', '')}])"
+    return f"references({rule['column']} -> {rule['table']}.{rule.get('key', rule['column'])})"
+
+
+def rule_columns(rules=None):
+    """Colonnes lues par les règles, par table (clés référencées comprises)"""
+    rules = VALIDATION_RULES if rules is None else rules
+    columns = {}
+    for table, table_rules in rules.items():
+        for rule in table_rules:
+            columns.setdefault(table, []).extend(rule.get('columns') or [rule['column']])
+            if rule['check'] == 'references':
+                columns.setdefault(rule['table'], []).append(rule.get('key', rule['column']))
+    return columns
+
+
+def failing_rows(df, rule, tables):
+    """Masque (vectorisé) des lignes qui violent une règle"""
+    check = rule['check']
+    if check == 'not_null':
+        return df[rule['columns']].isna().any(axis=1)
+    if check == 'range':
+        # Valeurs nulles laissées à not_null
+        values = df[rule['column']]
+        failed = pd.Series(False, index=df.index)
+        if rule.get('min') is not None:
+            failed |= values < rule['min']
+        if rule.get('max') is not None:
+            failed |= values > rule['max']
+        return failed
+    if check == 'unique':
+        return df.duplicated(rule['columns'], keep='first')
+    if check == 'references':
+        parent = tables.get(rule['table'])
+        if parent is None or parent.empty:
+            raise ValueError(f"Table de référence '{rule['table']}' absente")
+        return orphan_mask(df[rule['column']], KeyIndex(parent[rule.get('key', rule['column'])]))
+    raise ValueError(f"Règle de validation inconnue: {check}")
+
+
+def validate_table(name, df, rules, tables):
+    """Séparer une table en lignes valides et lignes en quarantaine"""
+    failed = np.zeros(len(df), dtype=bool)
+    labels = np.full(len(df), '', dtype=object)
+    for rule in rules:
+        mask = failing_rows(df, rule, tables).to_numpy()
+        if mask.any():
+            labels[mask] = labels[mask] + rule_name(rule) + '; '
+            failed |= mask
+
+    if not failed.any():
+        return df, pd.DataFrame(columns=QUARANTINE_COLUMNS)
+
+    rejected = df[failed]
+    records = rejected.to_json(orient='records', lines=True, date_format='iso').splitlines()
+    quarantine = pd.DataFrame({
+        'Table': name,
+        'FailedRules': pd.Series(labels[failed]).str.rstrip('; ').to_numpy(),
+        'Record': records
+    })
+    return df[~failed], quarantine
+
+
+def validate(tables, rules=None):
+    """Contrôler les tables extraites; retourne (tables valides, quarantaine)
+
+    Une table soumise à des règles mais vide ou absente (extraction en échec)
+    lève une erreur plutôt que de produire silencieusement des sorties vides.
+    """
+    rules = VALIDATION_RULES if rules is None else rules
+    started = time.perf_counter()
+    tables = dict(tables)
+    rejected = []
+    for name, table_rules in rules.items():
+        df = tables.get(name)
+        if df is None or df.empty:
+            raise ValueError(f"Table '{name}' vide ou non extraite: validation impossible")
+        tables[name], quarantine = validate_table(name, df, table_rules, tables)
+        if not quarantine.empty:
+            logger.warning(f"⚠️ {name}: {len(quarantine)} lignes en quarantaine "
+                           f"({quarantine['FailedRules'].value_counts().to_dict()})")
+            rejected.append(quarantine)
+
+    quarantine = (pd.concat(rejected, ignore_index=True) if rejected
+                  else pd.DataFrame(columns=QUARANTINE_COLUMNS))
+    checked = sum(len(tables[name]) for name in rules)
+    logger.info(f"⏱️ Validation: {checked} lignes valides, {len(quarantine)} en quarantaine "
+                f"({time.perf_counter() - started:.3f}s)")
+    return tables, quarantine
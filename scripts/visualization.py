@@ -1,53 +1,206 @@
-import pandas as pd
+import argparse
+import hashlib
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import matplotlib
+matplotlib.use('Agg')  # Rendu sans affichage, y compris dans les processus de travail
 import matplotlib.pyplot as plt
+import numpy as np
 import seaborn as sns
-import os
-
-# Create figures directory if it doesn't exist
-if not os.path.exists('../figures'):
-    os.makedirs('../figures')
-
-print("Loading data...")
-# Load Data
-try:
-    df_sales = pd.read_csv('../data/Fact_Sales.csv')
-    df_customers = pd.read_csv('../data/Dim_Customers.csv')
-    df_products = pd.read_csv('../data/Dim_Products.csv')
-    
-    # Load Access Data
-    df_access_orders = pd.read_csv('../data/access_Orders.csv')
-    
-    print("Data loaded successfully.")
-    
-    # Set style
-    plt.style.use('seaborn-v0_8')
-    sns.set_palette("husl")
-    
-    # 1. Sales Distribution
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df_sales['TotalAmount'], bins=50, kde=True)
-    plt.title('Distribution of Sales Amounts (SQL Server)')
-    plt.xlabel('Amount ($)')
-    plt.savefig('../figures/sales_distribution.png')
-    print("Generated sales_distribution.png")
-    
-    # 2. Top Countries
-    plt.figure(figsize=(12, 6))
-    country_counts = df_customers['Country'].value_counts().head(10)
-    sns.barplot(x=country_counts.values, y=country_counts.index)
-    plt.title('Top 10 Countries by Customer Count')
-    plt.savefig('../figures/top_countries.png')
-    print("Generated top_countries.png")
-    
-    # 3. Access Orders Status
-    plt.figure(figsize=(8, 8))
-    status_counts = df_access_orders['Status ID'].value_counts()
-    plt.pie(status_counts, labels=status_counts.index, autopct='%1.1f%%')
-    plt.title('Access Orders Status Distribution')
-    plt.savefig('../figures/access_order_status.png')
-    print("Generated access_order_status.png")
-    
-    print("All figures generated in /figures folder.")
-
-except Exception as e:
-    print(f"Error: {e}")
+
+from config import CHART_CONFIG, DATA_PATH, FIGURES_PATH, STATE_PATH
+from data_access import Warehouse
+from query import query
+
+# =============================================================================
+# GÉNÉRATION DES GRAPHIQUES STATIQUES (PNG)
+# =============================================================================
+#
+# Chaque graphique est déclaré dans FIGURES avec les tables qu'il lit. Les
+# graphiques sont rendus en parallèle dans un pool de processus (backend Agg),
+# chaque processus ne lisant que les colonnes utiles. Un graphique n'est
+# régénéré que si l'empreinte de ses tables (version publiée) ou la
+# configuration des graphiques a changé depuis son dernier rendu.
+
+FIGURES_STATE_FILE = STATE_PATH / 'figures.json'
+
+
+def binned_distribution(values, bins, grid=512):
+    """Histogramme et densité (KDE gaussienne) calculés à partir de valeurs pré-agrégées
+
+    La densité est obtenue en lissant un histogramme fin par un noyau gaussien
+    (largeur de Silverman) : O(n + grid) au lieu d'une évaluation point par
+    point. Elle est exprimée en effectifs par classe, comme sns.histplot(kde=True).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    counts, edges = np.histogram(values, bins=bins)
+
+    fine, fine_edges = np.histogram(values, bins=grid, range=(edges[0], edges[-1]))
+    centers = (fine_edges[:-1] + fine_edges[1:]) / 2
+    bandwidth = 1.06 * values.std() * len(values) ** (-1 / 5) if len(values) > 1 else 0
+    step = fine_edges[1] - fine_edges[0]
+    if bandwidth <= 0 or step <= 0:
+        return counts, edges, centers, None
+
+    radius = min(int(np.ceil(4 * bandwidth / step)), grid - 1)
+    offsets = np.arange(-radius, radius + 1) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    # Convolution complète recentrée: un point par classe, même si le noyau dépasse la grille
+    density = np.convolve(fine, kernel, mode='full')[radius:radius + grid]
+    density *= len(values) * (edges[1] - edges[0]) / (density.sum() * step)
+    return counts, edges, centers, density
+
+
+# =============================================================================
+# GRAPHIQUES
+# =============================================================================
+
+def plot_sales_distribution(data_path):
+    """Distribution des montants de ventes (histogramme pré-agrégé + densité)"""
+    df_sales = query('Fact_Sales', columns=['TotalAmount'], data_path=data_path)
+    counts, edges, centers, density = binned_distribution(
+        df_sales['TotalAmount'], CHART_CONFIG['bins']
+    )
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.stairs(counts, edges, fill=True, alpha=0.6)
+    if density is not None:
+        ax.plot(centers, density, linewidth=2)
+    ax.set_title('Distribution of Sales Amounts (SQL Server)')
+    ax.set_xlabel('Amount ($)')
+    ax.set_ylabel('Count')
+    return fig
+
+
+def plot_top_countries(data_path):
+    """Top 10 des pays par nombre de clients"""
+    country_counts = query('Dim_Customers', group_by=['Country'],
+                           aggs={'Customers': ('CustomerID', 'count')}, data_path=data_path)
+    country_counts = country_counts.nlargest(10, 'Customers')
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+    sns.barplot(x=country_counts['Customers'], y=country_counts['Country'], ax=ax)
+    ax.set_title('Top 10 Countries by Customer Count')
+    return fig
+
+
+def plot_access_order_status(data_path):
+    """Répartition des commandes Access par statut"""
+    status_counts = query('access_Orders', group_by=['Status ID'],
+                          aggs={'Orders': ('Order ID', 'count')}, data_path=data_path)
+
+    fig, ax = plt.subplots(figsize=(8, 8))
+    ax.pie(status_counts['Orders'], labels=status_counts['Status ID'], autopct='%1.1f%%')
+    ax.set_title('Access Orders Status Distribution')
+    return fig
+
+
+# Fichier -> (fonction de rendu, tables lues)
+FIGURES = {
+    'sales_distribution.png': (plot_sales_distribution, ['Fact_Sales']),
+    'top_countries.png': (plot_top_countries, ['Dim_Customers']),
+    'access_order_status.png': (plot_access_order_status, ['access_Orders'])
+}
+
+
+# =============================================================================
+# RENDU PAR LOTS
+# =============================================================================
+
+def input_key(name, data_path=DATA_PATH):
+    """Empreinte des entrées d'un graphique (tables lues et configuration), None si une table manque"""
+    warehouse = Warehouse(data_path)
+    tables = {table: warehouse.cache_key(table) for table in FIGURES[name][1]}
+    if None in tables.values():
+        return None
+    payload = json.dumps({'figure': name, 'tables': tables, 'config': CHART_CONFIG},
+                         sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()[:16]
+
+
+def render_figure(name, data_path, figures_path):
+    """Rendre un graphique dans un processus de travail; retourne (nom, durée)"""
+    started = time.perf_counter()
+    plt.style.use(CHART_CONFIG['style'])
+    sns.set_palette('husl')
+    render, _ = FIGURES[name]
+    fig = render(data_path)
+    fig.savefig(Path(figures_path) / name, dpi=CHART_CONFIG['dpi'], bbox_inches='tight')
+    plt.close(fig)
+    return name, time.perf_counter() - started
+
+
+def load_figures_state(path=FIGURES_STATE_FILE):
+    """Empreintes des entrées au dernier rendu de chaque graphique"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def save_figures_state(state, path=FIGURES_STATE_FILE):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+
+
+def render_all(names=None, data_path=DATA_PATH, figures_path=FIGURES_PATH,
+               max_workers=None, force=False):
+    """Rendre en parallèle les graphiques dont les entrées ont changé
+
+    Retourne la liste des graphiques régénérés.
+    """
+    names = list(names or FIGURES)
+    figures_path = Path(figures_path)
+    figures_path.mkdir(parents=True, exist_ok=True)
+    state = load_figures_state()
+
+    pending = {}
+    unchanged = 0
+    for name in names:
+        key = input_key(name, data_path)
+        if key is None:
+            print(f"⚠️ {name}: tables {FIGURES[name][1]} introuvables, ignoré")
+        elif force or state.get(name) != key or not (figures_path / name).exists():
+            pending[name] = key
+        else:
+            unchanged += 1
+            print(f"♻️ {name} inchangé")
+
+    rendered = []
+    if pending:
+        workers = min(max_workers or CHART_CONFIG['max_workers'], len(pending))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(render_figure, name, data_path, figures_path): name
+                       for name in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    _, elapsed = future.result()
+                except Exception as e:
+                    print(f"❌ {name}: {e}")
+                    continue
+                state[name] = pending[name]
+                rendered.append(name)
+                print(f"✅ {name} généré ({elapsed:.2f}s)")
+        save_figures_state(state)
+
+    print(f"📁 {len(rendered)} graphiques générés, {unchanged} inchangés "
+          f"dans {figures_path}")
+    return rendered
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Génération des graphiques statiques')
+    parser.add_argument('figures', nargs='*', help=f"Graphiques à rendre parmi {list(FIGURES)} (tous par défaut)")
+    parser.add_argument('--force', action='store_true', help='Régénérer même sans changement')
+    parser.add_argument('--workers', type=int, help='Nombre de processus')
+    args = parser.parse_args()
+    unknown = set(args.figures) - set(FIGURES)
+    if unknown:
+        parser.error(f"graphiques inconnus: {sorted(unknown)}")
+    render_all(args.figures, max_workers=args.workers, force=args.force)
@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+import sys
+import types
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / 'scripts'))
+
+# Les ETL configurent le journal à l'import: rien n'est écrit dans reports/ pendant les tests
+logging.getLogger().addHandler(logging.NullHandler())
+
+# Pilote ODBC absent: les tests se connectent à une base SQLite
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    sys.modules['pyodbc'] = types.SimpleNamespace(connect=sqlite3.connect, Error=sqlite3.Error)
+
+import cdc  # noqa: E402
+import fingerprint  # noqa: E402
+import summary_state  # noqa: E402
+from config import DATA_PATH, NORTHWIND_TABLES  # noqa: E402
+from etl_northwind import NorthwindETL  # noqa: E402
+
+SNAPSHOT = '1998-06-01'
+
+
+def use_state(monkeypatch, path):
+    """Rediriger l'état persistant de l'ETL (CDC, résumés, empreintes) vers un dossier vierge"""
+    path.mkdir()
+    monkeypatch.setattr(cdc, 'CDC_STATE_FILE', path / 'cdc_state.json')
+    monkeypatch.setattr(summary_state, 'SUMMARY_STATE_FILE', path / 'summary_state.pkl')
+    monkeypatch.setattr(fingerprint, 'FINGERPRINT_FILE', path / 'fingerprints.pkl')
+    return path
+
+
+@pytest.fixture(autouse=True)
+def state_path(tmp_path, monkeypatch):
+    """État persistant de l'ETL isolé par test"""
+    return use_state(monkeypatch, tmp_path / '_state')
+
+
+@pytest.fixture
+def northwind_db(tmp_path):
+    """Base Northwind SQLite construite à partir des extractions de data/"""
+    path = tmp_path / 'northwind.db'
+    with sqlite3.connect(path) as connection:
+        for table in NORTHWIND_TABLES:
+            df = pd.read_csv(DATA_PATH / f"{table.replace(' ', '')}.csv", encoding='utf-8-sig')
+            df.to_sql(table, connection, index=False)
+    return path
+
+
+class SQLiteNorthwindETL(NorthwindETL):
+    """NorthwindETL branché sur une base SQLite (une connexion par appel)"""
+
+    def __init__(self, database, output_path, **kwargs):
+        super().__init__(snapshot_date=SNAPSHOT, **kwargs)
+        self.database = database
+        self.output_path = output_path
+
+    def open_connection(self):
+        return sqlite3.connect(self.database, check_same_thread=False)
+
+
+@pytest.fixture
+def make_etl(northwind_db, tmp_path):
+    """Fabrique d'ETL SQLite publiant dans un dossier temporaire"""
+    def make(output='out', **kwargs):
+        return SQLiteNorthwindETL(northwind_db, tmp_path / output, **kwargs)
+    return make
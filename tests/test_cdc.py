@@ -0,0 +1,120 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+import cdc
+from cdc import ChangeTrackingSource, load_cdc_state
+from conftest import SQLiteNorthwindETL, use_state
+from dataset import read_current, resolve_table
+
+COMPARED_TABLES = ['Fact_Sales', 'Sales_By_Month', 'Sales_By_Category', 'Sales_By_Country',
+                   'Top_Products']
+
+# Table de changements alimentée par des déclencheurs (équivalent de CHANGETABLE)
+CHANGE_TABLE = """
+CREATE TABLE _changes (
+    Version INTEGER PRIMARY KEY AUTOINCREMENT,
+    TableName TEXT, Operation TEXT, OrderID INTEGER, ProductID INTEGER
+)
+"""
+TRIGGER = """
+CREATE TRIGGER [{table}_{operation}] AFTER {event} ON [{table}]
+BEGIN
+    INSERT INTO _changes (TableName, Operation, OrderID, ProductID)
+    VALUES ('{table}', '{operation}', {row}.OrderID, {product});
+END
+"""
+
+
+class TriggerChangeSource(ChangeTrackingSource):
+    """Suivi des modifications simulé par la table _changes"""
+
+    def current_version(self):
+        df = self._query("SELECT COALESCE(MAX(Version), 0) AS Version FROM _changes")
+        return int(df['Version'].iloc[0])
+
+    def min_valid_version(self, table):
+        return 0
+
+    def changed_keys(self, table, since):
+        keys = ', '.join(self.tables[table])
+        return self._query(
+            f"SELECT Operation, {keys} FROM _changes WHERE TableName = ? AND Version > ?",
+            [table, since]
+        )
+
+
+class TrackedNorthwindETL(SQLiteNorthwindETL):
+    def change_source(self):
+        return TriggerChangeSource(self.connection)
+
+
+@pytest.fixture
+def tracked_db(northwind_db):
+    with sqlite3.connect(northwind_db) as connection:
+        connection.execute(CHANGE_TABLE)
+        for table in cdc.TRACKED_TABLES:
+            for operation, event, row in (('I', 'INSERT', 'NEW'), ('U', 'UPDATE', 'NEW'),
+                                          ('D', 'DELETE', 'OLD')):
+                product = f'{row}.ProductID' if table == 'Order Details' else 'NULL'
+                connection.execute(TRIGGER.format(table=table, operation=operation, event=event,
+                                                  row=row, product=product))
+    return northwind_db
+
+
+def apply_source_changes(database):
+    """Mise à jour, suppression et insertion (dont une ligne invalide)"""
+    with sqlite3.connect(database) as connection:
+        connection.execute("UPDATE [Order Details] SET Quantity = Quantity + 7 "
+                           "WHERE OrderID = 10250 AND ProductID = 41")
+        connection.execute("DELETE FROM [Order Details] WHERE OrderID = 10251")
+        connection.execute("DELETE FROM Orders WHERE OrderID = 10251")
+        connection.execute(
+            "INSERT INTO Orders (OrderID, CustomerID, EmployeeID, OrderDate, ShipCountry) "
+            "SELECT 99001, CustomerID, EmployeeID, '1998-05-04', ShipCountry "
+            "FROM Orders WHERE OrderID = 10248"
+        )
+        connection.executemany(
+            "INSERT INTO [Order Details] (OrderID, ProductID, UnitPrice, Quantity, Discount) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [(99001, 11, 14.0, 3, 0.05), (99001, 42, 9.8, 0, 0)]
+        )
+
+
+def published(output_path, table):
+    return pd.read_csv(resolve_table(output_path, table), encoding='utf-8-sig')
+
+
+def test_incremental_run_matches_full_run(tracked_db, tmp_path, monkeypatch):
+    incremental = TrackedNorthwindETL(tracked_db, tmp_path / 'incremental')
+    assert incremental.run()
+    assert load_cdc_state() is not None
+
+    apply_source_changes(tracked_db)
+    assert TrackedNorthwindETL(tracked_db, tmp_path / 'incremental').run_incremental()
+
+    # Référence: exécution complète sur la source modifiée, avec un état vierge
+    use_state(monkeypatch, tmp_path / '_reference_state')
+    assert TrackedNorthwindETL(tracked_db, tmp_path / 'full').run()
+
+    for table in COMPARED_TABLES:
+        pd.testing.assert_frame_equal(published(tmp_path / 'incremental', table),
+                                      published(tmp_path / 'full', table), obj=table)
+
+    fact_sales = published(tmp_path / 'incremental', 'Fact_Sales')
+    assert 10251 not in set(fact_sales['OrderID'])
+    assert fact_sales.query('OrderID == 99001')['ProductID'].tolist() == [11]
+
+    # La ligne invalide relue par le CDC est en quarantaine, comme en exécution complète
+    quarantine = published(tmp_path / 'incremental', 'Quarantine')
+    reference = published(tmp_path / 'full', 'Quarantine')
+    assert sorted(quarantine['Record']) == sorted(reference['Record'])
+    assert quarantine['Record'].str.contains('"OrderID":99001').sum() == 1
+
+
+def test_noop_change_poll_keeps_published_version(tracked_db, tmp_path):
+    assert TrackedNorthwindETL(tracked_db, tmp_path / 'out').run()
+    version = read_current(tmp_path / 'out')['version']
+    assert TrackedNorthwindETL(tracked_db, tmp_path / 'out').run_incremental()
+    assert read_current(tmp_path / 'out')['version'] == version
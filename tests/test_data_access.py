@@ -0,0 +1,30 @@
+import sqlite3
+
+import pandas as pd
+
+from dashboard import DataCatalog
+from data_access import Warehouse
+
+
+def test_null_employee_is_read_as_missing_value(make_etl, northwind_db, tmp_path):
+    """Orders.EmployeeID est nullable: la commande reste lisible avec un EmployeeID manquant"""
+    with sqlite3.connect(northwind_db) as connection:
+        connection.execute("UPDATE Orders SET EmployeeID = NULL WHERE OrderID = 10248")
+    etl = make_etl()
+    assert etl.run()
+
+    warehouse = Warehouse(etl.output_path, cache_path=tmp_path / 'cache')
+    fact_sales = warehouse['Fact_Sales']
+    assert str(fact_sales['EmployeeID'].dtype) == 'Int64'
+    assert fact_sales.loc[fact_sales['OrderID'] == 10248, 'EmployeeID'].isna().all()
+    assert fact_sales['EmployeeID'].notna().sum() == len(fact_sales) - \
+        (fact_sales['OrderID'] == 10248).sum()
+    assert str(warehouse['Dim_Employees']['EmployeeID'].dtype) == 'Int64'
+
+    # Cache disque relu à l'identique
+    cached = Warehouse(etl.output_path, cache_path=tmp_path / 'cache')['Fact_Sales']
+    pd.testing.assert_frame_equal(cached, fact_sales)
+
+    catalog = DataCatalog(etl.output_path, store_path=tmp_path / 'no_store')
+    employees = catalog.get('Fact_Sales', ['OrderID', 'EmployeeID'])
+    assert employees.loc[employees['OrderID'] == 10248, 'EmployeeID'].isna().all()
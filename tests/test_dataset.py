@@ -0,0 +1,162 @@
+import json
+import time
+
+import pandas as pd
+import pytest
+
+import dataset
+from dataset import (CURRENT_FILE, DatasetWriter, frame_hash, read_current,
+                     resolve_directory, resolve_table)
+from partitions import read_manifest, write_partitioned
+
+
+def test_frame_hash_ignores_in_memory_dtypes():
+    """Même contenu publié, types différents en mémoire: même empreinte"""
+    df = pd.DataFrame({'id': [1, 2, 3], 'qty': [4, 5, 6]})
+    other = df.astype({'id': 'int32', 'qty': 'Int64'})
+    assert frame_hash(df) == frame_hash(other)
+    assert frame_hash(df) != frame_hash(df.assign(qty=[4, 5, 7]))
+
+
+def test_commit_publishes_and_links_unchanged_tables(tmp_path):
+    first = DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1, 2]}),
+                                             'B': pd.DataFrame({'y': ['a']})})
+    second = DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1, 2]}).astype('int32'),
+                                              'B': pd.DataFrame({'y': ['b']})})
+
+    assert second['previous'] == first['version']
+    assert not second['tables']['A']['changed']
+    assert second['tables']['B']['changed']
+    assert read_current(tmp_path)['version'] == second['version']
+    assert pd.read_csv(resolve_table(tmp_path, 'B'), encoding='utf-8-sig')['y'].tolist() == ['b']
+    # Table inchangée: même fichier physique (lien) dans les deux versions
+    a_first = tmp_path / '_versions' / first['version'] / 'A.csv'
+    assert resolve_table(tmp_path, 'A').stat().st_ino == a_first.stat().st_ino
+
+
+
+def test_unchanged_table_is_not_rewritten(tmp_path, monkeypatch):
+    DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1, 2]}),
+                                     'B': pd.DataFrame({'y': ['a']})})
+
+    opened = []
+    open_text = dataset._open_text
+    def tracking_open(path, compression):
+        opened.append(path.name)
+        return open_text(path, compression)
+    monkeypatch.setattr(dataset, '_open_text', tracking_open)
+
+    writer = DatasetWriter(tmp_path).begin()
+    assert not writer.write('A', pd.DataFrame({'x': [1, 2]}).astype('Int64'))
+    assert writer.write('B', pd.DataFrame({'y': ['b']}))
+    manifest = writer.commit()
+
+    assert opened == ['B.csv']
+    assert manifest['tables']['A']['hash'] == frame_hash(pd.DataFrame({'x': [1, 2]}))
+
+
+def _stream(root, rows):
+    """Table écrite en flux (comme le dump Access), compressée en gzip"""
+    writer = DatasetWriter(root, compression='gzip').begin()
+    with writer.open('T') as f:
+        pd.DataFrame({'x': rows}).to_csv(f, index=False)
+    changed = writer.register('T', len(rows), {'x': 'int64'})
+    return changed, writer.commit()
+
+
+def test_streamed_compressed_table_is_reused(tmp_path, monkeypatch):
+    changed, first = _stream(tmp_path, [1, 2])
+    assert changed
+
+    # L'en-tête gzip porte une date différente: l'empreinte porte sur le texte
+    clock = time.time()
+    monkeypatch.setattr(time, 'time', lambda: clock + 60)
+    changed, second = _stream(tmp_path, [1, 2])
+    assert not changed and not second['tables']['T']['changed']
+    assert second['tables']['T']['hash'] == first['tables']['T']['hash'] \
+        == frame_hash(pd.DataFrame({'x': [1, 2]}))
+    assert resolve_table(tmp_path, 'T').stat().st_ino == \
+        (tmp_path / '_versions' / first['version'] / 'T.csv.gz').stat().st_ino
+
+    changed, third = _stream(tmp_path, [1, 3])
+    assert changed and third['tables']['T']['changed']
+    assert pd.read_csv(resolve_table(tmp_path, 'T'), encoding='utf-8-sig')['x'].tolist() == [1, 3]
+
+def test_abort_keeps_published_version(tmp_path):
+    published = DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1]})})
+    before = (tmp_path / CURRENT_FILE).read_text(encoding='utf-8')
+
+    writer = DatasetWriter(tmp_path).begin()
+    writer.write('A', pd.DataFrame({'x': [2]}))
+    writer.abort()
+
+    assert (tmp_path / CURRENT_FILE).read_text(encoding='utf-8') == before
+    assert json.loads(before)['version'] == published['version']
+    assert [p.name for p in (tmp_path / '_versions').iterdir()] == [published['version']]
+    assert pd.read_csv(resolve_table(tmp_path, 'A'), encoding='utf-8-sig')['x'].tolist() == [1]
+
+
+def test_failed_publish_is_rolled_back(tmp_path, monkeypatch):
+    DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1]})})
+
+    writer = DatasetWriter(tmp_path)
+    def fail(name, df):
+        raise RuntimeError('écriture interrompue')
+    monkeypatch.setattr(writer, 'write', fail)
+
+    with pytest.raises(RuntimeError):
+        writer.publish({'A': pd.DataFrame({'x': [3]})})
+    assert pd.read_csv(resolve_table(tmp_path, 'A'), encoding='utf-8-sig')['x'].tolist() == [1]
+    assert not any(p.name.endswith('.tmp') for p in (tmp_path / '_versions').iterdir())
+
+
+def test_commit_keeps_tables_of_other_writers(tmp_path):
+    DatasetWriter(tmp_path).publish({'sql_table': pd.DataFrame({'x': [1]})})
+    DatasetWriter(tmp_path).publish({'access_table': pd.DataFrame({'y': [2]})})
+    assert set(read_current(tmp_path)['tables']) == {'sql_table', 'access_table'}
+
+
+
+def test_withdrawn_outputs_are_not_carried_over(tmp_path):
+    DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1]}),
+                                     'Mart': pd.DataFrame({'y': [2]})})
+    _publish_partitions(tmp_path, pd.DataFrame({'Year': [1997], 'x': [1]}))
+
+    manifest = DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [3]})},
+                                               withdrawn=['Mart', 'Fact'])
+    assert set(manifest['tables']) == {'A'} and manifest['directories'] == {}
+    assert resolve_table(tmp_path, 'Mart') == tmp_path / 'Mart.csv'
+    assert not resolve_table(tmp_path, 'Mart').exists()
+
+def _publish_partitions(root, df, only=None, abort=False):
+    writer = DatasetWriter(root).begin()
+    write_partitioned(df, writer.directory('Fact'), ['Year'], only=only)
+    if abort:
+        writer.abort()
+    else:
+        writer.commit()
+
+
+def test_directory_is_published_only_on_commit(tmp_path):
+    df = pd.DataFrame({'Year': [1996, 1997], 'x': [1, 2]})
+    _publish_partitions(tmp_path, df)
+    published = resolve_directory(tmp_path, 'Fact')
+    assert read_manifest(published)['rows'] == 2
+
+    # Exécution interrompue: la version publiée n'est pas touchée
+    _publish_partitions(tmp_path, df.assign(x=[1, 5]), only={(1997,)}, abort=True)
+    assert resolve_directory(tmp_path, 'Fact') == published
+    assert pd.read_csv(published / 'Year=1997' / 'part-0000.csv', encoding='utf-8-sig')['x'].tolist() == [2]
+
+    # Mise à jour partielle validée: partition touchée réécrite, l'autre reprise par lien
+    _publish_partitions(tmp_path, df.assign(x=[1, 5]), only={(1997,)})
+    updated = resolve_directory(tmp_path, 'Fact')
+    assert updated != published
+    assert pd.read_csv(updated / 'Year=1997' / 'part-0000.csv', encoding='utf-8-sig')['x'].tolist() == [5]
+    assert pd.read_csv(published / 'Year=1997' / 'part-0000.csv', encoding='utf-8-sig')['x'].tolist() == [2]
+    assert (updated / 'Year=1996' / 'part-0000.csv').stat().st_ino == \
+        (published / 'Year=1996' / 'part-0000.csv').stat().st_ino
+
+    # Un autre ETL qui ne réécrit pas le dossier le conserve
+    DatasetWriter(tmp_path).publish({'A': pd.DataFrame({'x': [1]})})
+    assert read_manifest(resolve_directory(tmp_path, 'Fact'))['rows'] == 2
@@ -0,0 +1,74 @@
+import sqlite3
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from dataset import read_current, resolve_table
+from etl_access_simple import SimpleAccessETL
+
+# Types date renvoyés comme par le pilote Access (objets date / datetime)
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+
+ROWS = [
+    (1, 'Chai', 18.0, '1996-07-04', '1996-07-04 08:30:00', None),
+    (2, None, 19.5, None, '1997-01-31 17:05:12.250000', 'Ligne, avec "guillemets"'),
+    (3, 'Chang', None, '1998-05-06', None, ''),
+]
+
+
+class SQLiteAccessETL(SimpleAccessETL):
+    """SimpleAccessETL branché sur une base SQLite"""
+
+    def __init__(self, database, output_path):
+        super().__init__({'database_path': str(database)})
+        self.output_path = output_path
+
+    def open_connection(self):
+        return sqlite3.connect(self.config['database_path'], detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False)
+
+    def list_tables(self):
+        with sqlite3.connect(self.config['database_path']) as connection:
+            return [row[0] for row in connection.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name")]
+
+
+@pytest.fixture
+def access_db(tmp_path):
+    path = tmp_path / 'access.db'
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE [Order Details] (ID INTEGER, Product TEXT, Price REAL, "
+                           "OrderDate DATE, ShippedAt TIMESTAMP, Notes TEXT)")
+        connection.executemany("INSERT INTO [Order Details] VALUES (?, ?, ?, ?, ?, ?)", ROWS)
+        connection.execute("CREATE TABLE Empty (ID INTEGER, Name TEXT)")
+    return path
+
+
+@pytest.mark.parametrize('batch_size', [1, 2, 5000])
+def test_dumped_csv_matches_source_table(access_db, tmp_path, batch_size):
+    etl = SQLiteAccessETL(access_db, tmp_path / 'out')
+    assert etl.dump_all(batch_size=batch_size)
+
+    dumped = pd.read_csv(resolve_table(tmp_path / 'out', 'access_Order_Details'),
+                         encoding='utf-8-sig', dtype=str, keep_default_na=False)
+    # NULL -> champ vide, dates et horodatages au format ISO
+    expected = pd.DataFrame([['' if v is None else str(v) for v in row] for row in ROWS],
+                            columns=dumped.columns)
+    pd.testing.assert_frame_equal(dumped, expected)
+
+    empty = pd.read_csv(resolve_table(tmp_path / 'out', 'access_Empty'), encoding='utf-8-sig')
+    assert list(empty.columns) == ['ID', 'Name'] and empty.empty
+
+
+def test_failed_extraction_aborts_the_pipelined_version(access_db, tmp_path):
+    etl = SQLiteAccessETL(access_db, tmp_path / 'out')
+    assert etl.run_pipeline()
+    published = read_current(tmp_path / 'out')
+
+    failing = SQLiteAccessETL(access_db, tmp_path / 'out')
+    failing.list_tables = lambda: ['Order Details', 'Missing']
+    assert not failing.run_pipeline()
+    assert read_current(tmp_path / 'out') == published
+    assert not any(p.name.endswith('.tmp') for p in (tmp_path / 'out' / '_versions').iterdir())
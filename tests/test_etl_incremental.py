@@ -0,0 +1,29 @@
+from dataset import read_current, resolve_directory
+from fact_store import open_store
+from partitions import read_manifest
+
+
+def test_noop_incremental_run_publishes_no_changed_tables(make_etl):
+    """Deuxième exécution sur une source inchangée: aucune table réécrite"""
+    assert make_etl().run()
+    assert make_etl().run()
+
+    changed = [name for name, entry in read_current(make_etl().output_path)['tables'].items()
+               if entry['changed']]
+    assert changed == []
+
+
+def test_partitions_and_store_are_staged_in_the_version(make_etl):
+    """Fact_Sales partitionnée et fact_store publiées avec la version (rien dans la racine)"""
+    etl = make_etl()
+    assert etl.run()
+
+    current = read_current(etl.output_path)
+    assert set(current['directories']) == {'Fact_Sales', 'fact_store'}
+    assert not (etl.output_path / 'Fact_Sales').exists()
+    assert not (etl.output_path / 'fact_store').exists()
+
+    partitions = read_manifest(resolve_directory(etl.output_path, 'Fact_Sales'))
+    store = resolve_directory(etl.output_path, 'fact_store')
+    assert partitions['rows'] == current['tables']['Fact_Sales']['rows']
+    assert len(open_store('Fact_Sales', ['OrderID'], store)) == partitions['rows']
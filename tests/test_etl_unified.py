@@ -0,0 +1,94 @@
+import pandas as pd
+
+from etl_unified import UNIFIED_NAME, UnifiedSalesETL
+
+
+def source_tables():
+    """Deux sources qui partagent un client, un produit, un employé et une ligne de commande
+
+    Les identifiants bruts se recouvrent sans désigner les mêmes lignes: la
+    ligne Access 3 (commande 10248, produit 11 inconnu d'Access) n'a rien à
+    voir avec la ligne SQL Server (10248, 11). La ligne Access 1 est la même
+    vente que celle-ci (client, date, produit conformes et quantité).
+    """
+    return {
+        'Fact_Sales': pd.DataFrame({
+            'OrderID': [10248, 10248], 'ProductID': [11, 42], 'CustomerID': ['ALFKI', 'ALFKI'],
+            'EmployeeID': [5, 5], 'OrderDate': ['1996-07-04', '1996-07-04'],
+            'Quantity': [12, 10], 'UnitPrice': [14.0, 9.8], 'Discount': [0.0, 0.0],
+            'TotalAmount': [168.0, 98.0], 'TotalAmountCents': [16800, 9800]
+        }),
+        'Dim_Customers': pd.DataFrame({
+            'CustomerID': ['ALFKI'], 'CompanyName': ['Alfreds Futterkiste'],
+            'ContactName': ['Maria Anders'], 'City': ['Berlin'], 'Country': ['Germany']
+        }),
+        'Dim_Products': pd.DataFrame({
+            'ProductID': [11, 42], 'ProductName': ['Queso Cabrales', 'Singaporean Hokkien Fried Mee'],
+            'CategoryName': ['Dairy Products', 'Grains/Cereals'], 'UnitPrice': [21.0, 14.0]
+        }),
+        'Dim_Employees': pd.DataFrame({'EmployeeID': [5], 'FirstName': ['Steven'],
+                                       'LastName': ['Buchanan']}),
+        'access_Orders': pd.DataFrame({
+            'Order ID': [10248, 30], 'Customer ID': [1, 2], 'Employee ID': [1, 1],
+            'Order Date': ['1996-07-04', '2006-01-15']
+        }),
+        'access_Order_Details': pd.DataFrame({
+            'ID': [1, 2, 3], 'Order ID': [10248, 30, 10248], 'Product ID': [1, 1, 11],
+            'Quantity': [12, 5, 12], 'Unit Price': [14.0, 18.0, 14.0],
+            'Discount': [0.0, 0.0, 0.0]
+        }),
+        'access_Customers': pd.DataFrame({
+            'ID': [1, 2], 'Company': ['ALFREDS  futterkiste', 'Company B'],
+            'First Name': ['Maria', 'Antonio'], 'Last Name': ['Anders', 'Gratacos'],
+            'City': [None, 'Boston'], 'Country/Region': ['Germany', 'USA']
+        }),
+        'access_Products': pd.DataFrame({
+            'ID': [1], 'Product Name': ['Queso Cabrales'], 'Category': ['Dairy Products'],
+            'List Price': [21.0]
+        }),
+        'access_Employees': pd.DataFrame({'ID': [1], 'First Name': ['Steven'],
+                                          'Last Name': ['Buchanan']})
+    }
+
+
+def unify():
+    etl = UnifiedSalesETL()
+    etl.data = source_tables()
+    etl.transform()
+    return etl.data
+
+
+def test_cross_source_line_is_kept_once_from_preferred_source():
+    fact = unify()[UNIFIED_NAME]
+    same_sale = fact[(fact['CustomerKey'] == 'SQL_ALFKI') & (fact['ProductKey'] == 'SQL_11')]
+    assert same_sale['Source'].tolist() == ['SQL']
+    assert 'ACC_1' not in fact['LineKey'].tolist()
+    assert len(fact) == 4
+
+
+def test_colliding_raw_ids_with_different_content_are_kept():
+    fact = unify()[UNIFIED_NAME]
+    lines = fact[(fact['OrderID'] == '10248') & (fact['ProductID'] == '11')]
+    assert lines[['Source', 'LineKey', 'ProductKey']].values.tolist() == [
+        ['ACC', 'ACC_3', 'ACC_11'], ['SQL', 'SQL_10248_11', 'SQL_11']]
+
+
+def test_shared_entities_appear_once_in_conformed_dimensions():
+    data = unify()
+    customers = data['Dim_Customers_Unified']
+    assert customers['CompanyName'].tolist() == ['Alfreds Futterkiste', 'Company B']
+    assert customers['CustomerKey'].tolist() == ['SQL_ALFKI', 'ACC_2']
+    assert len(data['Dim_Products_Unified']) == 2
+    assert data['Dim_Employees_Unified']['EmployeeKey'].tolist() == ['SQL_5']
+
+    # Les faits Access sont rattachés aux clés conformes
+    access = data[UNIFIED_NAME].query("Source == 'ACC'")
+    assert access['ProductKey'].tolist() == ['ACC_11', 'SQL_11']
+    assert access['EmployeeKey'].tolist() == ['SQL_5', 'SQL_5']
+    assert access['CustomerKey'].tolist() == ['SQL_ALFKI', 'ACC_2']
+
+
+def test_region_group_uses_the_shared_geography_mapping():
+    customers = unify()['Dim_Customers_Unified'].set_index('CompanyName')
+    assert customers.loc['Alfreds Futterkiste', 'Region_Group'] == 'Europe'
+    assert customers.loc['Company B', 'Region_Group'] == 'Amérique du Nord'
@@ -0,0 +1,55 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from hll import HyperLogLog, group_sketches, merge_all
+
+
+@pytest.mark.parametrize('cardinality', [10, 1000, 50000])
+@pytest.mark.parametrize('precision', [8, 11, 14])
+def test_count_is_within_error_bound(precision, cardinality):
+    sketch = HyperLogLog.from_values(np.arange(cardinality), precision)
+    bound = 3 * 1.04 / math.sqrt(1 << precision)
+    assert abs(sketch.count() - cardinality) <= max(bound * cardinality, 1)
+
+
+def test_duplicates_do_not_change_the_count():
+    values = [f'C{i}' for i in range(500)]
+    once = HyperLogLog.from_values(values)
+    assert HyperLogLog.from_values(values * 3).count() == once.count()
+
+
+def test_merge_equals_sketch_of_union():
+    left = HyperLogLog.from_values(range(0, 6000))
+    right = HyperLogLog.from_values(range(4000, 10000))
+    union = HyperLogLog.from_values(range(0, 10000))
+
+    merged = left.merge(right)
+    assert np.array_equal(merged.registers, union.registers)
+    assert merged.count() == union.count()
+
+
+def test_merge_all_accepts_serialized_sketches():
+    parts = [HyperLogLog.from_values(range(i, i + 3000)) for i in (0, 2000, 4000)]
+    merged = merge_all([parts[0].to_string(), parts[1], parts[2].to_string()])
+    assert np.array_equal(merged.registers, HyperLogLog.from_values(range(7000)).registers)
+    assert merge_all([]).count() == 0
+
+
+def test_merge_rejects_different_precisions():
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(11))
+
+
+def test_group_sketches_merge_to_the_global_count():
+    df = pd.DataFrame({'Month': np.repeat(['1997-01', '1997-02', '1997-03'], 400),
+                       'CustomerID': [f'C{i % 700}' for i in range(1200)]})
+    sketches = group_sketches(df, ['Month'], 'CustomerID')
+
+    assert sketches['Month'].tolist() == ['1997-01', '1997-02', '1997-03']
+    merged = merge_all(sketches['CustomerID_HLL'])
+    assert np.array_equal(merged.registers,
+                          HyperLogLog.from_values(df['CustomerID']).registers)
+    assert abs(merged.count() - 700) <= 3 * 1.04 / math.sqrt(merged.m) * 700
@@ -0,0 +1,67 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+import pandas as pd
+import pytest
+
+from config import DATA_PATH
+from money import amount_cents, from_cents, line_amount_cents, sum_cents, to_cents
+
+
+def exact_cents(unit_price, quantity, discount):
+    """Montant exact d'une ligne en décimal, arrondi au centime demi vers le haut"""
+    amount = Decimal(str(unit_price)) * int(quantity) * (1 - Decimal(str(round(discount, 4))))
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+@pytest.fixture(scope='module')
+def order_lines():
+    details = pd.read_csv(DATA_PATH / 'OrderDetails.csv', encoding='utf-8-sig')
+    orders = pd.read_csv(DATA_PATH / 'Orders.csv', encoding='utf-8-sig')
+    lines = details.merge(orders[['OrderID', 'OrderDate']], on='OrderID')
+    lines['Month'] = pd.to_datetime(lines['OrderDate']).dt.to_period('M')
+    return lines
+
+
+def test_to_cents_rounds_half_cents_away_from_zero():
+    cents = to_cents([0.125, 0.135, 2.675, 1.005, -0.125, 0.124, None, 'x'])
+    assert cents.tolist() == [13, 14, 268, 101, -13, 12, 0, 0]
+
+
+def test_line_amount_rounds_half_up_once():
+    # 7.70 x 25 x 0.85 = 163.625 ; 17.45 x 30 x 0.95 = 497.325
+    cents = line_amount_cents([7.70, 17.45, 14.40], [25, 30, 9], [0.15000001, 0.05, 0.05])
+    assert cents.tolist() == [16363, 49733, 12312]
+
+
+def test_line_amounts_match_exact_decimal_rounding(order_lines):
+    cents = line_amount_cents(order_lines['UnitPrice'], order_lines['Quantity'],
+                              order_lines['Discount'])
+    expected = [exact_cents(*line) for line in
+                order_lines[['UnitPrice', 'Quantity', 'Discount']].itertuples(index=False)]
+    assert cents.tolist() == expected
+
+
+def test_monthly_totals_stay_within_half_a_cent_per_line(order_lines):
+    lines = order_lines.assign(
+        Cents=line_amount_cents(order_lines['UnitPrice'], order_lines['Quantity'],
+                                order_lines['Discount']),
+        Exact=order_lines['UnitPrice'] * order_lines['Quantity']
+        * (1 - order_lines['Discount'].round(4)))
+    months = lines.groupby('Month').agg(Cents=('Cents', 'sum'), Exact=('Exact', 'sum'),
+                                        Lines=('Cents', 'size'))
+
+    deviation = (from_cents(months['Cents']) - months['Exact']).abs()
+    assert (deviation <= 0.005 * months['Lines'] + 1e-6).all()
+
+
+def test_totals_do_not_depend_on_partitioning(order_lines):
+    cents = line_amount_cents(order_lines['UnitPrice'], order_lines['Quantity'],
+                              order_lines['Discount'])
+    by_month = cents.groupby(order_lines['Month']).sum()
+    assert sum_cents(by_month) == sum_cents(cents[::-1]) == sum_cents(cents)
+
+
+def test_amount_cents_prefers_the_cents_column():
+    df = pd.DataFrame({'TotalAmount': [1.005, 2.5], 'TotalAmountCents': [100, 250]})
+    assert amount_cents(df).tolist() == [100, 250]
+    assert amount_cents(df.drop(columns='TotalAmountCents')).tolist() == [101, 250]
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from config import NORTHWIND_PIPELINE
+from conftest import use_state
+from dataset import read_current
+
+
+def test_async_run_publishes_the_same_tables_as_sequential_run(make_etl, northwind_db,
+                                                               tmp_path, monkeypatch):
+    """Sources validées (lignes en quarantaine retirées) dans les deux modes d'exécution"""
+    with sqlite3.connect(northwind_db) as connection:
+        connection.execute("INSERT INTO [Order Details] (OrderID, ProductID, UnitPrice, Quantity, Discount) "
+                           "VALUES (10248, 1, 18.0, 0, 0)")
+        connection.execute("UPDATE Orders SET CustomerID = 'XXXXX' WHERE OrderID = 10249")
+
+    assert make_etl('sequential').run()
+    use_state(monkeypatch, tmp_path / '_async_state')
+    assert make_etl('async').run_async()
+
+    sequential = read_current(tmp_path / 'sequential')['tables']
+    pipelined = read_current(tmp_path / 'async')['tables']
+    assert sequential['Quarantine']['rows'] == 4
+    assert {name: entry['hash'] for name, entry in pipelined.items()} == \
+        {name: entry['hash'] for name, entry in sequential.items()}
+
+
+@pytest.mark.parametrize('run', ['run', 'run_async'])
+def test_disabled_outputs_are_withdrawn_from_the_published_version(make_etl, run):
+    """Une sortie désactivée après une première publication n'est plus servie (données périmées)"""
+    assert make_etl().run()
+    published = read_current(make_etl().output_path)
+    assert {'Customer_RFM', 'Sales_Timeseries', 'Dim_Geography'} <= set(published['tables'])
+
+    pipeline = dict(NORTHWIND_PIPELINE, disabled_outputs=['Customer_RFM', 'Sales_Timeseries'],
+                    disabled_transforms=['create_dim_geography'])
+    assert getattr(make_etl(pipeline=pipeline), run)()
+
+    tables = read_current(make_etl().output_path)['tables']
+    assert set(published['tables']) - set(tables) == {'Customer_RFM', 'Sales_Timeseries',
+                                                      'Dim_Geography'}
+    assert tables['Fact_Sales']['hash'] == published['tables']['Fact_Sales']['hash']
+
+
+@pytest.mark.parametrize('run', ['run', 'run_async'])
+def test_failed_extraction_keeps_the_published_version(make_etl, northwind_db, run):
+    """Une table non extraite n'est pas reprise en silence de la version précédente"""
+    assert make_etl().run()
+    published = read_current(make_etl().output_path)
+
+    with sqlite3.connect(northwind_db) as connection:
+        connection.execute("DROP TABLE Shippers")
+    assert not getattr(make_etl(), run)()
+
+    assert read_current(make_etl().output_path) == published
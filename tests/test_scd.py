@@ -0,0 +1,51 @@
+from io import StringIO
+
+import pandas as pd
+
+from scd import END_OF_TIME, lookup_version_keys, scd2_merge
+
+
+def customers(city_of_a, stock_of_a=10):
+    return pd.DataFrame({'CustomerID': ['A', 'B'], 'City': [city_of_a, 'Lyon'],
+                         'Stock': [stock_of_a, 5]})
+
+
+def merge(history, incoming, as_of):
+    return scd2_merge(history, incoming, 'CustomerID', ['City'], as_of,
+                      surrogate_key='CustomerSK', overwrite=['Stock'])
+
+
+def test_changed_attribute_closes_and_opens_a_version():
+    history, opened, closed = merge(None, customers('Paris'), '1996-01-01')
+    assert (opened, closed) == (2, 0)
+
+    # Relu du CSV (types texte) et sans changement suivi: aucune version ouverte
+    reloaded = pd.read_csv(StringIO(history.to_csv(index=False)))
+    history, opened, closed = merge(reloaded, customers('Paris', stock_of_a=3), '1996-06-01')
+    assert (opened, closed) == (0, 0)
+    assert history.loc[history['IsCurrent'] & history['CustomerID'].eq('A'), 'Stock'].tolist() == [3]
+
+    history, opened, closed = merge(history, customers('Nice'), '1997-06-01')
+    assert (opened, closed) == (1, 1)
+    versions = history[history['CustomerID'] == 'A']
+    assert versions['City'].tolist() == ['Paris', 'Nice']
+    assert versions['EffectiveTo'].tolist() == [pd.Timestamp('1997-06-01'), END_OF_TIME]
+    assert versions['IsCurrent'].tolist() == [False, True]
+    assert versions['CustomerSK'].tolist() == [1, 3]
+
+
+def test_lookup_returns_the_version_valid_at_the_fact_date():
+    history, _, _ = merge(None, customers('Paris'), '1996-01-01')
+    history, _, _ = merge(history, customers('Nice'), '1997-06-01')
+
+    facts = pd.DataFrame({
+        'CustomerID': ['A', 'A', 'A', 'A', 'B', 'Z'],
+        'OrderDate': pd.to_datetime(['1995-12-31', '1996-07-04', '1997-05-31',
+                                     '1997-06-01', '1998-01-01', '1997-01-01'])
+    }, index=[10, 11, 12, 13, 14, 15])
+    keys = lookup_version_keys(facts, history, 'CustomerID', 'OrderDate', 'CustomerSK')
+
+    # Avant la première version: la plus ancienne; le jour du changement: la nouvelle
+    assert keys.index.tolist() == facts.index.tolist()
+    assert keys.tolist()[:5] == [1, 1, 1, 3, 2]
+    assert pd.isna(keys.loc[15])
@@ -0,0 +1,105 @@
+import json
+
+import pandas as pd
+import pytest
+
+from validation import QUARANTINE_COLUMNS, rule_columns, validate
+
+
+def sources():
+    return {
+        'Customers': pd.DataFrame({'CustomerID': ['ALFKI', 'BONAP', 'BONAP', 'QUICK'],
+                                   'CompanyName': ['Alfreds', 'Bon app', 'Doublon', None]}),
+        'Employees': pd.DataFrame({'EmployeeID': [1, 2]}),
+        'Products': pd.DataFrame({'ProductID': [1, 2, 3],
+                                  'ProductName': ['Chai', 'Chang', 'Aniseed'],
+                                  'UnitPrice': [18.0, -1.0, 10.0]}),
+        'Orders': pd.DataFrame({'OrderID': [10, 11, 12, 13],
+                                'OrderDate': pd.to_datetime(['1997-01-02', '1997-01-03',
+                                                             '1997-01-04', '1997-01-05']),
+                                'CustomerID': ['ALFKI', 'QUICK', 'BONAP', 'ALFKI'],
+                                'EmployeeID': [1, 1, 2, 9]}),
+        'OrderDetails': pd.DataFrame({'OrderID': [10, 10, 11, 12, 12, 13],
+                                      'ProductID': [1, 2, 1, 1, 3, 3],
+                                      'UnitPrice': [18.0, 19.0, 18.0, 18.0, 10.0, 10.0],
+                                      'Quantity': [5, 3, 2, 0, 0, 1],
+                                      'Discount': [0.0, 0.0, 0.0, 0.0, 1.5, 0.0]})
+    }
+
+
+def rejected(quarantine, table):
+    return quarantine[quarantine['Table'] == table]
+
+
+def test_invalid_rows_are_moved_to_quarantine():
+    tables, quarantine = validate(sources())
+
+    assert list(quarantine.columns) == QUARANTINE_COLUMNS
+    assert tables['Customers']['CompanyName'].tolist() == ['Alfreds', 'Bon app']
+    assert rejected(quarantine, 'Customers')['FailedRules'].tolist() == [
+        'unique(CustomerID)', 'not_null(CustomerID, CompanyName)']
+    assert tables['Products']['ProductID'].tolist() == [1, 3]
+    assert rejected(quarantine, 'Products')['FailedRules'].tolist() == [
+        'range(UnitPrice in [0, ])']
+
+
+def test_rejected_parents_cascade_to_their_children():
+    tables, quarantine = validate(sources())
+
+    # 11: client rejeté ; 13: employé inconnu
+    assert tables['Orders']['OrderID'].tolist() == [10, 12]
+    assert rejected(quarantine, 'Orders')['FailedRules'].tolist() == [
+        'references(CustomerID -> Customers.CustomerID)',
+        'references(EmployeeID -> Employees.EmployeeID)']
+
+    # Lignes orphelines (produit 2, commandes 11 et 13) et règles cumulées
+    assert tables['OrderDetails'][['OrderID', 'ProductID']].values.tolist() == [[10, 1]]
+    details = rejected(quarantine, 'OrderDetails')
+    records = details['Record'].map(json.loads)
+    failed = dict(zip(records.map(lambda record: (record['OrderID'], record['ProductID'])),
+                      details['FailedRules']))
+    assert failed == {
+        (10, 2): 'references(ProductID -> Products.ProductID)',
+        (11, 1): 'references(OrderID -> Orders.OrderID)',
+        (12, 1): 'range(Quantity in [1, ])',
+        (12, 3): 'range(Quantity in [1, ]); range(Discount in [0, 1])',
+        (13, 3): 'references(OrderID -> Orders.OrderID)'
+    }
+
+
+def test_record_keeps_the_original_row_as_json():
+    _, quarantine = validate(sources())
+
+    record = json.loads(rejected(quarantine, 'Orders')['Record'].iloc[0])
+    assert record == {'OrderID': 11, 'OrderDate': '1997-01-03T00:00:00.000',
+                      'CustomerID': 'QUICK', 'EmployeeID': 1}
+    customer = json.loads(rejected(quarantine, 'Customers')['Record'].iloc[1])
+    assert customer == {'CustomerID': 'QUICK', 'CompanyName': None}
+
+
+def test_valid_tables_pass_unchanged():
+    valid = {name: df for name, df in validate(sources())[0].items()}
+    tables, quarantine = validate(valid)
+
+    assert quarantine.empty and list(quarantine.columns) == QUARANTINE_COLUMNS
+    for name, df in valid.items():
+        pd.testing.assert_frame_equal(tables[name], df)
+
+
+@pytest.mark.parametrize('table', ['Orders', 'Employees'])
+def test_empty_or_missing_table_is_an_error(table):
+    tables = sources()
+    tables[table] = tables[table].iloc[0:0]
+    with pytest.raises(ValueError, match=table):
+        validate(tables)
+    del tables[table]
+    with pytest.raises(ValueError, match=table):
+        validate(tables)
+
+
+def test_rule_columns_include_referenced_keys():
+    columns = rule_columns({'Orders': [
+        {'check': 'not_null', 'columns': ['OrderID']},
+        {'check': 'references', 'column': 'ShipVia', 'table': 'Shippers', 'key': 'ShipperID'}
+    ]})
+    assert columns == {'Orders': ['OrderID', 'ShipVia'], 'Shippers': ['ShipperID']}
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from visualization import binned_distribution
+
+
+@pytest.mark.parametrize('values', [[0, 10, 3], [5.0, 5.0, 5.01], list(range(20))])
+def test_density_has_one_point_per_grid_bin(values):
+    counts, edges, centers, density = binned_distribution(values, bins=30)
+
+    assert len(density) == len(centers) == 512
+    assert counts.sum() == len(values)
+    # Effectifs par classe de l'histogramme, comme sns.histplot(kde=True)
+    step = centers[1] - centers[0]
+    assert density.sum() * step == pytest.approx(len(values) * (edges[1] - edges[0]))
+
+
+def test_density_peaks_at_the_mode():
+    values = np.random.default_rng(0).normal(100, 10, 5000)
+    _, _, centers, density = binned_distribution(values, bins=30)
+
+    assert len(density) == len(centers)
+    assert abs(centers[np.argmax(density)] - 100) < 5
+
+
+def test_constant_values_have_no_density():
+    _, _, centers, density = binned_distribution([3, 3, 3], bins=10)
+    assert density is None and len(centers) == 512